@@ -4,7 +4,32 @@ Application initialization routines.
 
 from flask import Flask
 
+from irbox.coalescer import Coalescer
 from irbox.irbox import IrBox
+from irbox.pool import IrBoxPool
+from irbox.scene import SceneRunner
+from irbox.scheduler import Scheduler
+
+from app.include import IncludeIndex
+from app.page_cache import PageCache
 
 # Create IR box object
 irbox = IrBox()
+
+# Create IR box pool, with the IR box object as the default device
+pool = IrBoxPool(irbox)
+
+# Create command scheduler, configured when the app is initialized
+scheduler = Scheduler()
+
+# Create button press coalescer, configured when the app is initialized
+coalescer = Coalescer(scheduler=scheduler)
+
+# Create scene runner, which runs scenes in the background
+scene_runner = SceneRunner(scheduler=scheduler)
+
+# Create remote include index, built when the app is loaded
+include_index = IncludeIndex()
+
+# Create rendered page cache
+page_cache = PageCache()
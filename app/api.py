@@ -0,0 +1,159 @@
+"""
+JSON command API endpoints. Each command is executed and its result returned
+in a single response, with no redirect or template render.
+"""
+
+import time
+
+from flask import Blueprint
+from flask import jsonify
+from flask import request
+
+from irbox.errors import IrboxError
+from irbox.errors import QueueFullError
+from irbox.scheduler import Priority
+
+from app import coalescer
+from app import pool
+from app import scheduler
+from app.tx import build_args
+
+api_blueprint = Blueprint('api_blueprint', __name__, url_prefix='/api/v1')
+
+def api_response(success, message, started, status=200):
+    """
+    Builds a JSON command result.
+
+    Args:
+        success (bool): Whether or not the IR box responded positively.
+        message (str): The IR box response, or an error message.
+        started (float): `time.perf_counter()` before the command was sent.
+        status (int): HTTP status code.
+
+    Returns:
+        Response: The JSON response, with `success`, `response`, and
+            `latency` (seconds spent executing the command).
+    """
+
+    response = jsonify(
+            success=success,
+            response=message,
+            latency=round(time.perf_counter() - started, 6)
+    )
+    response.status_code = status
+    response.headers.set('Irbox-Success', 'true' if success else 'false')
+
+    return response
+
+def tx_args():
+    """
+    Builds ```tx()``` arguments from the request's query string.
+
+    Returns:
+        list of str: ```tx()``` arguments.
+
+    Raises:
+        MalformedArgumentsError: Unable to parse arguments.
+        UnsupportedProtocolError: Protocol is not implemented.
+    """
+
+    return build_args(
+            request.args.get('p'),
+            request.args.get('a'),
+            request.args.get('c'),
+            request.args.get('r'),
+            request.args.get('b')
+    )
+
+def _run(device, priority, name, *args):
+    """
+    Runs a command on a device when its turn comes and builds its JSON
+    result.
+
+    Args:
+        device (IrBox): The device.
+        priority (Priority): The command's priority class.
+        name (str): The `IrBox` command method name (e.g., `tx`).
+        args (list): Arguments to the command.
+
+    Returns:
+        Response: The JSON response.
+    """
+
+    started = time.perf_counter()
+
+    try:
+        success = scheduler.run(device, priority, name, *args)
+        message = device.response
+    except QueueFullError:
+        # Answered with 503 by the error blueprint
+        raise
+    except IrboxError as irbox_error:
+        success = False
+        message = irbox_error.message
+
+    return api_response(success, message, started)
+
+@api_blueprint.route('/tx')
+def tx(): # pylint: disable=invalid-name
+    """
+    ```tx``` command.
+    """
+
+    started = time.perf_counter()
+
+    try:
+        args = tx_args()
+    except IrboxError as irbox_error:
+        return api_response(False, irbox_error.message, started, 400)
+
+    # Merge with any identical presses
+    presses = 1
+    try:
+        success, message, presses = coalescer.tx(
+                pool.get(request.args.get('remote')),
+                args
+        )
+    except QueueFullError:
+        # Answered with 503 by the error blueprint
+        raise
+    except IrboxError as irbox_error:
+        success = False
+        message = irbox_error.message
+
+    response = api_response(success, message, started)
+    response.headers.set('Irbox-Coalesced', str(presses))
+
+    return response
+
+@api_blueprint.route('/nop')
+def nop():
+    """
+    ```nop``` command.
+    """
+
+    return _run(pool.get(request.args.get('remote')), Priority.INTERACTIVE, 'nop')
+
+@api_blueprint.route('/rx')
+def rx(): # pylint: disable=invalid-name
+    """
+    ```rx``` command.
+    """
+
+    return _run(pool.default, Priority.RX, 'rx')
+
+@api_blueprint.route('/norx')
+def norx():
+    """
+    ```norx``` command.
+    """
+
+    return _run(pool.default, Priority.RX, 'norx')
+
+@api_blueprint.route('/invalid')
+def invalid():
+    """
+    ```invalid``` command (for debugging purposes).
+    """
+
+    return _run(pool.get(request.args.get('remote')), Priority.DEBUG, 'invalid')
@@ -0,0 +1,534 @@
+"""
+Static asset pipeline. Builds content-hashed, minified, and precompressed
+copies of the files in `static/`, and maps file names to their URLs at
+runtime.
+
+Build with `make assets` (or `python -m app.build_assets`).
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+
+from flask import url_for
+
+logger = logging.getLogger(__name__)
+
+STATIC = 'static'
+"""
+Source directory.
+"""
+
+OUTPUT = 'static/dist'
+"""
+Output directory, relative to which `MANIFEST` and every built file live.
+"""
+
+MANIFEST = 'manifest.json'
+"""
+Manifest file name.
+"""
+
+COMPRESSIBLE = ('.css', '.ico', '.js', '.json', '.svg', '.txt', '.webmanifest')
+"""
+Extensions of files worth precompressing. Images other than icons are
+already compressed.
+"""
+
+_HASH_LENGTH = 10
+"""
+Number of hex digits of the content hash included in built file names.
+"""
+
+_STAGING_PREFIX = '.build-'
+"""
+Prefix of a build directory or manifest still being written. Never served,
+and never pruned.
+"""
+
+_REGEX_PRECEDERS = '(,=:[!&|?{};+-*%<>~^'
+"""
+Characters after which a slash starts a JavaScript regular expression
+literal.
+"""
+
+_REGEX_KEYWORDS = frozenset((
+        'case',
+        'delete',
+        'do',
+        'else',
+        'in',
+        'instanceof',
+        'new',
+        'return',
+        'throw',
+        'typeof',
+        'void',
+        'yield'
+))
+"""
+JavaScript keywords after which a slash starts a regular expression literal.
+"""
+
+class AssetManifest:
+    """
+    Class to map static file names to the URLs of their built copies. Falls
+    back to the original file in `static/` for files that have not been built
+    (including when the pipeline has never been run).
+
+    Attributes:
+        _assets (dict of str to dict): Built files, keyed by file name
+            relative to `static/`. Each has `path`, the built file name
+            relative to `OUTPUT`, and `gzip`, whether or not a `.gz` copy
+            exists.
+        _built (dict of str to bool): Whether or not each built file has a
+            `.gz` copy, keyed by built file name.
+    """
+
+    def __init__(self):
+        self._assets = {}
+        self._built = {}
+
+    def load(self, directory=OUTPUT):
+        """
+        Loads the manifest, if the pipeline has been run.
+
+        Args:
+            directory (str): The output directory.
+        """
+
+        try:
+            with open(
+                    os.path.join(directory, MANIFEST),
+                    encoding='utf-8'
+            ) as manifest:
+                self._assets = json.load(manifest)
+        except FileNotFoundError:
+            self._assets = {}
+            logger.info('No asset manifest; serving static files as is')
+
+        self._built = {
+                asset['path']: asset['gzip'] for asset in self._assets.values()
+        }
+
+    def get(self, path):
+        """
+        Looks up a built file.
+
+        Args:
+            path (str): The built file name, relative to `OUTPUT`.
+
+        Returns:
+            bool: Whether or not the built file has a `.gz` copy, or `None` if
+                it is not a built file.
+        """
+
+        return self._built.get(path)
+
+    def url(self, filename):
+        """
+        Returns the URL of a static file, preferring its built copy.
+
+        Args:
+            filename (str): The file name, relative to `static/` (e.g.,
+                `irbox.js`).
+
+        Returns:
+            str: The URL.
+        """
+
+        asset = self._assets.get(filename)
+        if asset is None:
+            return url_for('static', filename=filename)
+
+        return url_for('assets_blueprint.asset', filename=asset['path'])
+
+asset_manifest = AssetManifest()
+"""
+The app's static asset manifest. Lives here rather than in `app` so that
+`app.include` can use it.
+"""
+
+def asset_url(filename):
+    """
+    Returns the URL of a static file, preferring its built copy. Exposed to
+    templates as `asset_url()`.
+
+    Args:
+        filename (str): The file name, relative to `static/` (e.g.,
+            `irbox.js`).
+
+    Returns:
+        str: The URL.
+    """
+
+    return asset_manifest.url(filename)
+
+def minify_css(source):
+    """
+    Minifies CSS by removing comments and insignificant whitespace. Strings
+    are left alone.
+
+    Args:
+        source (str): The CSS.
+
+    Returns:
+        str: The minified CSS.
+    """
+
+    output = []
+    index = 0
+    length = len(source)
+
+    while index < length:
+        char = source[index]
+
+        if char in '"\'':
+            # Copy string
+            end = _string_end(source, index)
+            output.append(source[index:end])
+            index = end
+        elif source.startswith('/*', index):
+            # Drop comment
+            end = source.find('*/', index + 2)
+            index = length if end == -1 else end + 2
+        elif char.isspace():
+            # Collapse whitespace, including either side of a dropped comment
+            while index < length and source[index].isspace():
+                index += 1
+            if not output or output[-1] != ' ':
+                output.append(' ')
+        else:
+            output.append(char)
+            index += 1
+
+    # Drop whitespace around punctuation, outside strings
+    parts = re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', ''.join(output))
+    for part_index in range(0, len(parts), 2):
+        part = re.sub(r' ?([{};,]) ?', r'\1', parts[part_index])
+        part = re.sub(r': ', ':', part)
+        parts[part_index] = part.replace(';}', '}')
+
+    return ''.join(parts).strip()
+
+def minify_js(source):
+    """
+    Minifies JavaScript by removing comments, indentation, and blank lines.
+    Line breaks are kept, so automatic semicolon insertion is unaffected, as
+    are strings, template literals, and regular expression literals.
+
+    Args:
+        source (str): The JavaScript.
+
+    Returns:
+        str: The minified JavaScript.
+    """
+
+    output = []
+    index = 0
+    length = len(source)
+
+    # Last significant character, to tell regular expressions from division
+    previous = ''
+
+    while index < length:
+        char = source[index]
+
+        if char in '"\'`':
+            # Copy string or template literal
+            end = _string_end(source, index)
+            output.append(source[index:end])
+            index = end
+            previous = char
+        elif source.startswith('/*', index):
+            # Drop comment, keeping a line break if it spanned lines
+            end = source.find('*/', index + 2)
+            end = length if end == -1 else end + 2
+            output.append('\n' if '\n' in source[index:end] else ' ')
+            index = end
+        elif source.startswith('//', index):
+            # Drop comment up to the line break
+            end = source.find('\n', index)
+            index = length if end == -1 else end
+        elif char == '/' and _starts_regex(output, previous):
+            # Copy regular expression literal
+            end = _regex_end(source, index)
+            output.append(source[index:end])
+            index = end
+            previous = '/'
+        else:
+            output.append(char)
+            if not char.isspace():
+                previous = char
+            index += 1
+
+    lines = (line.strip() for line in ''.join(output).split('\n'))
+
+    return '\n'.join(line for line in lines if line)
+
+def _starts_regex(output, previous):
+    """
+    Determines whether or not a slash starts a regular expression literal
+    rather than a division, from what precedes it.
+
+    Args:
+        output (list of str): The minified JavaScript so far.
+        previous (str): Last significant character.
+
+    Returns:
+        bool: Whether or not the slash starts a regular expression literal.
+    """
+
+    if previous == '' or previous in _REGEX_PRECEDERS:
+        return True
+
+    if not (previous.isalnum() or previous in '_$'):
+        return False
+
+    # After an identifier it's a division, but after a keyword like return
+    # it's a regular expression
+    word = []
+    for item in reversed(output):
+        if not word and item.isspace():
+            continue
+        if len(item) != 1 or not (item.isalnum() or item in '_$'):
+            break
+        word.append(item)
+
+    return ''.join(reversed(word)) in _REGEX_KEYWORDS
+
+def _string_end(source, start):
+    """
+    Returns the index just past the end of a string literal.
+
+    Args:
+        source (str): The source code.
+        start (int): Index of the opening quote.
+
+    Returns:
+        int: Index just past the closing quote.
+    """
+
+    quote = source[start]
+    index = start + 1
+
+    while index < len(source):
+        if source[index] == '\\':
+            index += 2
+        elif source[index] == quote:
+            return index + 1
+        else:
+            index += 1
+
+    return len(source)
+
+def _regex_end(source, start):
+    """
+    Returns the index just past the end of a regular expression literal,
+    including any flags.
+
+    Args:
+        source (str): The source code.
+        start (int): Index of the opening slash.
+
+    Returns:
+        int: Index just past the flags.
+    """
+
+    index = start + 1
+    in_class = False
+
+    while index < len(source) and source[index] != '\n':
+        char = source[index]
+        if char == '\\':
+            index += 2
+            continue
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        elif char == '/' and not in_class:
+            index += 1
+            while index < len(source) and source[index].isalpha():
+                index += 1
+            return index
+        index += 1
+
+    return index
+
+_MINIFIERS = {
+        '.css': minify_css,
+        '.js': minify_js
+}
+"""
+Minifiers, keyed by extension.
+"""
+
+def _build_file(source_path, relative, output):
+    """
+    Builds one file into the output directory (see `build()`).
+
+    Args:
+        source_path (str): Path of the source file.
+        relative (str): Path of the source file relative to `static/`, with
+            `/` separators.
+        output (str): The output directory.
+
+    Returns:
+        dict: The file's manifest entry.
+    """
+
+    stem, extension = os.path.splitext(relative)
+
+    with open(source_path, 'rb') as source:
+        data = source.read()
+
+    minifier = _MINIFIERS.get(extension)
+    if minifier is not None:
+        data = minifier(data.decode('utf-8')).encode('utf-8')
+
+    digest = hashlib.sha256(data).hexdigest()[:_HASH_LENGTH]
+    path = f'{stem}.{digest}{extension}'
+    output_path = os.path.join(output, path)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'wb') as built:
+        built.write(data)
+
+    # Only keep compressed copies that are actually smaller
+    compressed = None
+    if extension in COMPRESSIBLE:
+        compressed = gzip.compress(data, 9, mtime=0)
+        if len(compressed) < len(data):
+            with open(f'{output_path}.gz', 'wb') as built:
+                built.write(compressed)
+        else:
+            compressed = None
+
+    return {'path': path, 'gzip': compressed is not None}
+
+def build(static=STATIC, output=OUTPUT):
+    """
+    Builds every file in `static/` (except the output directory) into a new
+    build directory in the output directory: minified where possible,
+    renamed to include a hash of its contents, and alongside a gzipped `.gz`
+    copy where worthwhile. Then swaps in a manifest mapping each file name to
+    its built copy.
+
+    The build directory is named after a hash of the manifest, and is only
+    renamed into place once complete, as is the manifest. Previous builds
+    are kept, so that workers still serving a previous manifest (e.g.,
+    before a restart, or during a rolling deploy) don't start answering 404
+    for URLs they handed out. Remove them with `prune()`. Rebuilding
+    unchanged files reuses the existing build.
+
+    Args:
+        static (str): The source directory.
+        output (str): The output directory.
+
+    Returns:
+        dict of str to dict: The manifest (see `AssetManifest`).
+    """
+
+    os.makedirs(output, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=_STAGING_PREFIX, dir=output)
+    os.chmod(staging, 0o755)
+
+    try:
+        manifest = {}
+        output_abs = os.path.abspath(output)
+
+        for root, dirs, files in os.walk(static):
+            # Skip the output directory
+            dirs[:] = sorted(
+                    directory for directory in dirs
+                    if os.path.abspath(os.path.join(root, directory)) != output_abs
+            )
+
+            for filename in sorted(files):
+                source_path = os.path.join(root, filename)
+                relative = os.path.relpath(source_path, static).replace(os.sep, '/')
+                manifest[relative] = _build_file(source_path, relative, staging)
+
+        build_id = hashlib.sha256(
+                json.dumps(manifest, sort_keys=True).encode('utf-8')
+        ).hexdigest()[:_HASH_LENGTH]
+
+        # An identical build is already in place
+        try:
+            os.rename(staging, os.path.join(output, build_id))
+        except OSError:
+            if not os.path.isdir(os.path.join(output, build_id)):
+                raise
+            shutil.rmtree(staging)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    for asset in manifest.values():
+        asset['path'] = f"{build_id}/{asset['path']}"
+
+    # Write the manifest alongside, then swap it in
+    with tempfile.NamedTemporaryFile(
+            'w',
+            encoding='utf-8',
+            prefix=_STAGING_PREFIX,
+            dir=output,
+            delete=False
+    ) as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    os.chmod(file.name, 0o644)
+    os.replace(file.name, os.path.join(output, MANIFEST))
+
+    return manifest
+
+def prune(output=OUTPUT, keep=2):
+    """
+    Removes previous builds from the output directory (see `build()`),
+    keeping the current build and the most recent before it. Run once no
+    worker still serves the builds removed.
+
+    Args:
+        output (str): The output directory.
+        keep (int): Number of builds to keep, including the current one.
+
+    Returns:
+        list of str: The names of the builds and other files removed.
+    """
+
+    try:
+        with open(os.path.join(output, MANIFEST), encoding='utf-8') as file:
+            current = {
+                    asset['path'].partition('/')[0] for asset in json.load(file).values()
+            }
+    except FileNotFoundError:
+        current = set()
+
+    entries = [
+            entry for entry in os.listdir(output)
+            if entry != MANIFEST and not entry.startswith(_STAGING_PREFIX)
+    ]
+
+    # Keep the current build, then the newest others
+    entries.sort(
+            key=lambda entry: (
+                    entry in current,
+                    os.path.getmtime(os.path.join(output, entry))
+            ),
+            reverse=True
+    )
+
+    removed = entries[max(keep, len(current)):]
+    for entry in removed:
+        path = os.path.join(output, entry)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.unlink(path)
+
+    return removed
@@ -0,0 +1,57 @@
+"""
+Built static asset endpoints.
+"""
+
+import mimetypes
+import os
+
+from flask import Blueprint
+from flask import abort
+from flask import request
+from flask import send_from_directory
+
+from app.asset_pipeline import OUTPUT
+from app.asset_pipeline import asset_manifest
+
+assets_blueprint = Blueprint('assets_blueprint', __name__)
+
+_MAX_AGE = 365 * 24 * 60 * 60
+"""
+Seconds built assets may be cached. Their names change with their contents,
+so they never need revalidating.
+"""
+
+@assets_blueprint.route('/assets/<path:filename>')
+def asset(filename):
+    """
+    Built static asset, gzipped if the client accepts it.
+    """
+
+    gzipped = asset_manifest.get(filename)
+    if gzipped is None:
+        abort(404)
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if gzipped and request.accept_encodings['gzip']:
+        response = send_from_directory(
+                os.path.abspath(OUTPUT),
+                f'{filename}.gz',
+                mimetype=mimetype,
+                max_age=_MAX_AGE
+        )
+        response.content_encoding = 'gzip'
+    else:
+        response = send_from_directory(
+                os.path.abspath(OUTPUT),
+                filename,
+                mimetype=mimetype,
+                max_age=_MAX_AGE
+        )
+
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    if gzipped:
+        response.vary.add('Accept-Encoding')
+
+    return response
@@ -0,0 +1,29 @@
+"""
+Builds static assets (see `app.asset_pipeline`). Run with
+`python -m app.build_assets`, or with `--prune` to remove previous builds
+once no worker still serves them.
+"""
+
+import argparse
+import logging
+
+from app.asset_pipeline import OUTPUT
+from app.asset_pipeline import build
+from app.asset_pipeline import prune
+
+logger = logging.getLogger(__name__)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--prune', action='store_true',
+            help='remove builds other than the current one and the one before it')
+    args = parser.parse_args()
+
+    if args.prune:
+        removed = prune()
+        logger.info('Removed %d previous builds from %s', len(removed), OUTPUT)
+    else:
+        manifest = build()
+        logger.info('Built %d assets into %s', len(manifest), OUTPUT)
@@ -20,14 +20,119 @@ class DefaultConfig():
     TCP port number to connect to the IR box device.
     """
 
+    DEVICES: dict = {}
+    """
+    Dictionary of additional IR box devices. Keys are the device ID and values
+    are a tuple of IP address or hostname and TCP port number. The device at
+    `HOST_ADDRESS` and `HOST_PORT` is always available as `default`.
+    """
+
+    REMOTE_DEVICES: dict = {}
+    """
+    Dictionary of remote routes. Keys are the remote ID and values are the
+    device ID the remote's commands are sent to. Remotes with no route use
+    the `default` device.
+    """
+
     RETRY: bool = False
     """
     Whether or not to attempt reconnection after a response timeout. Can be
     useful for flaky connections.
     """
 
+    EAGER_CONNECT: bool = False
+    """
+    Whether or not to connect to each IR box, and wait for its handshake,
+    when the app is loaded rather than on the first button press. `/ready`
+    reports 503 until every device is connected.
+    """
+
+    ADAPTIVE_TIMEOUT: bool = False
+    """
+    Whether or not to wait for each response only as long as the command
+    should take, based on its protocol and repeats plus the overhead learned
+    from recent responses, instead of a fixed 5 seconds.
+    """
+
+    KEEPALIVE_INTERVAL: float = 0
+    """
+    Seconds a connection may be idle before a background ```nop``` checks it.
+    When nonzero, each device's connection is also reestablished in the
+    background, and commands fail fast instead of reconnecting while the
+    user waits. `0` disables this.
+    """
+
+    RECONNECT_BACKOFF_MIN: float = 0.5
+    """
+    Initial background reconnect backoff ceiling, in seconds. Doubles after
+    each failed attempt, and each wait is randomized below the ceiling.
+    """
+
+    RECONNECT_BACKOFF_MAX: float = 30
+    """
+    Maximum background reconnect backoff ceiling, in seconds.
+    """
+
+    MAX_IN_FLIGHT: int = 0
+    """
+    Commands sent to each IR box at once. Others wait their turn in a queue
+    per priority class (`interactive` button presses, then `rx` and `norx`,
+    then `background` keepalives, then `debug` ```invalid``` commands), so
+    button presses go first. A command that finds its queue full, or waits
+    more than 5 seconds, gets HTTP 503 with `Retry-After`. `0` sends every
+    command immediately.
+    """
+
+    QUEUE_LIMITS: dict = {}
+    """
+    Dictionary of queue limits. Keys are the priority class (`interactive`,
+    `rx`, `background`, or `debug`) and values are how many commands of that
+    class may wait per IR box. Classes not given default to 16 `interactive`,
+    4 `rx`, 2 `background`, and 2 `debug`.
+    """
+
+    COALESCE_WINDOW: float = 0
+    """
+    Seconds to collect identical NEC, Apple, and Sony button presses for the
+    same device before sending them as one ```tx``` command with the repeats
+    of them all. Each press then waits up to this long before being sent.
+    `0` disables this.
+    """
+
+    SCENES: dict = {}
+    """
+    Dictionary of scenes, run in the background by `/scene/<name>`. Keys are
+    the scene name and values are a list of steps: numbers of seconds to
+    wait after the previous step, and dictionaries of ```tx``` arguments
+    (`p`, `a`, `c`, and optionally `r` and `b`) with optional `remote` to
+    route the press, `times` to press more than once, and `interval` seconds
+    between presses (defaults to 0.25).
+    """
+
+    MAX_SCENES: int = 4
+    """
+    Number of scenes run at once. `/scene/<name>` answers 503 while this
+    many are running, and 409 while the same scene is.
+    """
+
+    BROKER_SOCKET: str = ''
+    """
+    Path of the Unix domain socket of a broker (`python irbox_broker.py`) that
+    owns every IR box connection. When set, the app sends commands through
+    the broker instead of connecting to IR boxes itself, so any number of
+    WSGI worker processes share one connection per device. Empty disables
+    this.
+    """
+
     REMOTES: dict = { 'demo': 'Demo Remote' }
     """
     Dictionary of remotes. Keys are the remote ID and values are the name of
     the remote.
     """
+
+    INCLUDE_POLL_INTERVAL: float = 2
+    """
+    Number of seconds between checks for remote HTML, script, CSS, and image
+    files being added or removed. Set to 0 to only look for them when the app
+    is loaded.
+    """
@@ -0,0 +1,148 @@
+"""
+IR box device configuration, shared by the app and the broker.
+"""
+
+import logging
+
+from irbox.broker import BrokerClient
+from irbox.broker import BrokerConnection
+from irbox.errors import IrboxError
+from irbox.supervisor import Supervisor
+from irbox.timing import TimingModel
+
+from app import pool
+from app import scheduler
+
+logger = logging.getLogger(__name__)
+
+def configure_devices(config, supervisors=None):
+    """
+    Configure IR box devices and establish soft connections to them. With
+    `EAGER_CONNECT`, connect and wait for each IR box's handshake instead.
+    With `KEEPALIVE_INTERVAL`, start a supervisor for each device, whose
+    keepalives are scheduled as background commands.
+
+    Safe to call again after a call that raised partway: devices already
+    configured are left as they are, and devices that already have a
+    supervisor in `supervisors` don't get another.
+
+    Args:
+        config (Config): The configuration.
+        supervisors (dict of str to Supervisor): Optional. Supervisors
+            already started, keyed by device ID. Supervisors started are
+            added to it.
+
+    Returns:
+        dict of str to Supervisor: `supervisors`, or the supervisors started
+            if it was not given.
+    """
+
+    if supervisors is None:
+        supervisors = {}
+
+    # We don't care about errors right now since we're only doing a soft
+    # connect. It's up to each routine that communicates with the IR box from
+    # here on out to handle them, though. A device already pointed at its
+    # host and port keeps its connection.
+    address = (config['HOST_ADDRESS'], config['HOST_PORT'])
+    if (pool.default.host, pool.default.port) != address:
+        try:
+            pool.default.connect(*address, True)
+        except IrboxError:
+            pass
+
+    # If we should use retry, configure that
+    if config['RETRY']:
+        pool.default.retry = True
+
+    # Add any additional devices and route remotes to them
+    devices = pool.devices()
+    for device_id, (host, port) in config['DEVICES'].items():
+        if device_id not in devices:
+            pool.add_device(device_id, host, port, config['RETRY'])
+    _route_remotes(config)
+
+    # Set response deadlines per command, if configured
+    if config['ADAPTIVE_TIMEOUT']:
+        for device in pool.devices().values():
+            if device.timing is None:
+                device.timing = TimingModel()
+
+    # Connect and handshake now rather than on the first button press, if
+    # configured
+    if config['EAGER_CONNECT']:
+        for device_id, device in pool.devices().items():
+            if device.connected:
+                continue
+
+            try:
+                device.connect(device.host, device.port)
+            except IrboxError as irbox_error:
+                logger.warning(
+                        "Unable to connect to device `%s': %s",
+                        device_id,
+                        irbox_error.message
+                )
+
+    # Keep each device's connection alive in the background, if configured
+    if config['KEEPALIVE_INTERVAL']:
+        for device_id, device in pool.devices().items():
+            if device_id in supervisors:
+                continue
+
+            supervisor = Supervisor(
+                    device,
+                    config['KEEPALIVE_INTERVAL'],
+                    config['RECONNECT_BACKOFF_MIN'],
+                    config['RECONNECT_BACKOFF_MAX'],
+                    scheduler
+            )
+            supervisor.start()
+            supervisors[device_id] = supervisor
+
+    return supervisors
+
+def use_broker(config):
+    """
+    Replace every device with a client of the broker at `BROKER_SOCKET`,
+    which owns the IR box connections, and route remotes to them. With
+    `EAGER_CONNECT`, check that the broker is reachable now.
+
+    Args:
+        config (Config): The configuration.
+    """
+
+    connection = BrokerConnection(config['BROKER_SOCKET'])
+
+    for device_id in (pool.DEFAULT, *config['DEVICES']):
+        pool.set_device(device_id, BrokerClient(connection, device_id))
+    _route_remotes(config)
+
+    if config['EAGER_CONNECT']:
+        try:
+            connection.devices()
+        except IrboxError as irbox_error:
+            logger.warning(
+                    'Unable to reach broker at %s: %s',
+                    config['BROKER_SOCKET'],
+                    irbox_error.message
+            )
+
+def _route_remotes(config):
+    """
+    Route remotes to devices per `REMOTE_DEVICES`.
+
+    Args:
+        config (Config): The configuration.
+    """
+
+    for remote_id, device_id in config['REMOTE_DEVICES'].items():
+        try:
+            pool.route(remote_id, device_id)
+        except KeyError:
+            logger.warning(
+                    "Remote `%s' is routed to unknown device `%s'. Using the "
+                    'default device instead.',
+                    remote_id,
+                    device_id
+            )
@@ -3,9 +3,13 @@ Error endpoints.
 """
 
 from flask import Blueprint
+from flask import jsonify
+from flask import make_response
 from flask import render_template
 from flask import request
 
+from irbox.errors import QueueFullError
+
 error_blueprint = Blueprint('error_blueprint', __name__)
 
 @error_blueprint.route('/error')
@@ -20,3 +24,31 @@ def error():
             "error.html",
             message=message
     )
+
+@error_blueprint.app_errorhandler(QueueFullError)
+def queue_full(queue_full_error):
+    """
+    Too busy to queue a command. Answers 503 with `Retry-After`, in JSON for
+    the JSON API.
+
+    Args:
+        queue_full_error (QueueFullError): The error.
+    """
+
+    if request.blueprint == 'api_blueprint':
+        response = jsonify(
+                success=False,
+                response=queue_full_error.message,
+                latency=0
+        )
+        response.headers.set('Irbox-Success', 'false')
+    else:
+        response = make_response(render_template(
+                "error.html",
+                message=queue_full_error.message
+        ))
+
+    response.status_code = 503
+    response.headers.set('Retry-After', str(queue_full_error.retry_after))
+
+    return response
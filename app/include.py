@@ -5,12 +5,16 @@ Include helper routines.
 import logging
 import os
 import re
+import threading
 import urllib.parse
 
 from enum import Enum, auto
 
+from flask import request
 from flask import url_for
 
+from app.asset_pipeline import asset_url
+
 logger = logging.getLogger(__name__)
 
 class IncludeType(Enum):
@@ -43,6 +47,152 @@ class IncludeType(Enum):
     Generate an image include.
     """
 
+class IncludeIndex:
+    """
+    Class to index every configured remote's includes, so that views look
+    them up in a dictionary rather than checking the filesystem on every
+    request. A background thread polls the include directories' modification
+    times (which change whenever a file is added, removed, or renamed) and
+    rebuilds the index when they change.
+
+    Attributes:
+        DIRECTORIES (tuple of str): Directories containing remote includes.
+        _app (Flask): The app, for configuration and URL building.
+        _includes (dict of str to dict of IncludeType to str): Includes (see
+            `remote_include()`), keyed by remote ID, then by include type.
+            URLs are relative to the app root. Replaced wholesale on rebuild,
+            so readers need no lock.
+        _mtimes (tuple of int): Modification times of `DIRECTORIES` as of
+            the last build.
+        version (int): Incremented on every build, so that anything derived
+            from the index knows to start over.
+        _stop_event (Event): Set to stop the polling thread.
+        _thread (Thread): Polling thread.
+    """
+
+    DIRECTORIES = (
+            'templates/remotes',
+            'static/remotes/scripts',
+            'static/remotes/css',
+            'static/remotes/images'
+    )
+
+    def __init__(self):
+        self._app = None
+        self._includes = {}
+        self._mtimes = None
+        self.version = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def build(self, app):
+        """
+        Builds the index for every remote in the app's `REMOTES`.
+
+        Args:
+            app (Flask): The app.
+        """
+
+        self._app = app
+        mtimes = self._snapshot()
+
+        includes = {}
+        with app.test_request_context():
+            for remote_id in app.config['REMOTES']:
+                includes[remote_id] = {
+                        include_type: remote_include(remote_id, include_type)
+                        for include_type in IncludeType
+                }
+
+        self._includes = includes
+        self._mtimes = mtimes
+        self.version += 1
+
+    def start(self, interval):
+        """
+        Starts polling for changes, if not already polling. `build()` must
+        have been called first.
+
+        Args:
+            interval (float): Seconds between polls.
+        """
+
+        if self._thread is not None:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+                target=self._run,
+                args=(interval,),
+                daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops polling for changes.
+        """
+
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get(self, remote_id, include_type):
+        """
+        Looks up an include. Must be called from a request, since URLs are
+        resolved against its root.
+
+        Args:
+            remote_id (str): The remote ID.
+            include_type (IncludeType): The include type.
+
+        Returns:
+            str: The include (see `remote_include()`), or `None` if the remote
+                is not configured or the file does not exist.
+        """
+
+        include = self._includes.get(remote_id, {}).get(include_type)
+
+        if include is None or include_type == IncludeType.HTML:
+            return include
+
+        return request.script_root + include
+
+    def _run(self, interval):
+        """
+        Polling thread main loop.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            interval (float): Seconds between polls.
+        """
+
+        while not self._stop_event.wait(interval):
+            if self._snapshot() != self._mtimes:
+                logger.info('Remote includes changed; rebuilding index')
+                self.build(self._app)
+
+    def _snapshot(self):
+        """
+        Returns the modification times of `DIRECTORIES`.
+
+        This is a low-level method and not meant to be called directly.
+
+        Returns:
+            tuple of int: Modification times, in nanoseconds, or `None` for
+                directories that do not exist.
+        """
+
+        mtimes = []
+        for directory in self.DIRECTORIES:
+            try:
+                mtimes.append(os.stat(directory).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+
+        return tuple(mtimes)
 
 def check_safety(remote_id):
     """
@@ -155,9 +305,9 @@ def remote_include(remote_id, include_type):
     # Static directory
     STATIC = 'static' # pylint: disable=invalid-name
 
-    # Check for existence
+    # Check for existence, then prefer the built copy
     if is_file(f'{STATIC}/{safe_path}'):
-        return url_for(STATIC, filename=safe_path)
+        return asset_url(safe_path)
 
     return None
 
@@ -4,10 +4,10 @@ Index endpoint.
 
 from flask import current_app
 from flask import Blueprint
-from flask import render_template
 
+from app import include_index
+from app import page_cache
 from app.include import IncludeType
-from app.include import remote_include
 
 index_blueprint = Blueprint('index_blueprint', __name__)
 
@@ -23,14 +23,16 @@ def index():
     # Loop through each remote
     for remote_id, remote_name in current_app.config['REMOTES'].items():
         # Get remote URL and image
-        remote_url = remote_include(remote_id, IncludeType.URL)
-        remote_image = remote_include(remote_id, IncludeType.IMAGE)
+        remote_url = include_index.get(remote_id, IncludeType.URL)
+        remote_image = include_index.get(remote_id, IncludeType.IMAGE)
 
         # Build a dictionary of remotes with keys of remote ID and values of a
         # tuple of remote name, remote_url, and remote image
         remotes[remote_id] = (remote_name, remote_url, remote_image)
 
-    return render_template(
+    return page_cache.render(
+            ('index.html',),
+            include_index.version,
             'index.html',
             remotes=remotes
     )
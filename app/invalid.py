@@ -9,9 +9,12 @@ from flask import render_template
 from flask import request
 from flask import url_for
 
-from app import irbox
+from app import pool
+from app import scheduler
 
 from irbox.errors import IrboxError
+from irbox.errors import QueueFullError
+from irbox.scheduler import Priority
 
 invalid_blueprint = Blueprint('invalid_blueprint', __name__)
 
@@ -21,14 +24,21 @@ def invalid():
     ```invalid``` command (for debugging purposes).
     """
 
+    # Send to the remote's device
+    device = pool.get(request.args.get('remote'))
+
     try:
-        if irbox.invalid():
+        if scheduler.run(device, Priority.DEBUG, 'invalid'):
             endpoint = 'invalid_blueprint.invalid_success'
             message = None
         else:
             endpoint = 'invalid_blueprint.invalid_failure'
-            message = irbox.response
+            message = device.response
+    except QueueFullError:
+        # Answered with 503 by the error blueprint
+        raise
     except IrboxError as irbox_error:
+        endpoint = 'invalid_blueprint.invalid_failure'
         message = irbox_error.message
 
     return redirect(url_for(
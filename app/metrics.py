@@ -0,0 +1,31 @@
+"""
+Metrics endpoint.
+"""
+
+from flask import Blueprint
+from flask import make_response
+
+from irbox.metrics import prometheus_text
+
+from app import pool
+from app import scheduler
+
+metrics_blueprint = Blueprint('metrics_blueprint', __name__)
+
+@metrics_blueprint.route('/metrics')
+def metrics():
+    """
+    IR box metrics for every device, in Prometheus text format.
+    """
+
+    devices = pool.devices()
+    queues = {
+            device_id: scheduler.stats(device)
+            for device_id, device in devices.items()
+    }
+
+    response = make_response(prometheus_text(devices, queues), 200)
+    response.mimetype = 'text/plain'
+    response.headers.set('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+
+    return response
@@ -9,9 +9,12 @@ from flask import render_template
 from flask import request
 from flask import url_for
 
-from app import irbox
+from app import pool
+from app import scheduler
 
 from irbox.errors import IrboxError
+from irbox.errors import QueueFullError
+from irbox.scheduler import Priority
 
 nop_blueprint = Blueprint('nop_blueprint', __name__)
 
@@ -21,9 +24,15 @@ def nop():
     ```nop``` command.
     """
 
+    # Send to the remote's device
+    device = pool.get(request.args.get('remote'))
+
     try:
-        success = irbox.nop()
-        message = irbox.response
+        success = scheduler.run(device, Priority.INTERACTIVE, 'nop')
+        message = device.response
+    except QueueFullError:
+        # Answered with 503 by the error blueprint
+        raise
     except IrboxError as irbox_error:
         success = False
         message = irbox_error.message
@@ -9,9 +9,12 @@ from flask import render_template
 from flask import request
 from flask import url_for
 
-from app import irbox
+from app import pool
+from app import scheduler
 
 from irbox.errors import IrboxError
+from irbox.errors import QueueFullError
+from irbox.scheduler import Priority
 
 norx_blueprint = Blueprint('norx_blueprint', __name__)
 
@@ -22,8 +25,12 @@ def norx():
     """
 
     try:
-        success = irbox.norx()
-        message = irbox.response
+        device = pool.default
+        success = scheduler.run(device, Priority.RX, 'norx')
+        message = device.response
+    except QueueFullError:
+        # Answered with 503 by the error blueprint
+        raise
     except IrboxError as irbox_error:
         success = False
         message = irbox_error.message
@@ -0,0 +1,86 @@
+"""
+Contains class to memoize rendered pages and answer conditional requests.
+"""
+
+import hashlib
+import threading
+
+from flask import current_app
+from flask import make_response
+from flask import render_template
+from flask import request
+
+class PageCache:
+    # pylint: disable=too-few-public-methods
+
+    """
+    Class to memoize rendered pages, so that a page is rendered once per
+    distinct input rather than on every request, and to answer conditional
+    requests for them. Each page gets a strong ETag (a hash of its body), so
+    clients that already have it get `304 Not Modified` with no body.
+
+    Pages are served with `Cache-Control: no-cache`, so clients always
+    revalidate and never show a stale page after templates or configuration
+    change.
+
+    While Jinja is set to reload changed templates (e.g., in debug mode),
+    pages are rendered on every request instead, but still get ETags.
+
+    Attributes:
+        _pages (dict of tuple to tuple of (bytes, str)): Rendered bodies and
+            their ETags, keyed by script root and cache key.
+        _version (object): Version of the pages in `_pages`.
+        _lock (Lock): Guards `_pages` and `_version`.
+    """
+
+    def __init__(self):
+        self._pages = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def render(self, key, version, template, **context):
+        """
+        Renders a template, or reuses an earlier rendering, and builds a
+        conditional response. Must be called from a request.
+
+        Args:
+            key (tuple): Cache key. Must identify the template and every
+                input to `context` that varies.
+            version (object): Version of whatever else the page depends on
+                (e.g., `IncludeIndex.version`). All pages are discarded when
+                it changes.
+            template (str): The template name.
+            context (dict): Template context.
+
+        Returns:
+            Response: The page, or `304 Not Modified` if the client's copy is
+                current.
+        """
+
+        # URLs in the page depend on where the app is mounted
+        key = (request.script_root, key)
+
+        page = None
+        if not current_app.jinja_env.auto_reload:
+            with self._lock:
+                if version != self._version:
+                    self._pages.clear()
+                    self._version = version
+                page = self._pages.get(key)
+
+        if page is None:
+            body = render_template(template, **context).encode('utf-8')
+            page = (body, hashlib.sha1(body).hexdigest())
+
+            if not current_app.jinja_env.auto_reload:
+                with self._lock:
+                    if version == self._version:
+                        self._pages[key] = page
+
+        body, etag = page
+
+        response = make_response(body)
+        response.set_etag(etag)
+        response.headers.set('Cache-Control', 'no-cache')
+
+        return response.make_conditional(request)
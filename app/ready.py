@@ -0,0 +1,32 @@
+"""
+Readiness endpoint.
+"""
+
+from flask import Blueprint
+from flask import current_app
+from flask import jsonify
+
+from app import pool
+
+ready_blueprint = Blueprint('ready_blueprint', __name__)
+
+@ready_blueprint.route('/ready')
+def ready():
+    """
+    Readiness check for load balancers and rollouts. With `EAGER_CONNECT`,
+    returns 503 until every device is connected. Otherwise, the app connects
+    on demand and is always ready. Either way, the body lists whether or not
+    each device is connected.
+    """
+
+    devices = {
+            device_id: device.connected
+            for device_id, device in pool.devices().items()
+    }
+
+    if current_app.config['EAGER_CONNECT']:
+        is_ready = all(devices.values())
+    else:
+        is_ready = True
+
+    return jsonify(ready=is_ready, devices=devices), 200 if is_ready else 503
@@ -5,12 +5,12 @@ Remote endpoints.
 from flask import Blueprint
 from flask import current_app
 from flask import redirect
-from flask import render_template
 from flask import request
 from flask import url_for
 
+from app import include_index
+from app import page_cache
 from app.include import IncludeType
-from app.include import remote_include
 
 remote_blueprint = Blueprint('remote_blueprint', __name__)
 
@@ -21,7 +21,7 @@ def remote(remote_id):
     """
 
     # Make sure the remote HTML file exists
-    remote_html = remote_include(remote_id, IncludeType.HTML)
+    remote_html = include_index.get(remote_id, IncludeType.HTML)
     if remote_html is None:
         return redirect(url_for(
             'error_blueprint.error',
@@ -29,13 +29,23 @@ def remote(remote_id):
         ))
 
     # Get remote script and CSS
-    remote_script = remote_include(remote_id, IncludeType.SCRIPT)
-    remote_css = remote_include(remote_id, IncludeType.CSS)
+    remote_script = include_index.get(remote_id, IncludeType.SCRIPT)
+    remote_css = include_index.get(remote_id, IncludeType.CSS)
 
-    return render_template(
+    alt_align = request.cookies.get('alt-align') == 'true'
+
+    response = page_cache.render(
+            (remote_html, remote_id, alt_align),
+            include_index.version,
             remote_html,
-            alt_align=(request.cookies.get('alt-align') == 'true'),
+            alt_align=alt_align,
+            remote_id=remote_id,
             remote_name=current_app.config['REMOTES'][remote_id],
             remote_script=remote_script,
             remote_css=remote_css
     )
+
+    # The page depends on the alt-align cookie
+    response.vary.add('Cookie')
+
+    return response
@@ -3,18 +3,27 @@
 """
 
 from flask import Blueprint
+from flask import Response
 from flask import make_response
 from flask import redirect
 from flask import render_template
 from flask import request
 from flask import url_for
 
-from app import irbox
+from app import pool
+from app import scheduler
 
 from irbox.errors import IrboxError
+from irbox.errors import QueueFullError
+from irbox.scheduler import Priority
 
 rx_blueprint = Blueprint('rx_blueprint', __name__)
 
+_STREAM_KEEPALIVE = 15
+"""
+Seconds of quiet on `/rx/stream` before a keepalive comment is sent.
+"""
+
 @rx_blueprint.route('/rx')
 def rx(): # pylint: disable=invalid-name
     """
@@ -22,8 +31,12 @@ def rx(): # pylint: disable=invalid-name
     """
 
     try:
-        success = irbox.rx()
-        message = irbox.response
+        device = pool.default
+        success = scheduler.run(device, Priority.RX, 'rx')
+        message = device.response
+    except QueueFullError:
+        # Answered with 503 by the error blueprint
+        raise
     except IrboxError as irbox_error:
         success = False
         message = irbox_error.message
@@ -85,30 +98,86 @@ def rx_messages():
 @rx_blueprint.route('/rx/message')
 def rx_message():
     """
-    Raw message text returned from the IR box.
+    Raw ```tx()``` commands captured by the IR box since the `cursor` query
+    parameter, one per line. The cursor to pass next time is returned in the
+    `Irbox-Cursor` header. Each viewer keeps its own cursor, so every viewer
+    sees every capture.
     """
 
-    # Request a message
-    irbox.get_rx_message()
+    messages, cursor = pool.default.get_rx_messages(
+            request.args.get('cursor', type=int)
+    )
 
-    # Build plain-text response
-    irbox_response = irbox.response
+    return rx_message_response(messages, cursor)
 
-    # Ignore response timeouts
-    if irbox.response == 'Response timeout':
-        irbox_response = ''
+def rx_message_response(messages, cursor):
+    """
+    Builds the `/rx/message` response.
 
-    # Ignore rx (these can slip through due to timing race conditions)
-    if irbox.response == '+rx':
-        irbox_response = ''
+    Args:
+        messages (list of str): The ```tx()``` commands.
+        cursor (int): The cursor to pass next time.
 
-    # Ignore norx (these can possibly slip through due to timing race
-    # conditions)
-    if irbox.response == '+norx':
-        irbox_response = ''
+    Returns:
+        Response: The plain-text response.
+    """
 
-    # Build response
-    response = make_response(irbox_response, 200)
+    response = make_response('\n'.join(messages), 200)
     response.mimetype = 'text/plain'
+    response.headers.set('Irbox-Cursor', str(cursor))
+
+    return response
+
+@rx_blueprint.route('/rx/stream')
+def rx_stream():
+    """
+    Server-Sent Events stream of raw ```tx()``` commands captured by the IR
+    box, each pushed as soon as the reader thread reads it.
+    """
+
+    return rx_stream_response(pool.default.rx_messages)
+
+def rx_stream_response(captures):
+    """
+    Builds the `/rx/stream` response. Each event's ID is the cursor after its
+    message, so a reconnecting `EventSource` resumes where it left off via
+    `Last-Event-ID`. A comment is sent every `_STREAM_KEEPALIVE` seconds of
+    quiet, so that closed connections are noticed and proxies don't time out.
+
+    Args:
+        captures (RingBuffer): The captures to stream.
+
+    Returns:
+        Response: The `text/event-stream` response.
+    """
+
+    cursor = request.headers.get('Last-Event-ID', type=int)
+    if cursor is None:
+        cursor = request.args.get('cursor', type=int)
+
+    def events(cursor):
+        # Start from now unless resuming
+        if cursor is None:
+            cursor = captures.cursor
+
+        # Tell the client how long to wait before reconnecting
+        yield 'retry: 1000\n\n'
+
+        while True:
+            if not captures.wait(cursor, _STREAM_KEEPALIVE):
+                yield ': keepalive\n\n'
+                continue
+
+            messages, next_cursor = captures.read(cursor)
+            first = next_cursor - len(messages)
+            for offset, message in enumerate(messages):
+                yield f'id: {first + offset + 1}\ndata: {message}\n\n'
+            cursor = next_cursor
+
+    response = Response(events(cursor), mimetype='text/event-stream')
+    response.headers.set('Cache-Control', 'no-cache')
+
+    # Don't let a reverse proxy hold events back
+    response.headers.set('X-Accel-Buffering', 'no')
 
     return response
@@ -0,0 +1,190 @@
+"""
+Scene endpoints. A scene runs in the background on the server, so it
+completes even if the client goes away after starting it.
+"""
+
+import logging
+import numbers
+import time
+
+from flask import Blueprint
+from flask import current_app
+from flask import jsonify
+from flask import url_for
+
+from irbox.errors import IrboxError
+from irbox.errors import MalformedArgumentsError
+from irbox.errors import QueueFullError
+from irbox.errors import SceneRunningError
+from irbox.scene import Press
+
+from app import pool
+from app import scene_runner
+from app.api import api_response
+from app.tx import build_args
+
+logger = logging.getLogger(__name__)
+
+scene_blueprint = Blueprint('scene_blueprint', __name__, url_prefix='/scene')
+
+def build_steps(steps):
+    """
+    Builds `SceneRunner` steps from a scene's configuration.
+
+    Args:
+        steps (list): The scene's steps: numbers of seconds to wait, and
+            dictionaries of ```tx``` arguments (`p`, `a`, `c`, and optionally
+            `r` and `b`, as ASCII strings or integers) with optional `remote`
+            to route the press, `times` to press more than once, and
+            `interval` seconds between presses. Booleans are not numbers
+            here.
+
+    Returns:
+        list of object: `Press` objects and numbers of seconds to wait.
+
+    Raises:
+        MalformedArgumentsError: A step is malformed.
+        UnsupportedProtocolError: A protocol is not implemented.
+    """
+
+    built = []
+
+    for step in steps:
+        if _is_number(step) and step >= 0:
+            built.append(step)
+            continue
+
+        if not isinstance(step, dict):
+            raise MalformedArgumentsError
+
+        # Convert integer arguments to hex strings
+        args = {
+                key: hex(value) if _is_number(value, int) else value
+                for key, value in step.items()
+                if key in ('p', 'a', 'c', 'r', 'b')
+        }
+
+        # The IR box only takes ASCII
+        if not all(
+                isinstance(value, str) and value.isascii()
+                for value in args.values()
+        ):
+            raise MalformedArgumentsError
+
+        count = step.get('times', 1)
+        interval = step.get('interval', 0.25)
+        if isinstance(count, bool) or isinstance(interval, bool):
+            raise MalformedArgumentsError
+
+        try:
+            count = int(count)
+            interval = float(interval)
+        except (TypeError, ValueError) as error:
+            raise MalformedArgumentsError from error
+        if count < 1 or interval < 0:
+            raise MalformedArgumentsError
+
+        built.append(Press(
+                pool.get(step.get('remote')),
+                build_args(
+                        args.get('p'),
+                        args.get('a'),
+                        args.get('c'),
+                        args.get('r'),
+                        args.get('b')
+                ),
+                count,
+                interval
+        ))
+
+    return built
+
+def _is_number(value, kind=numbers.Real):
+    """
+    Determines whether or not a configuration value is a number. Booleans
+    are integers in Python, but not numbers in a scene.
+
+    Args:
+        value (object): The value.
+        kind (type): The kind of number.
+
+    Returns:
+        bool: Whether or not the value is a number.
+    """
+
+    return isinstance(value, kind) and not isinstance(value, bool)
+
+def check_scenes(config):
+    """
+    Logs a warning for each malformed scene in `SCENES`.
+
+    Args:
+        config (Config): The configuration.
+    """
+
+    for name, steps in config['SCENES'].items():
+        try:
+            build_steps(steps)
+        except IrboxError as irbox_error:
+            logger.warning("Scene `%s' is malformed: %s", name, irbox_error.message)
+
+@scene_blueprint.route('/<name>', methods=['POST'])
+def scene(name):
+    """
+    Starts a scene. Answers 202 at once with the job ID (`id`) and the URL
+    of its status (`status`), 409 if the scene is already running, or 503
+    with `Retry-After` if too many scenes are.
+
+    Jobs are kept by the worker process that started them. With several
+    workers, the status URL only answers from that worker (others answer
+    404), and the 409 and 503 checks only count that worker's scenes.
+    """
+
+    started = time.perf_counter()
+
+    steps = current_app.config['SCENES'].get(name)
+    if steps is None:
+        return api_response(False, 'Unknown scene', started, 404)
+
+    try:
+        steps = build_steps(steps)
+    except IrboxError as irbox_error:
+        return api_response(False, irbox_error.message, started, 400)
+
+    try:
+        job_id = scene_runner.start(name, steps)
+    except SceneRunningError as scene_running_error:
+        return api_response(False, scene_running_error.message, started, 409)
+    except QueueFullError as queue_full_error:
+        response = api_response(False, queue_full_error.message, started, 503)
+        response.headers.set('Retry-After', str(queue_full_error.retry_after))
+        return response
+
+    status = url_for('scene_blueprint.job', job_id=job_id)
+
+    response = jsonify(
+            success=True,
+            response=f"Scene `{name}' started",
+            latency=round(time.perf_counter() - started, 6),
+            id=job_id,
+            status=status
+    )
+    response.status_code = 202
+    response.headers.set('Irbox-Success', 'true')
+    # Only this worker process knows the job (see above)
+    response.headers.set('Location', status)
+
+    return response
+
+@scene_blueprint.route('/jobs/<job_id>')
+def job(job_id):
+    """
+    Status of a scene started with `/scene/<name>`, as JSON. Only the worker
+    process that started the scene knows it; others answer 404.
+    """
+
+    status = scene_runner.job(job_id)
+    if status is None:
+        return api_response(False, 'Unknown job', time.perf_counter(), 404)
+
+    return jsonify(status)
@@ -0,0 +1,24 @@
+"""
+IR box pool statistics endpoints.
+"""
+
+from flask import Blueprint
+from flask import jsonify
+
+from app import pool
+from app import scheduler
+
+stats_blueprint = Blueprint('stats_blueprint', __name__)
+
+@stats_blueprint.route('/pool/stats')
+def pool_stats():
+    """
+    Per-device connection, queue, and message statistics, as JSON, with
+    scheduler statistics per priority class under `queues`.
+    """
+
+    stats = pool.stats()
+    for device_id, device in pool.devices().items():
+        stats[device_id]['queues'] = scheduler.stats(device)
+
+    return jsonify(stats)
@@ -10,23 +10,34 @@ from flask import request
 from flask import url_for
 
 from irbox.errors import IrboxError
+from irbox.errors import MalformedArgumentsError
+from irbox.errors import QueueFullError
+from irbox.errors import UnsupportedProtocolError
 from irbox.protocol import Protocol
 
-from app import irbox
+from app import coalescer
+from app import pool
 
 tx_blueprint = Blueprint('tx_blueprint', __name__)
 
-@tx_blueprint.route('/tx')
-def tx(): # pylint: disable=invalid-name
-    """
-    ```tx``` command.
+def build_args(protocol, address, command, repeats, bits):
     """
+    Builds ```tx()``` arguments from request arguments.
 
-    protocol = request.args.get('p')
-    address = request.args.get('a')
-    command = request.args.get('c')
-    repeats = request.args.get('r')
-    bits = request.args.get('b')
+    Args:
+        protocol (str): Protocol, in hex (e.g., `0x13`).
+        address (str): Address.
+        command (str): Command.
+        repeats (str): Repeats, or `None`.
+        bits (str): Bits (Sony only), or `None`.
+
+    Returns:
+        list of str: ```tx()``` arguments.
+
+    Raises:
+        MalformedArgumentsError: Unable to parse arguments.
+        UnsupportedProtocolError: Protocol is not implemented.
+    """
 
     # Protocol, address, and command are always required */
     args = [protocol, address, command]
@@ -34,17 +45,9 @@ def tx(): # pylint: disable=invalid-name
     # Convert protocol to decimal
     try:
         protocol_decimal = int(protocol[2:], 16)
-    except TypeError:
+    except TypeError as type_error:
         # Malformed arguments
-        return redirect(url_for(
-                'tx_blueprint.tx_failure',
-                m='Malformed arguments',
-                p=protocol,
-                a=address,
-                c=command,
-                r=repeats,
-                b=bits
-        ))
+        raise MalformedArgumentsError from type_error
     except ValueError:
         protocol_decimal = Protocol.UNKNOWN.value
 
@@ -62,9 +65,29 @@ def tx(): # pylint: disable=invalid-name
             args.append(repeats)
     else:
         # Protocol is not implemented
+        raise UnsupportedProtocolError
+
+    return args
+
+@tx_blueprint.route('/tx')
+def tx(): # pylint: disable=invalid-name
+    """
+    ```tx``` command.
+    """
+
+    protocol = request.args.get('p')
+    address = request.args.get('a')
+    command = request.args.get('c')
+    repeats = request.args.get('r')
+    bits = request.args.get('b')
+
+    # Build tx() arguments
+    try:
+        args = build_args(protocol, address, command, repeats, bits)
+    except IrboxError as irbox_error:
         return redirect(url_for(
                 'tx_blueprint.tx_failure',
-                m='Unsupported protocol',
+                m=irbox_error.message,
                 p=protocol,
                 a=address,
                 c=command,
@@ -72,9 +95,14 @@ def tx(): # pylint: disable=invalid-name
                 b=bits
         ))
 
-    # Send the tx() command
+    # Send the tx() command to the remote's device, merged with any identical
+    # presses
+    device = pool.get(request.args.get('remote'))
     try:
-        success = irbox.tx(args)
+        success, message, presses = coalescer.tx(device, args)
+    except QueueFullError:
+        # Answered with 503 by the error blueprint
+        raise
     except IrboxError as irbox_error:
         return redirect(url_for(
                 'tx_blueprint.tx_failure',
@@ -91,8 +119,6 @@ def tx(): # pylint: disable=invalid-name
     else:
         endpoint = 'tx_blueprint.tx_failure'
 
-    message = irbox.response
-
     return redirect(url_for(
             endpoint,
             m=message,
@@ -100,7 +126,8 @@ def tx(): # pylint: disable=invalid-name
             a=address,
             c=command,
             r=repeats,
-            b=bits
+            b=bits,
+            n=presses if presses > 1 else None
     ))
 
 @tx_blueprint.route('/tx/success')
@@ -115,6 +142,7 @@ def tx_success():
     command = request.args.get('c')
     repeats = request.args.get('r')
     bits = request.args.get('b')
+    presses = request.args.get('n', 1, type=int)
 
     response = make_response(
             render_template(
@@ -125,10 +153,12 @@ def tx_success():
                     address=address,
                     command=command,
                     repeats=repeats,
-                    bits=bits
+                    bits=bits,
+                    presses=presses
             )
     )
     response.headers.set('Irbox-Success', 'true')
+    response.headers.set('Irbox-Coalesced', str(presses))
     return response
 
 @tx_blueprint.route('/tx/failure')
@@ -143,6 +173,7 @@ def tx_failure():
     command = request.args.get('c')
     repeats = request.args.get('r')
     bits = request.args.get('b')
+    presses = request.args.get('n', 1, type=int)
 
     response = make_response(
             render_template(
@@ -153,8 +184,10 @@ def tx_failure():
                     address=address,
                     command=command,
                     repeats=repeats,
-                    bits=bits
+                    bits=bits,
+                    presses=presses
             )
     )
     response.headers.set('Irbox-Success', 'false')
+    response.headers.set('Irbox-Coalesced', str(presses))
     return response
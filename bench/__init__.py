@@ -0,0 +1,4 @@
+"""
+Benchmarks. Run each module with `python -m bench.<module>` from the
+repository root.
+"""
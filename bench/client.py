@@ -0,0 +1,91 @@
+"""
+Minimal keep-alive HTTP client shared by the benchmarks.
+"""
+
+import http.client
+import urllib.parse
+
+_MAX_REDIRECTS = 5
+"""
+Maximum redirects followed per request, as a browser would.
+"""
+
+class HttpClient:
+    """
+    Class to send GET requests over one keep-alive connection, reconnecting
+    as needed and following redirects. Not thread-safe; use one per thread.
+
+    Attributes:
+        _host (str): The host.
+        _port (int): The port.
+        _timeout (float): Socket timeout, in seconds.
+        _connection (HTTPConnection): The connection, or `None` before the
+            first request and after the server closes it.
+    """
+
+    def __init__(self, host, port, timeout=30):
+        """
+        Args:
+            host (str): The host.
+            port (int): The port.
+            timeout (float): Socket timeout, in seconds.
+        """
+
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self._connection = None
+
+    def get(self, uri, headers=None):
+        """
+        Requests a URI, following redirects.
+
+        Args:
+            uri (str): The URI (path and query).
+            headers (dict of str to str): Optional. Request headers.
+
+        Returns:
+            tuple of (int, HTTPMessage, bytes): The final status code,
+                response headers, and body.
+
+        Raises:
+            HTTPException: An HTTP error.
+            OSError: A connection error.
+        """
+
+        for _ in range(_MAX_REDIRECTS + 1):
+            if self._connection is None:
+                self._connection = http.client.HTTPConnection(
+                        self._host,
+                        self._port,
+                        timeout=self._timeout
+                )
+
+            try:
+                self._connection.request('GET', uri, headers=headers or {})
+                response = self._connection.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                # Start over with a new connection next time
+                self.close()
+                raise
+
+            if response.will_close:
+                self.close()
+
+            if response.status not in (301, 302, 303, 307, 308):
+                break
+
+            location = urllib.parse.urlsplit(response.getheader('Location'))
+            uri = urllib.parse.urlunsplit(('', '') + location[2:])
+
+        return (response.status, response.headers, body)
+
+    def close(self):
+        """
+        Closes the connection, if open.
+        """
+
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
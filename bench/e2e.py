@@ -0,0 +1,382 @@
+"""
+End-to-end benchmark of the command path. Drives the app, both through
+Flask's test client and through a real threaded WSGI server over HTTP,
+against a local IR box simulator, and reports p50/p99 latency and throughput
+per endpoint and concurrency level. Results are written to JSON so they can
+be compared between commits with `--compare`.
+"""
+
+import argparse
+import datetime
+import http.client
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from irbox.simulator import Simulator
+
+from bench.client import HttpClient
+
+ENDPOINTS = (
+        '/tx?p=0x13&a=0x1&c=0x15&b=0xc',
+        '/api/v1/tx?p=0x13&a=0x1&c=0x15&b=0xc',
+        '/nop',
+        '/rx/message',
+        '/',
+        '/remote/demo'
+)
+"""
+Endpoints benchmarked by default.
+"""
+
+def percentile(samples, fraction):
+    """
+    Returns a percentile by the nearest-rank method.
+
+    Args:
+        samples (list of float): Sorted samples.
+        fraction (float): The percentile, as a fraction (e.g., `0.99`).
+
+    Returns:
+        float: The percentile, or `None` if there are no samples.
+    """
+
+    if not samples:
+        return None
+
+    rank = max(int(len(samples) * fraction + 0.5) - 1, 0)
+
+    return samples[min(rank, len(samples) - 1)]
+
+class TestClientTarget:
+    """
+    Sends requests through Flask's test client, one client per thread.
+
+    Attributes:
+        _app (Flask): The app.
+        _local (local): Per-thread state. `_local.client` is the thread's
+            test client.
+    """
+
+    name = 'test-client'
+
+    def __init__(self, app):
+        self._app = app
+        self._local = threading.local()
+
+    def get(self, uri):
+        """
+        Requests a URI, following redirects.
+
+        Args:
+            uri (str): The URI.
+
+        Returns:
+            int: The final HTTP status code.
+        """
+
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self._app.test_client()
+
+        response = client.get(uri, follow_redirects=True)
+        response.close()
+
+        return response.status_code
+
+    def close(self):
+        """
+        Releases resources.
+        """
+
+class WsgiTarget:
+    """
+    Sends requests over HTTP to the app running in a threaded Werkzeug
+    server, over one keep-alive connection per thread.
+
+    Attributes:
+        _server (BaseWSGIServer): The server.
+        _thread (Thread): Server thread.
+        _local (local): Per-thread state. `_local.client` is the thread's
+            HTTP client.
+    """
+
+    name = 'wsgi'
+
+    def __init__(self, app):
+        # Imported here, since only this target needs it
+        from werkzeug.serving import make_server # pylint: disable=import-outside-toplevel
+
+        self._server = make_server('127.0.0.1', 0, app, threaded=True)
+        self._thread = threading.Thread(
+                target=self._server.serve_forever,
+                daemon=True
+        )
+        self._thread.start()
+        self._local = threading.local()
+
+    def get(self, uri):
+        """
+        Requests a URI, following redirects.
+
+        Args:
+            uri (str): The URI.
+
+        Returns:
+            int: The final HTTP status code.
+        """
+
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = HttpClient(
+                    '127.0.0.1',
+                    self._server.server_port
+            )
+
+        return client.get(uri)[0]
+
+    def close(self):
+        """
+        Stops the server.
+        """
+
+        self._server.shutdown()
+        self._thread.join()
+
+def run(target, uri, concurrency, requests):
+    """
+    Sends requests to one endpoint from several threads at once.
+
+    Args:
+        target (object): `TestClientTarget` or `WsgiTarget`.
+        uri (str): The URI.
+        concurrency (int): Number of threads.
+        requests (int): Total number of requests.
+
+    Returns:
+        dict: The results.
+    """
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+
+            start = time.perf_counter()
+            try:
+                ok = target.get(uri) < 400
+            except (http.client.HTTPException, OSError):
+                ok = False
+            elapsed = time.perf_counter() - start
+
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors[0] += 1
+
+    # Warm up (first request initializes the app and connects)
+    target.get(uri)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+            'mode': target.name,
+            'endpoint': uri,
+            'concurrency': concurrency,
+            'requests': requests,
+            'errors': errors[0],
+            'p50_ms': ms(percentile(latencies, 0.50)),
+            'p99_ms': ms(percentile(latencies, 0.99)),
+            'mean_ms': ms(sum(latencies) / len(latencies)),
+            'throughput_rps': round(requests / wall, 1)
+    }
+
+def git_commit():
+    """
+    Returns the current Git commit, if any.
+
+    Returns:
+        str: The abbreviated commit hash, or `None`.
+    """
+
+    try:
+        return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True,
+                check=True,
+                text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_app(port):
+    """
+    Loads the app, configured to use the simulator.
+
+    Args:
+        port (int): The simulator's port.
+
+    Returns:
+        Flask: The app.
+    """
+
+    with tempfile.NamedTemporaryFile(
+            'w',
+            suffix='.cfg',
+            delete=False
+    ) as config:
+        config.write(f"HOST_ADDRESS = '127.0.0.1'\nHOST_PORT = {port}\n")
+    os.environ['IRBOX_CONFIG'] = config.name
+
+    # The app finds templates and static files relative to the working
+    # directory
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    # Imported here, since it reads its configuration on import
+    import irbox_app # pylint: disable=import-outside-toplevel
+
+    os.unlink(config.name)
+
+    return irbox_app.app
+
+def compare(results, baseline_path):
+    """
+    Prints each result's change from a baseline.
+
+    Args:
+        results (list of dict): The results.
+        baseline_path (str): Path to a previous JSON output.
+    """
+
+    with open(baseline_path, encoding='utf-8') as baseline_file:
+        baseline = {
+                (result['mode'], result['endpoint'], result['concurrency']): result
+                for result in json.load(baseline_file)['results']
+        }
+
+    print(f'\nChange from {baseline_path}:')
+    for result in results:
+        old = baseline.get(
+                (result['mode'], result['endpoint'], result['concurrency'])
+        )
+        if old is None:
+            continue
+
+        def change(key, new=result, old=old):
+            if not old[key] or new[key] is None:
+                return '     n/a'
+            return f'{(new[key] - old[key]) / old[key] * 100:+7.1f}%'
+
+        print(
+                f"{result['mode']:>11} {result['endpoint'][:36]:<36} "
+                f"c={result['concurrency']:<3} "
+                f"p50 {change('p50_ms')}  p99 {change('p99_ms')}  "
+                f"rps {change('throughput_rps')}"
+        )
+
+def main():
+    """
+    Runs the benchmark, prints a summary, and writes JSON results.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--modes', default='test-client,wsgi',
+            help='comma-separated: test-client, wsgi')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS),
+            help='comma-separated URIs')
+    parser.add_argument('--concurrency', default='1,4,16',
+            help='comma-separated thread counts')
+    parser.add_argument('--requests', type=int, default=200,
+            help='requests per endpoint and concurrency level')
+    parser.add_argument('--latency', type=float, default=0.0,
+            help='simulated IR box response latency, in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0,
+            help='simulated IR box response jitter, in seconds')
+    parser.add_argument('--output', default='bench_e2e.json',
+            help='JSON results path')
+    parser.add_argument('--compare', metavar='BASELINE',
+            help='previous JSON results to compare against')
+    args = parser.parse_args()
+
+    # Resolve paths before the app changes the working directory
+    args.output = os.path.abspath(args.output)
+    if args.compare:
+        args.compare = os.path.abspath(args.compare)
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    simulator = Simulator(port=0, latency=args.latency, jitter=args.jitter)
+    simulator.start()
+    app = load_app(simulator.port)
+
+    targets = {'test-client': TestClientTarget, 'wsgi': WsgiTarget}
+    results = []
+
+    try:
+        for mode in args.modes.split(','):
+            target = targets[mode](app)
+            try:
+                for uri in args.endpoints.split(','):
+                    for concurrency in args.concurrency.split(','):
+                        result = run(target, uri, int(concurrency), args.requests)
+                        results.append(result)
+                        print(
+                                f"{result['mode']:>11} {uri[:36]:<36} "
+                                f"c={result['concurrency']:<3} "
+                                f"p50 {result['p50_ms']:8.2f} ms  "
+                                f"p99 {result['p99_ms']:8.2f} ms  "
+                                f"{result['throughput_rps']:8.1f} req/s"
+                                + (f"  {result['errors']} errors" if result['errors'] else '')
+                        )
+            finally:
+                target.close()
+    finally:
+        simulator.stop()
+
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(
+                {
+                        'commit': git_commit(),
+                        'timestamp': datetime.datetime.now(
+                                datetime.timezone.utc
+                        ).isoformat(),
+                        'python': sys.version.split()[0],
+                        'platform': platform.platform(),
+                        'args': vars(args),
+                        'results': results
+                },
+                output,
+                indent=2
+        )
+    print(f'\nWrote {args.output}')
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Microbenchmark comparing the legacy one-byte-per-`recv` line reader with
+`LineReader`. Reports `recv` calls and CPU time per line.
+"""
+
+import argparse
+import socket
+import time
+
+from irbox.line_reader import LineReader
+
+_LINE = b'+tx(0x13,0x1,0x14,0xc,0x5)\r\n'
+"""
+Representative receive mode line.
+"""
+
+def legacy_readline(sock, counter):
+    """
+    Reads one line the way `IrBox._read()` used to: one byte per `recv`.
+
+    Args:
+        sock (socket): Socket to read from.
+        counter (list of int): Single-element list incremented per `recv`.
+
+    Returns:
+        bytes: The line, without its terminator, or `None` on close.
+    """
+
+    message = b''
+    while not message.endswith(b'\r\n'):
+        byte = sock.recv(1)
+        counter[0] += 1
+        if byte == b'':
+            return None
+        message += byte
+
+    return message[:-2]
+
+def run(lines, line_length, use_line_reader):
+    """
+    Writes `lines` lines into a socket pair in one burst, then reads them all
+    back.
+
+    Args:
+        lines (int): Number of lines to read.
+        line_length (int): Approximate length of each line, in bytes.
+        use_line_reader (bool): Whether to use `LineReader` or the legacy
+            reader.
+
+    Returns:
+        tuple of (int, float): `recv` calls and CPU seconds.
+    """
+
+    # Pad the representative line out to the requested length
+    padding = max(line_length - len(_LINE), 0)
+    line = _LINE[:-3] + b',' * padding + _LINE[-3:]
+
+    reader_socket, writer_socket = socket.socketpair()
+    reader_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+    writer_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 22)
+
+    try:
+        writer_socket.sendall(line * lines)
+        writer_socket.shutdown(socket.SHUT_WR)
+
+        line_reader = LineReader(reader_socket)
+        counter = [0]
+        read = 0
+
+        start = time.process_time()
+        while True:
+            if use_line_reader:
+                message = line_reader.readline()
+            else:
+                message = legacy_readline(reader_socket, counter)
+            if message is None:
+                break
+            read += 1
+        elapsed = time.process_time() - start
+
+        assert read == lines
+
+        return (line_reader.recv_calls if use_line_reader else counter[0], elapsed)
+    finally:
+        reader_socket.close()
+        writer_socket.close()
+
+def main():
+    """
+    Runs the benchmark and prints a summary.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=2000)
+    parser.add_argument('--line-length', type=int, default=64)
+    args = parser.parse_args()
+
+    for name, use_line_reader in (('legacy', False), ('LineReader', True)):
+        calls, elapsed = run(args.lines, args.line_length, use_line_reader)
+        print(
+                f'{name:>10}: {calls / args.lines:8.2f} recv/line, '
+                f'{elapsed / args.lines * 1e6:8.2f} us CPU/line'
+        )
+
+if __name__ == '__main__':
+    main()
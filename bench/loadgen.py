@@ -0,0 +1,388 @@
+"""
+Load generator simulating several phones using the app at once. Each client
+opens a remote page (and its assets), then presses buttons with random think
+times in between, sometimes holding them (more repeats); some clients are
+receive mode viewers instead. Meanwhile the IR box queue depth is sampled
+from `/pool/stats`. Reports per-endpoint latency percentiles and error rates,
+and queue depth per device.
+
+Use it against a deployment to size worker counts, or against a local app
+running on the simulator to find where a device's connection saturates.
+"""
+
+import argparse
+import http.client
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+
+from bench.client import HttpClient
+from bench.e2e import percentile
+
+_ASSET = re.compile(rb'(?:src|href)="(/(?:assets|static)/[^"]+)"')
+"""
+Matches same-origin script, stylesheet, and image references in a page.
+"""
+
+class Recorder:
+    """
+    Class to collect request latencies and errors per endpoint, from any
+    number of threads.
+
+    Attributes:
+        _lock (Lock): Guards everything below.
+        _latencies (dict of str to list of float): Latencies, in seconds,
+            keyed by endpoint.
+        _errors (dict of str to int): Failed requests, keyed by endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._errors = {}
+
+    def record(self, endpoint, seconds, ok):
+        """
+        Records a request.
+
+        Args:
+            endpoint (str): The endpoint name.
+            seconds (float): The latency.
+            ok (bool): Whether or not the request succeeded.
+        """
+
+        with self._lock:
+            self._latencies.setdefault(endpoint, []).append(seconds)
+            self._errors[endpoint] = self._errors.get(endpoint, 0) + (not ok)
+
+    def summary(self, duration):
+        """
+        Summarizes the requests recorded.
+
+        Args:
+            duration (float): Seconds the load ran for.
+
+        Returns:
+            dict of str to dict: Request count, error rate, throughput, and
+                latency percentiles, in milliseconds, keyed by endpoint.
+        """
+
+        with self._lock:
+            latencies = {
+                    endpoint: sorted(samples)
+                    for endpoint, samples in self._latencies.items()
+            }
+            errors = dict(self._errors)
+
+        summary = {}
+        for endpoint, samples in sorted(latencies.items()):
+            summary[endpoint] = {
+                    'requests': len(samples),
+                    'error_rate': round(errors[endpoint] / len(samples), 4),
+                    'throughput_rps': round(len(samples) / duration, 2),
+                    **{
+                            f'p{int(fraction * 100)}_ms': round(
+                                    percentile(samples, fraction) * 1000,
+                                    2
+                            )
+                            for fraction in (0.5, 0.9, 0.99)
+                    }
+            }
+
+        return summary
+
+class Client:
+    """
+    Class to simulate one phone.
+
+    Attributes:
+        _http (HttpClient): Connection to the app.
+        _recorder (Recorder): Where to record requests.
+        _args (Namespace): Command line arguments.
+        _random (Random): Think time and action source.
+        _cursor (str): Receive mode cursor, for viewers.
+    """
+
+    def __init__(self, host, port, recorder, args, seed):
+        """
+        Args:
+            host (str): The app's host.
+            port (int): The app's port.
+            recorder (Recorder): Where to record requests.
+            args (Namespace): Command line arguments.
+            seed (int): Random seed.
+        """
+
+        self._http = HttpClient(host, port)
+        self._recorder = recorder
+        self._args = args
+        self._random = random.Random(seed)
+        self._cursor = None
+
+    def request(self, endpoint, uri):
+        """
+        Sends a request and records it.
+
+        Args:
+            endpoint (str): The endpoint name to record it under.
+            uri (str): The URI.
+
+        Returns:
+            tuple of (int, HTTPMessage, bytes): The response (see
+                `HttpClient.get()`), or `None` if it failed.
+        """
+
+        start = time.perf_counter()
+        try:
+            response = self._http.get(self._args.prefix + uri)
+        except (http.client.HTTPException, OSError):
+            response = None
+        elapsed = time.perf_counter() - start
+
+        ok = response is not None and response[0] < 400
+        if ok and endpoint.startswith('tx'):
+            # The IR box's verdict, for both the API and the HTML endpoints
+            ok = response[1].get('Irbox-Success') == 'true'
+
+        self._recorder.record(endpoint, elapsed, ok)
+
+        return response
+
+    def open_remote(self):
+        """
+        Opens a remote page and loads its assets.
+        """
+
+        remote_id = self._random.choice(self._args.remotes)
+        response = self.request('remote', f'/remote/{remote_id}')
+        if response is None:
+            return
+
+        for asset in sorted(set(_ASSET.findall(response[2]))):
+            self.request('asset', asset.decode('ascii'))
+
+    def press(self):
+        """
+        Presses a button, sometimes holding it.
+        """
+
+        args = dict(urllib.parse.parse_qsl(self._args.tx))
+        endpoint = 'tx'
+        if self._random.random() < self._args.hold:
+            args['r'] = str(self._args.hold_repeats)
+            endpoint = 'tx-hold'
+        if self._args.remote_param:
+            args['remote'] = self._random.choice(self._args.remotes)
+
+        path = '/api/v1/tx' if self._args.api else '/tx'
+        self.request(endpoint, f'{path}?{urllib.parse.urlencode(args)}')
+
+    def poll_rx(self):
+        """
+        Polls for receive mode captures, as a viewer does.
+        """
+
+        uri = '/rx/message'
+        if self._cursor is not None:
+            uri += f'?cursor={self._cursor}'
+
+        response = self.request('rx/message', uri)
+        if response is not None:
+            self._cursor = response[1].get('Irbox-Cursor', self._cursor)
+
+    def run_presser(self, deadline):
+        """
+        Opens a remote and presses buttons until the deadline.
+
+        Args:
+            deadline (float): `time.monotonic()` to stop at.
+        """
+
+        self.open_remote()
+
+        while time.monotonic() < deadline:
+            # Exponentially distributed think time, like independent taps
+            time.sleep(min(
+                    self._random.expovariate(1 / self._args.think),
+                    max(deadline - time.monotonic(), 0)
+            ))
+            if time.monotonic() >= deadline:
+                break
+
+            if self._random.random() < self._args.reopen:
+                self.open_remote()
+            else:
+                self.press()
+
+        self._http.close()
+
+    def run_viewer(self, deadline):
+        """
+        Polls for receive mode captures until the deadline.
+
+        Args:
+            deadline (float): `time.monotonic()` to stop at.
+        """
+
+        self.request('rx/viewer', '/rx/viewer')
+
+        while time.monotonic() < deadline:
+            self.poll_rx()
+            time.sleep(self._args.rx_poll)
+
+        self._http.close()
+
+def sample_queues(host, port, args, deadline, samples):
+    """
+    Samples each device's queue depth until the deadline.
+
+    Args:
+        host (str): The app's host.
+        port (int): The app's port.
+        args (Namespace): Command line arguments (`prefix` and
+            `stats_interval`).
+        deadline (float): `time.monotonic()` to stop at.
+        samples (dict of str to list of int): Filled with pending message
+            counts, keyed by device ID.
+    """
+
+    client = HttpClient(host, port)
+
+    while time.monotonic() < deadline:
+        try:
+            status, _, body = client.get(args.prefix + '/pool/stats')
+            if status == 200:
+                for device_id, stats in json.loads(body).items():
+                    samples.setdefault(device_id, []).append(stats['pending'])
+        except (http.client.HTTPException, OSError, ValueError):
+            pass
+
+        time.sleep(args.stats_interval)
+
+    client.close()
+
+def main():
+    """
+    Runs the load, prints a summary, and optionally writes JSON results.
+    """
+
+    # pylint: disable=too-many-locals
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000',
+            help='where the app is served')
+    parser.add_argument('--clients', type=int, default=10,
+            help='simulated phones pressing buttons')
+    parser.add_argument('--viewers', type=int, default=0,
+            help='simulated phones viewing receive mode')
+    parser.add_argument('--duration', type=float, default=30,
+            help='seconds to run for')
+    parser.add_argument('--remotes', default='demo',
+            help='comma-separated remote IDs to open')
+    parser.add_argument('--remote-param', action='store_true',
+            help='send the remote ID with each press, to exercise routing')
+    parser.add_argument('--tx', default='p=0x8&a=0x4&c=0x8',
+            help='tx query string for each press')
+    parser.add_argument('--think', type=float, default=2.0,
+            help='mean seconds between presses')
+    parser.add_argument('--hold', type=float, default=0.1,
+            help='probability that a press is a hold')
+    parser.add_argument('--hold-repeats', type=int, default=10,
+            help='repeats sent for a hold')
+    parser.add_argument('--reopen', type=float, default=0.05,
+            help='probability that an action reopens the remote page')
+    parser.add_argument('--rx-poll', type=float, default=0.25,
+            help='seconds between receive mode polls')
+    parser.add_argument('--api', action='store_true',
+            help='press through /api/v1/tx instead of /tx')
+    parser.add_argument('--stats-interval', type=float, default=0.5,
+            help='seconds between queue depth samples')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='JSON results path')
+    args = parser.parse_args()
+
+    base_url = urllib.parse.urlsplit(args.base_url)
+    host = base_url.hostname
+    port = base_url.port or 80
+    args.prefix = base_url.path.rstrip('/')
+    args.remotes = args.remotes.split(',')
+
+    recorder = Recorder()
+    queue_samples = {}
+    deadline = time.monotonic() + args.duration
+
+    threads = [threading.Thread(
+            target=sample_queues,
+            args=(host, port, args, deadline, queue_samples)
+    )]
+    for index in range(args.clients + args.viewers):
+        client = Client(host, port, recorder, args, args.seed + index)
+        threads.append(threading.Thread(
+                target=(
+                        client.run_presser if index < args.clients
+                        else client.run_viewer
+                ),
+                args=(deadline,)
+        ))
+
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.monotonic() - start
+
+    summary = recorder.summary(duration)
+    queues = {
+            device_id: {
+                    'max': max(samples),
+                    'mean': round(sum(samples) / len(samples), 2),
+                    'p99': percentile(sorted(samples), 0.99)
+            }
+            for device_id, samples in sorted(queue_samples.items())
+    }
+
+    print(
+            f'{args.clients} clients, {args.viewers} viewers, '
+            f'{duration:.1f} s against {args.base_url}\n'
+    )
+    print(
+            f"{'endpoint':<12} {'requests':>8} {'errors':>7} {'req/s':>7} "
+            f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}"
+    )
+    for endpoint, values in summary.items():
+        print(
+                f"{endpoint:<12} {values['requests']:>8} "
+                f"{values['error_rate'] * 100:>6.1f}% "
+                f"{values['throughput_rps']:>7.1f} "
+                f"{values['p50_ms']:>8.1f} {values['p90_ms']:>8.1f} "
+                f"{values['p99_ms']:>8.1f}"
+        )
+
+    print('\nIR box queue depth (messages awaiting a response):')
+    if not queues:
+        print('  not available (no /pool/stats)')
+    for device_id, values in queues.items():
+        print(
+                f"  {device_id}: max {values['max']}, mean {values['mean']}, "
+                f"p99 {values['p99']}"
+        )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(
+                    {
+                            'args': vars(args),
+                            'duration': round(duration, 2),
+                            'endpoints': summary,
+                            'queues': queues
+                    },
+                    output,
+                    indent=2
+            )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,582 @@
+"""
+Contains class to facilitate asynchronous communication with the IR box using
+its protocol.
+"""
+
+import asyncio
+import contextvars
+import logging
+
+from irbox.errors import IrboxError
+from irbox.errors import MalformedArgumentsError
+from irbox.message import Message
+from irbox.pending import PendingStore
+from irbox.ring_buffer import RingBuffer
+from irbox.count_generator import count_generator
+
+logger = logging.getLogger(__name__)
+
+class _AsyncMessage(Message):
+    # pylint: disable=too-few-public-methods
+
+    """
+    A pending message whose response resolves a future, so that it can be
+    awaited.
+
+    Attributes:
+        future (Future): Resolved with the response, or with `None` if the
+            response was lost.
+    """
+
+    __slots__ = ('future',)
+
+    def __init__(self, message_id, request, future):
+        """
+        Args:
+            message_id (int): Message ID.
+            request (str): The message sent that this message is a response
+                to.
+            future (Future): Resolved with the response.
+        """
+
+        super().__init__(message_id, request)
+        self.future = future
+
+    def resolve(self, response):
+        """
+        Resolves the future, unless it is already done (e.g., cancelled by
+        `AsyncIrBox.close()`).
+
+        Args:
+            response (str): The response, or `None` if it was lost.
+        """
+
+        if not self.future.done():
+            self.future.set_result(response)
+
+class AsyncIrBox:
+    # pylint: disable=too-many-instance-attributes
+
+    """
+    Class to facilitate asynchronous communication with the IR box using its
+    protocol, built on asyncio streams. Offers the same commands as `IrBox`,
+    as coroutines. Waiting callers hold no thread, only a future.
+
+    All coroutines must be awaited on the same event loop.
+
+    Attributes:
+        _TIMEOUT (int): Timeout (in seconds) for connection and to wait for
+            messages to be received.
+        _reader (StreamReader): Stream to read from.
+        _writer (StreamWriter): Stream to write to.
+        _reader_task (Task): Task that runs `_read()`.
+        _message_count_generator (generator of int): Transmitted message count
+            generator.
+        _messages (PendingStore): Messages awaiting a response, in the order
+            they were sent. Each response resolves the oldest message whose
+            request it echoes. Messages whose response timed out are
+            abandoned there, so a late response is discarded rather than
+            given to the next message.
+        _write_lock (Lock): Held while registering a message and writing it,
+            so that `_messages` order always matches the order messages are
+            written.
+        _connect_lock (Lock): Held while lazily reconnecting, so that only
+            one task reconnects.
+        _response (ContextVar): Last response received from the IR box by the
+            calling task.
+        _retry (bool): Whether or not to assume the connection has been
+            destroyed after a failed transmission.
+        rx_messages (RingBuffer): ```tx()``` commands written by the IR box
+            in receive mode, most recent last.
+        _rx_cursor (int): `rx_messages` cursor used by `get_rx_message()`.
+        _rx_mode (bool): Whether or not the IR box is in receive mode.
+    """
+
+    _TIMEOUT = 5
+
+    def __init__(self, host=None, port=None):
+        """
+        Constructor notes host and port. The connection is established on the
+        first command, or by awaiting `connect()`.
+
+        Args:
+            host (str): The host to connect to.
+            port (int): The port to connect to.
+        """
+
+        self.host = host
+        self.port = port
+
+        # No streams to start
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+
+        # Build generators
+        self._message_count_generator = count_generator()
+
+        # Initialize pending messages table
+        self._messages = PendingStore()
+
+        # Locks bind to an event loop on first use, not here
+        self._write_lock = asyncio.Lock()
+        self._connect_lock = asyncio.Lock()
+
+        # No response by default
+        self._response = contextvars.ContextVar('response', default=None)
+
+        # Do not retry by default
+        self._retry = False
+
+        # Not in receive mode to start
+        self.rx_messages = RingBuffer()
+        self._rx_cursor = self.rx_messages.cursor
+        self._rx_mode = False
+
+    @property
+    def retry(self):
+        """
+        Whether or not to attempt to reconnect on response timeout.
+
+        Returns:
+            bool: Whether or not to attempt to reconnect on response timeout.
+        """
+
+        return self._retry
+
+    @retry.setter
+    def retry(self, retry):
+        """
+        Whether or not to attempt to reconnect on response timeout.
+
+        Args:
+            retry (bool): Whether or not to attempt to reconnect on response
+                timeout.
+        """
+
+        self._retry = retry
+
+    @property
+    def response(self):
+        """
+        Returns the last response received from the IR box by the calling
+        task.
+
+        Returns:
+            str: The last response received.
+        """
+
+        return self._response.get()
+
+    async def connect(self, host, port, soft_connect=False):
+        """
+        Connects to the IR box.
+
+        Args:
+            host (str): The host to connect to.
+            port (int): The port to connect to.
+            soft_connect (bool): Whether or not to perform a "soft connect."
+                This means only noting host and port, but saving the actual
+                connection for later.
+
+        Raises:
+            IrboxError: An IR box error.
+        """
+
+        # Note host and port for future _reconnect()
+        self.host = host
+        self.port = port
+
+        # If this is a "soft connect," don't actually connect now
+        if soft_connect:
+            return
+
+        async with self._write_lock:
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                        asyncio.open_connection(host, port),
+                        self._TIMEOUT
+                )
+            except asyncio.TimeoutError as timeout_error:
+                raise IrboxError(TimeoutError()) from timeout_error
+            except OSError as os_error:
+                logger.warning('Connection failed')
+                raise IrboxError(os_error) from os_error
+
+            # Expect + before the reader task can see the new streams
+            pending = self._register_message()
+            self._reader_task = asyncio.ensure_future(self._read(self._reader))
+
+        # Wait for +
+        if not await self._await_response(pending, '', False):
+            raise IrboxError(TimeoutError())
+
+        logger.info('Connected')
+
+    async def nop(self):
+        """
+        Sends a ```nop``` command to the IR box.
+
+        Returns:
+            bool: A value indicating whether or not the IR box responded
+                positively to the ```nop``` command.
+
+        Raises:
+            IrboxError: An IR box error.
+        """
+
+        return await self._send_message('nop')
+
+    async def tx(self, args): # pylint: disable=invalid-name
+        """
+        Sends a ```tx``` command to the IR box.
+
+        Args:
+            args (list of str): ```tx()``` arguments to join with commas.
+
+        Returns:
+            bool: A value indicating whether or not the IR box responded
+                positively to the ```tx``` command.
+
+        Raises:
+            IrboxError: An IR box error.
+            MalformedArgumentsError: Unable to parse arguments.
+        """
+
+        try:
+            message = ','.join(args)
+        except TypeError as type_error:
+            raise MalformedArgumentsError from type_error
+
+        return await self._send_message(f'tx({message})')
+
+    async def rx(self): # pylint: disable=invalid-name
+        """
+        Sends an ```rx``` command to the IR box, putting it in receive mode.
+
+        Returns:
+            bool: A value indicating whether or not the IR box responded
+                positively to the ```rx``` command.
+
+        Raises:
+            IrboxError: An IR box error.
+        """
+
+        # Route captures to rx_messages as soon as the IR box could send them
+        self._rx_mode = True
+
+        try:
+            success = await self._send_message('rx')
+        except IrboxError:
+            self._rx_mode = False
+            raise
+
+        if not success:
+            self._rx_mode = False
+
+        return success
+
+    async def get_rx_messages(self, cursor=None):
+        """
+        Returns the ```tx()``` commands written by the IR box in receive mode
+        since a cursor. Never waits.
+
+        Args:
+            cursor (int): The cursor returned by the previous call, or `None`
+                to start from now.
+
+        Returns:
+            tuple of (list of str, int): The ```tx()``` commands, oldest
+                first, and the cursor to pass to the next call.
+        """
+
+        return self.rx_messages.read(cursor)
+
+    async def get_rx_message(self):
+        """
+        Returns the next ```tx()``` command written by the IR box in receive
+        mode, following a single cursor shared by all callers. Never waits.
+        Use `get_rx_messages()` instead where several readers each need every
+        command.
+
+        Returns:
+            str: The ```tx()``` command, or `None` if the IR box has not
+                written one yet.
+        """
+
+        # No await between reading and stepping the cursor, so no lock is
+        # needed on a single event loop
+        messages, _ = self.rx_messages.read(self._rx_cursor)
+        if not messages:
+            self._response.set(None)
+            return None
+
+        # Step past the returned message only
+        self._rx_cursor = self.rx_messages.cursor - len(messages) + 1
+        self._response.set(messages[0])
+
+        return messages[0]
+
+    async def norx(self):
+        """
+        Sends a ```norx``` command to the IR box. This exits receive mode.
+
+        Returns:
+            bool: A value indicating whether or not the IR box responded
+                positively to the ```norx``` command.
+
+        Raises:
+            IrboxError: An IR box error.
+        """
+
+        success = await self._send_message('norx')
+
+        if success:
+            self._rx_mode = False
+
+        return success
+
+    async def invalid(self):
+        """
+        Sends an ```invalid``` command to the IR box (for debugging purposes).
+        Should always return `False`.
+
+        Returns:
+            bool: A value indicating whether or not the IR box responded
+                positively to the ```invalid``` command.
+
+        Raises:
+            IrboxError: An IR box error.
+        """
+
+        return await self._send_message('invalid')
+
+    async def close(self):
+        """
+        Terminates the connection.
+        """
+
+        writer = self._writer
+        self._reader = None
+        self._writer = None
+
+        # Fail anything still waiting on this connection
+        for pending in self._messages.clear():
+            pending.future.cancel()
+
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+            logger.info('Connection closed')
+
+    async def _send_message(self, message, retry=True):
+        """
+        Sends a message to the IR box.
+
+        Args:
+            message (str): The message to send. Must contain only ASCII
+                characters.
+            retry (bool): Whether or not to reconnect and try once more after
+                a response timeout, if `_retry` is enabled.
+
+        Returns:
+            bool: A value indicating whether or not a positive response was
+                received within `_TIMEOUT`.
+
+        Raises:
+            IrboxError: An IR box error.
+        """
+
+        encoded = message.encode('ascii')
+
+        # If the connection has been destroyed, reestablish first
+        if encoded != b'' and self._writer is None:
+            async with self._connect_lock:
+                if self._writer is None:
+                    await self.connect(self.host, self.port)
+
+        async with self._write_lock:
+            # Make room, dropping timed out messages whose responses never
+            # came
+            self._messages.reserve(1)
+            pending = self._register_message(message)
+
+            if encoded != b'':
+                try:
+                    self._writer.write(encoded + b'\r\n')
+                    await self._writer.drain()
+                except (AttributeError, ConnectionError) as connection_error:
+                    await self.close()
+                    raise IrboxError(connection_error) from connection_error
+
+        logger.debug('Message: [%s]', message)
+
+        return await self._await_response(pending, message, retry)
+
+    def _register_message(self, request=''):
+        """
+        Adds a new message to the pending messages table. Must be called with
+        the write lock held, immediately before the message is written, and
+        after making room with `PendingStore.reserve()` (except right after a
+        connect).
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            request (str): The message about to be written.
+
+        Returns:
+            _AsyncMessage: The new pending message.
+
+        Raises:
+            IrboxError: The pending messages table is full.
+        """
+
+        pending = _AsyncMessage(
+                next(self._message_count_generator),
+                request,
+                asyncio.get_running_loop().create_future()
+        )
+        self._messages.add(pending)
+
+        return pending
+
+    async def _await_response(self, pending, message, retry):
+        """
+        Waits for the reader task to resolve a pending message.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            pending (_AsyncMessage): The pending message.
+            message (str): The message that was sent, for a retry.
+            retry (bool): Whether or not to reconnect and try once more after
+                a response timeout, if `_retry` is enabled.
+
+        Returns:
+            bool: A value indicating whether or not a positive response was
+                received within `_TIMEOUT`.
+
+        Raises:
+            IrboxError: An IR box error.
+        """
+
+        future = pending.future
+
+        try:
+            # Shield the future, so that cancelling the caller's task isn't
+            # mistaken for close() cancelling the future
+            response = await asyncio.wait_for(
+                    asyncio.shield(future),
+                    self._TIMEOUT
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError) as error:
+            # Only swallow cancellation of the future itself (by close())
+            if isinstance(error, asyncio.CancelledError) and not future.cancelled():
+                raise
+
+            response = None
+
+        if response is not None:
+            self._response.set(response)
+            return response[:1] == '+'
+
+        if future.done() and not future.cancelled():
+            failure = 'Response lost'
+        else:
+            # Leave the message behind, so its response is discarded if it
+            # arrives late
+            failure = 'Response timeout'
+            self._messages.abandon(pending)
+
+        logger.debug(failure)
+
+        # If retry is enabled, reconnect and try again
+        if retry and self._retry:
+            await self.close()
+            await self.connect(self.host, self.port)
+            return await self._send_message(message, False)
+
+        self._response.set(failure)
+        return False
+
+    async def _read(self, reader):
+        """
+        Reads messages from the IR box and resolves the oldest pending message
+        whose request each one echoes, resolving any messages in front of it
+        as lost, and discarding late responses to abandoned messages and
+        responses that echo nothing pending. Runs until the connection is
+        closed.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            reader (StreamReader): Stream to read from.
+        """
+
+        while True:
+            try:
+                line = await reader.readuntil(b'\r\n')
+            except (asyncio.IncompleteReadError, ConnectionError):
+                line = None
+
+            if line is None:
+                # Connection closed, unless we've already moved on to a new
+                # connection
+                if reader is self._reader:
+                    await self.close()
+                return
+
+            message = line[:-2].decode('ascii')
+
+            # In receive mode, captures go to rx_messages rather than
+            # resolving a pending future
+            if self._rx_mode and self._is_capture(message):
+                self.rx_messages.append(message)
+                logger.debug('Capture: [%s]', message)
+                continue
+
+            try:
+                pending, lost = self._messages.pop(message)
+            except KeyError:
+                # Not a response to anything pending (e.g., a duplicate), so
+                # nobody gets it
+                logger.debug('Unexpected response: [%s]', message)
+                continue
+
+            # The IR box answers in order, so anything in front never will
+            for skipped in lost:
+                logger.debug('Lost response(%d)', skipped.message_id)
+                skipped.resolve(None)
+
+            # Nobody is waiting for a late response
+            if pending.abandoned:
+                logger.debug('Late response(%d): [%s]', pending.message_id, message)
+                continue
+
+            pending.resolve(message)
+            logger.debug('Response(%d): [%s]', pending.message_id, message)
+
+    def _is_capture(self, message):
+        """
+        Determines whether or not a message read in receive mode is a
+        ```tx()``` command the IR box captured, as opposed to the response to
+        a ```tx``` command still pending.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            message (str): The message, without `\r\n`.
+
+        Returns:
+            bool: Whether or not the message is a capture.
+        """
+
+        if not message.startswith('+tx('):
+            return False
+
+        return not self._messages.matches(message)
@@ -0,0 +1,914 @@
+"""
+Contains classes to share IR box connections between processes. A broker
+process alone owns each device's connection, and other processes (e.g., WSGI
+workers) send it commands over a Unix domain socket through `BrokerClient`,
+a drop-in replacement for `IrBox`.
+
+The broker and its clients exchange JSON objects, one per `\\r\\n`-terminated
+line. Each request carries an `id`, a `device` ID, a `method`, and `args`;
+each reply carries the same `id` and either a `result` (along with the
+device's `response` and `responses`) or an `error`. Replies may arrive out of
+order, so several requests can be in flight on one connection at once, and
+the broker pipelines them to the IR box just as `IrBox` does for threads.
+"""
+
+import inspect
+import json
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from irbox.count_generator import count_generator
+from irbox.errors import IrboxError
+from irbox.errors import MalformedArgumentsError
+from irbox.errors import NotConnectedError
+from irbox.errors import QueueFullError
+from irbox.errors import UnsupportedProtocolError
+from irbox.line_reader import LineReader
+from irbox.message import Message
+from irbox.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+_TERMINATOR = b'\r\n'
+"""
+Line terminator.
+"""
+
+_COMMANDS = frozenset((
+        'nop',
+        'tx',
+        'tx_many',
+        'rx',
+        'get_rx_messages',
+        'get_rx_message',
+        'norx',
+        'invalid',
+        'close',
+        'reconnect',
+        'stats'
+))
+"""
+`IrBox` methods clients may call, by name.
+"""
+
+_ERRORS = {
+        error.__name__: error
+        for error in (
+                MalformedArgumentsError,
+                NotConnectedError,
+                QueueFullError,
+                UnsupportedProtocolError
+        )
+}
+"""
+`IrboxError` subclasses, keyed by name, so clients can raise the same
+exception the broker caught. All take no arguments, except that
+`QueueFullError` takes the `retry_after` sent along with it.
+"""
+
+def _invoke(function, args):
+    """
+    Calls a function with a request's arguments. Only arguments that don't
+    fit the function's signature count as malformed, so a `TypeError` raised
+    by the function itself is not mistaken for one.
+
+    Args:
+        function (function): The function.
+        args (list): The arguments.
+
+    Returns:
+        object: The function's result.
+
+    Raises:
+        MalformedArgumentsError: The arguments don't fit the function.
+    """
+
+    try:
+        inspect.signature(function).bind(*args)
+    except TypeError as type_error:
+        raise MalformedArgumentsError from type_error
+
+    return function(*args)
+
+def _encode(message):
+    """
+    Encodes a protocol message.
+
+    Args:
+        message (dict): The message.
+
+    Returns:
+        bytes: The encoded message, including its terminator.
+    """
+
+    return json.dumps(message, separators=(',', ':')).encode('utf-8') + _TERMINATOR
+
+class Broker:
+    """
+    Class to serve a pool's devices to other processes over a Unix domain
+    socket. Accepts any number of connections, each read on its own thread,
+    and runs requests on a bounded pool of worker threads, so that a slow
+    command never delays the requests behind it until every worker is busy.
+    `rx_wait` long polls (one per receive mode viewer) run on a separate
+    bounded pool, so viewers can't take workers from commands.
+
+    Attributes:
+        _WORKERS (int): Maximum number of requests other than `rx_wait` run
+            at once. Further requests wait for a free worker.
+        _WAITERS (int): Maximum number of `rx_wait` requests run at once.
+            Further ones wait for a free waiter.
+        _pool (IrBoxPool): The devices served.
+        _path (str): Path of the Unix domain socket.
+        _server (socket): Listening socket.
+        _connections (set of socket): Open connections.
+        _lock (Lock): Guards `_connections`.
+        _stop_event (Event): Set to stop the broker.
+        _thread (Thread): Accept thread.
+        _executor (ThreadPoolExecutor): Runs requests other than
+            `rx_wait`.
+        _wait_executor (ThreadPoolExecutor): Runs `rx_wait` requests.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    _WORKERS = 32
+    _WAITERS = 32
+
+    def __init__(self, pool, path):
+        """
+        Args:
+            pool (IrBoxPool): The devices to serve.
+            path (str): Path of the Unix domain socket to listen on.
+        """
+
+        self._pool = pool
+        self._path = path
+        self._server = None
+        self._connections = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._executor = None
+        self._wait_executor = None
+
+    def start(self):
+        """
+        Starts listening, if not already listening. Replaces any stale socket
+        left behind by a previous broker. The socket is only accessible to
+        its owner and group.
+        """
+
+        if self._thread is not None:
+            return
+
+        try:
+            os.unlink(self._path)
+        except FileNotFoundError:
+            pass
+
+        # Create the socket with its final permissions, so that it is never
+        # open to other users, even briefly
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o117)
+        try:
+            self._server.bind(self._path)
+        finally:
+            os.umask(umask)
+        self._server.listen()
+
+        self._stop_event.clear()
+        self._executor = ThreadPoolExecutor(
+                max_workers=self._WORKERS,
+                thread_name_prefix='broker'
+        )
+        self._wait_executor = ThreadPoolExecutor(
+                max_workers=self._WAITERS,
+                thread_name_prefix='broker-wait'
+        )
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+
+        logger.info('Listening on %s', self._path)
+
+    def stop(self):
+        """
+        Stops listening, closes every connection, and removes the socket.
+        """
+
+        self._stop_event.set()
+
+        if self._server is not None:
+            try:
+                self._server.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._server.close()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            connection.close()
+
+        for executor in (self._executor, self._wait_executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._wait_executor = None
+
+        try:
+            os.unlink(self._path)
+        except FileNotFoundError:
+            pass
+
+    def call(self, device_id, method, args):
+        """
+        Runs a request against a device.
+
+        Args:
+            device_id (str): The device ID, or `None` for requests about the
+                broker itself.
+            method (str): The method name.
+            args (list): The method's arguments.
+
+        Returns:
+            dict: The reply, without its ID.
+        """
+
+        # pylint: disable=too-many-return-statements
+
+        try:
+            if method == 'devices':
+                return {'result': sorted(self._pool.devices())}
+
+            device = self._pool.devices().get(device_id)
+            if device is None:
+                return {'error': f"Unknown device `{device_id}'"}
+
+            if method in _COMMANDS:
+                result = _invoke(getattr(device, method), args)
+                return {
+                        'result': result,
+                        'response': device.response,
+                        'responses': device.responses
+                }
+            if method in ('connected', 'idle'):
+                return {'result': getattr(device, method)}
+            if method == 'rx_cursor':
+                return {'result': device.rx_messages.cursor}
+            if method == 'rx_wait':
+                return {'result': _invoke(device.rx_messages.wait, args)}
+            if method == 'counters':
+                return {'result': device.metrics.counters()}
+            if method == 'latency':
+                return {'result': [
+                        [command, protocol, buckets, total, count]
+                        for (command, protocol), (buckets, total, count)
+                        in device.metrics.latency().items()
+                ]}
+
+            return {'error': f"Unknown method `{method}'"}
+        except QueueFullError as queue_full_error:
+            return {
+                    'error': queue_full_error.message,
+                    'error_type': QueueFullError.__name__,
+                    'retry_after': queue_full_error.retry_after
+            }
+        except IrboxError as irbox_error:
+            return {
+                    'error': irbox_error.message,
+                    'error_type': type(irbox_error).__name__
+            }
+        except Exception as exception: # pylint: disable=broad-except
+            # Reply anyway, so the client isn't left waiting for a reply that
+            # will never come
+            logger.exception('Request failed: %s', method)
+            return {'error': str(exception) or type(exception).__name__}
+
+    def _accept(self):
+        """
+        Accept thread main loop.
+
+        This is a low-level method and not meant to be called directly.
+        """
+
+        while not self._stop_event.is_set():
+            try:
+                connection, _ = self._server.accept()
+            except OSError:
+                # Server socket closed
+                return
+
+            with self._lock:
+                self._connections.add(connection)
+
+            threading.Thread(
+                    target=self._serve,
+                    args=(connection,),
+                    daemon=True
+            ).start()
+
+    def _serve(self, connection):
+        """
+        Reads requests from one connection until it is closed.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            connection (socket): The connection.
+        """
+
+        write_lock = threading.Lock()
+
+        def write(reply):
+            with write_lock:
+                connection.sendall(_encode(reply))
+
+        try:
+            line_reader = LineReader(connection)
+            while True:
+                line = line_reader.readline()
+                if line is None:
+                    break
+
+                try:
+                    request = json.loads(line)
+                    request_id = request['id']
+                except (ValueError, KeyError, TypeError):
+                    logger.warning('Malformed request: %r', line)
+                    continue
+
+                # Keep long polls from taking workers from commands
+                if request.get('method') == 'rx_wait':
+                    executor = self._wait_executor
+                else:
+                    executor = self._executor
+
+                try:
+                    executor.submit(self._handle, request_id, request, write)
+                except (AttributeError, RuntimeError):
+                    # Executor shut down (or already dropped) by stop()
+                    break
+        except OSError:
+            # Connection reset or closed by stop()
+            pass
+        finally:
+            with self._lock:
+                self._connections.discard(connection)
+            connection.close()
+
+    def _handle(self, request_id, request, write):
+        """
+        Runs one request and writes its reply.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            request_id (int): The request ID.
+            request (dict): The request.
+            write (function): Writes a reply to the connection.
+        """
+
+        reply = self.call(
+                request.get('device'),
+                request.get('method'),
+                request.get('args') or []
+        )
+        reply['id'] = request_id
+
+        try:
+            write(reply)
+        except OSError:
+            # Client went away
+            pass
+
+class BrokerConnection:
+    """
+    Class to send requests to a broker over one Unix domain socket shared by
+    every thread (and every `BrokerClient`) in the process. Requests are
+    written under a lock and a reader thread matches replies to them by ID,
+    so concurrent callers are pipelined. Connects on first use, and again on
+    the next request after the broker goes away.
+
+    Attributes:
+        _TIMEOUT (int): Seconds to wait for a reply, beyond any wait the
+            request itself asks for. Generous, since the broker may retry a
+            command or transmit many repeats before replying.
+        path (str): Path of the broker's Unix domain socket.
+        _socket (socket): Connection to the broker.
+        _request_id_generator (generator of int): Request ID generator.
+        _pending (dict of int to Message): Requests awaiting a reply, keyed
+            by request ID. Each reply is set as the message.
+        _lock (Lock): Guards `_pending`.
+        _write_lock (Lock): Held while connecting and writing.
+    """
+
+    _TIMEOUT = 30
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Path of the broker's Unix domain socket.
+        """
+
+        self.path = path
+        self._socket = None
+        self._request_id_generator = count_generator()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def call(self, device_id, method, *args, wait=0):
+        """
+        Sends a request and waits for its reply.
+
+        Args:
+            device_id (str): The device ID, or `None` for requests about the
+                broker itself.
+            method (str): The method name.
+            args (list): The method's arguments.
+            wait (float): Seconds the request itself may block for, added to
+                the reply timeout.
+
+        Returns:
+            dict: The reply.
+
+        Raises:
+            IrboxError: The broker is unreachable, timed out, or replied with
+                an error.
+        """
+
+        with self._write_lock:
+            if self._socket is None:
+                self._connect()
+
+            pending = Message(next(self._request_id_generator))
+            with self._lock:
+                self._pending[pending.message_id] = pending
+
+            try:
+                self._socket.sendall(_encode({
+                        'id': pending.message_id,
+                        'device': device_id,
+                        'method': method,
+                        'args': args
+                }))
+            except OSError as os_error:
+                with self._lock:
+                    self._pending.pop(pending.message_id, None)
+                self._disconnect()
+                raise IrboxError(os_error) from os_error
+
+        if not pending.wait(self._TIMEOUT + wait):
+            with self._lock:
+                self._pending.pop(pending.message_id, None)
+            raise IrboxError(TimeoutError())
+
+        reply = pending.message
+        if 'error' in reply:
+            error = _ERRORS.get(reply.get('error_type'))
+            if error is QueueFullError:
+                raise QueueFullError(reply.get('retry_after', 1))
+            raise error() if error is not None else IrboxError(reply['error'])
+
+        return reply
+
+    def devices(self):
+        """
+        Returns the IDs of the devices the broker serves.
+
+        Returns:
+            list of str: The device IDs.
+
+        Raises:
+            IrboxError: The broker is unreachable.
+        """
+
+        return self.call(None, 'devices')['result']
+
+    def close(self):
+        """
+        Closes the connection to the broker.
+        """
+
+        with self._write_lock:
+            self._disconnect()
+
+    def _connect(self):
+        """
+        Connects to the broker and starts a reader thread for the connection.
+        Call with `_write_lock` held.
+
+        This is a low-level method and not meant to be called directly.
+
+        Raises:
+            IrboxError: The broker is unreachable.
+        """
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError as os_error:
+            sock.close()
+            logger.warning('Unable to reach broker at %s', self.path)
+            raise IrboxError(os_error) from os_error
+
+        self._socket = sock
+        threading.Thread(target=self._read, args=(sock,), daemon=True).start()
+
+    def _disconnect(self):
+        """
+        Closes the connection to the broker, if any. Call with `_write_lock`
+        held.
+
+        This is a low-level method and not meant to be called directly.
+        """
+
+        if self._socket is None:
+            return
+
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+        self._socket = None
+
+    def _read(self, sock):
+        """
+        Reader thread main loop for one connection. Fails every pending
+        request when the connection closes, since their replies will never
+        arrive.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            sock (socket): The connection.
+        """
+
+        line_reader = LineReader(sock)
+
+        try:
+            while True:
+                line = line_reader.readline()
+                if line is None:
+                    break
+
+                try:
+                    reply = json.loads(line)
+                except ValueError:
+                    logger.warning('Malformed reply: %r', line)
+                    continue
+
+                with self._lock:
+                    pending = self._pending.pop(reply.get('id'), None)
+                if pending is not None:
+                    pending.message = reply
+        except OSError:
+            pass
+
+        logger.warning('Lost connection to broker')
+
+        with self._write_lock:
+            if self._socket is sock:
+                self._disconnect()
+
+        with self._lock:
+            pending_list = list(self._pending.values())
+            self._pending.clear()
+        for pending in pending_list:
+            pending.message = {'error': 'Broker connection closed'}
+
+class BrokerClient:
+    """
+    Drop-in replacement for `IrBox` that sends each command to a device
+    owned by a broker. Connection settings (`retry`, `timing`, keepalives,
+    and so on) are the broker's; they are accepted here but have no effect.
+
+    Attributes:
+        device_id (str): The device ID on the broker.
+        host (str): Noted by `connect()`. Not used.
+        port (int): Noted by `connect()`. Not used.
+        retry (bool): Not used.
+        fail_fast (bool): Not used.
+        timing (TimingModel): Not used.
+        metrics (BrokerMetrics): The device's metrics, fetched from the
+            broker.
+        rx_messages (BrokerRingBuffer): The device's receive mode captures,
+            read through the broker.
+        _connection (BrokerConnection): Connection to the broker.
+        _local (local): Per-thread state. `_local.response` and
+            `_local.responses` are as for `IrBox`.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, connection, device_id='default'):
+        """
+        Args:
+            connection (BrokerConnection): Connection to the broker.
+            device_id (str): The device ID on the broker.
+        """
+
+        self.device_id = device_id
+        self.host = None
+        self.port = None
+        self.retry = False
+        self.fail_fast = False
+        self.timing = None
+        self.metrics = BrokerMetrics(self)
+        self.rx_messages = BrokerRingBuffer(self)
+        self._connection = connection
+        self._local = threading.local()
+
+    @property
+    def connected(self):
+        """
+        Whether or not the broker is reachable and connected to the IR box.
+
+        Returns:
+            bool: Whether or not there is a connection.
+        """
+
+        try:
+            return self.call('connected')
+        except IrboxError:
+            return False
+
+    @property
+    def idle(self):
+        """
+        Returns the number of seconds since the IR box last responded.
+
+        Returns:
+            float: Seconds since the last response was received.
+
+        Raises:
+            IrboxError: The broker is unreachable.
+        """
+
+        return self.call('idle')
+
+    @property
+    def response(self):
+        """
+        Returns the last response received from the IR box by the calling
+        thread.
+
+        Returns:
+            str: The last response received.
+        """
+
+        return getattr(self._local, 'response', None)
+
+    @property
+    def responses(self):
+        """
+        Returns the responses received from the IR box by the calling thread's
+        last `tx_many()` call.
+
+        Returns:
+            list of str: The responses received, in order.
+        """
+
+        return getattr(self._local, 'responses', None)
+
+    def call(self, method, *args, wait=0):
+        """
+        Calls a method on the device through the broker, noting the device's
+        responses for the calling thread.
+
+        Args:
+            method (str): The method name.
+            args (list): The method's arguments.
+            wait (float): Seconds the method itself may block for.
+
+        Returns:
+            object: The method's result.
+
+        Raises:
+            IrboxError: An IR box error, or the broker is unreachable.
+        """
+
+        reply = self._connection.call(self.device_id, method, *args, wait=wait)
+
+        if 'response' in reply:
+            self._local.response = reply['response']
+            self._local.responses = reply['responses']
+
+        return reply['result']
+
+    def connect(self, host, port, soft_connect=False):
+        """
+        Notes host and port, and, unless soft connecting, checks that the
+        broker is reachable. The broker decides where the IR box is.
+
+        Args:
+            host (str): Not used.
+            port (int): Not used.
+            soft_connect (bool): Whether or not to skip the check.
+
+        Raises:
+            IrboxError: The broker is unreachable.
+        """
+
+        self.host = host
+        self.port = port
+
+        if not soft_connect:
+            self.call('connected')
+
+    def stats(self):
+        """
+        Returns connection and message statistics (see `IrBox.stats()`).
+        While the broker is unreachable, reports no connection and zero
+        counts.
+
+        Returns:
+            dict: Statistics.
+        """
+
+        try:
+            return self.call('stats')
+        except IrboxError:
+            return {
+                    'host': self.host,
+                    'port': self.port,
+                    'connected': False,
+                    'pending': 0,
+                    'abandoned': 0,
+                    'capacity': 0,
+                    'sent': 0,
+                    'received': 0,
+                    'timeouts': 0
+            }
+
+    def nop(self):
+        """
+        See `IrBox.nop()`.
+        """
+
+        return self.call('nop')
+
+    def tx(self, args): # pylint: disable=invalid-name
+        """
+        See `IrBox.tx()`.
+        """
+
+        return self.call('tx', args)
+
+    def tx_many(self, commands):
+        """
+        See `IrBox.tx_many()`.
+        """
+
+        return self.call('tx_many', commands)
+
+    def rx(self): # pylint: disable=invalid-name
+        """
+        See `IrBox.rx()`.
+        """
+
+        return self.call('rx')
+
+    def get_rx_messages(self, cursor=None):
+        """
+        See `IrBox.get_rx_messages()`. Cursors are the broker's, so they are
+        valid in every process.
+        """
+
+        messages, cursor = self.call('get_rx_messages', cursor)
+
+        return (messages, cursor)
+
+    def get_rx_message(self):
+        """
+        See `IrBox.get_rx_message()`. The cursor is shared by every process.
+        """
+
+        return self.call('get_rx_message')
+
+    def norx(self):
+        """
+        See `IrBox.norx()`.
+        """
+
+        return self.call('norx')
+
+    def invalid(self):
+        """
+        See `IrBox.invalid()`.
+        """
+
+        return self.call('invalid')
+
+    def close(self):
+        """
+        Terminates the broker's connection to the IR box (see
+        `IrBox.close()`).
+        """
+
+        self.call('close')
+
+    def reconnect(self):
+        """
+        Has the broker reconnect to the IR box (see `IrBox.reconnect()`).
+        """
+
+        self.call('reconnect')
+
+class BrokerRingBuffer:
+    """
+    Read-only stand-in for a device's `rx_messages` (see `RingBuffer`),
+    read through the broker.
+
+    Attributes:
+        _client (BrokerClient): The device.
+    """
+
+    def __init__(self, client):
+        """
+        Args:
+            client (BrokerClient): The device.
+        """
+
+        self._client = client
+
+    @property
+    def cursor(self):
+        """
+        See `RingBuffer.cursor`.
+        """
+
+        return self._client.call('rx_cursor')
+
+    def read(self, cursor=None):
+        """
+        See `RingBuffer.read()`.
+        """
+
+        return self._client.get_rx_messages(cursor)
+
+    def wait(self, cursor, timeout=None):
+        """
+        See `RingBuffer.wait()`. `timeout` is required in practice, since
+        the broker holds a thread for the duration.
+        """
+
+        return self._client.call('rx_wait', cursor, timeout, wait=timeout or 0)
+
+class BrokerMetrics:
+    """
+    Read-only stand-in for a device's `metrics` (see `Metrics`), fetched from
+    the broker. Zeroed while the broker is unreachable.
+
+    Attributes:
+        _client (BrokerClient): The device.
+    """
+
+    def __init__(self, client):
+        """
+        Args:
+            client (BrokerClient): The device.
+        """
+
+        self._client = client
+
+    def counters(self):
+        """
+        See `Metrics.counters()`.
+        """
+
+        try:
+            return self._client.call('counters')
+        except IrboxError:
+            return dict.fromkeys(Metrics.COUNTERS, 0)
+
+    def latency(self):
+        """
+        See `Metrics.latency()`.
+        """
+
+        try:
+            histograms = self._client.call('latency')
+        except IrboxError:
+            return {}
+
+        return {
+                (command, protocol): (
+                        [tuple(bucket) for bucket in buckets],
+                        total,
+                        count
+                )
+                for command, protocol, buckets, total, count in histograms
+        }
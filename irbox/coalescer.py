@@ -0,0 +1,253 @@
+"""
+Contains class to merge repeated identical button presses into one
+transmission.
+"""
+
+import logging
+import threading
+import time
+
+from irbox.errors import IrboxError
+from irbox.protocol import Protocol
+from irbox.scheduler import Priority
+
+logger = logging.getLogger(__name__)
+
+class _Batch:
+    # pylint: disable=too-few-public-methods,too-many-instance-attributes
+
+    """
+    Identical presses being merged into one transmission.
+
+    Attributes:
+        args (list of str): ```tx()``` arguments of the first press, sent as
+            is if no other press joins.
+        base (list of str): ```tx()``` arguments without repeats.
+        frames (int): Total frames requested (each press's repeats plus one).
+        longest (int): Most repeats requested by a single press, which are
+            never capped.
+        presses (int): Number of presses merged.
+        done (Event): Set once the transmission has completed.
+        success (bool): Whether or not the IR box responded positively.
+        response (str): The IR box response.
+        error (IrboxError): Error raised by the transmission, if any.
+    """
+
+    __slots__ = (
+            'args',
+            'base',
+            'frames',
+            'longest',
+            'presses',
+            'done',
+            'success',
+            'response',
+            'error'
+    )
+
+    def __init__(self, args, base, repeats):
+        self.args = args
+        self.base = base
+        self.frames = repeats + 1
+        self.longest = repeats
+        self.presses = 1
+        self.done = threading.Event()
+        self.success = False
+        self.response = None
+        self.error = None
+
+class Coalescer:
+    # pylint: disable=too-few-public-methods
+
+    """
+    Class to merge identical NEC, Apple, and Sony ```tx``` commands sent to
+    the same device within a short window into one ```tx``` command with
+    more repeats. A press with `r` repeats transmits `r + 1` frames, so `n`
+    presses merge into `n * (r + 1) - 1` repeats, capped at `max_repeats` (or
+    the most repeats a single press asked for, if more). Someone hammering a
+    button then costs one IR box round trip per window rather than one per
+    press, and presses don't keep executing long after they stop.
+
+    The first press of a batch waits `window` seconds for more, then
+    transmits for the whole batch; every press in the batch gets the same
+    result. Other commands, and every command while `window` is `0`, are sent
+    as is.
+
+    Attributes:
+        MAX_REPEATS (int): Default cap on merged repeats, so a merged
+            transmission stays well within the IR box response timeout.
+        _TIMEOUT (int): Seconds a press that joined a batch waits for the
+            transmission, beyond `window`. Generous, since the transmission
+            may wait for the scheduler, and be retried, before it completes.
+        window (float): Seconds the first press of a batch waits for more.
+            `0` disables merging.
+        max_repeats (int): Cap on merged repeats.
+        scheduler (Scheduler): Optional. Admits each transmission as
+            `Priority.INTERACTIVE`.
+        _batches (dict of tuple to _Batch): Batches still accepting presses,
+            keyed by device and ```tx()``` arguments without repeats.
+        _lock (Lock): Guards `_batches`.
+    """
+
+    MAX_REPEATS = 20
+    _TIMEOUT = 30
+
+    def __init__(self, window=0, max_repeats=MAX_REPEATS, scheduler=None):
+        """
+        Args:
+            window (float): Seconds the first press of a batch waits for
+                more. `0` disables merging.
+            max_repeats (int): Cap on merged repeats.
+            scheduler (Scheduler): Optional. Admits each transmission as
+                `Priority.INTERACTIVE`.
+        """
+
+        self.window = window
+        self.max_repeats = max_repeats
+        self.scheduler = scheduler
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def tx(self, device, args): # pylint: disable=invalid-name
+        """
+        Sends a ```tx``` command to a device, merged with identical presses.
+
+        Args:
+            device (IrBox): The device.
+            args (list of str): ```tx()``` arguments (see `IrBox.tx()`).
+
+        Returns:
+            tuple of (bool, str, int): Whether or not the IR box responded
+                positively, the IR box response, and the number of presses
+                merged into the transmission (`1` if not merged).
+
+        Raises:
+            IrboxError: An IR box error, or the transmission did not complete
+                in time.
+            MalformedArgumentsError: Unable to parse arguments.
+            QueueFullError: The scheduler turned the transmission away.
+        """
+
+        split = _split_repeats(args) if self.window > 0 else None
+        if split is None:
+            success = self._send(device, args)
+            return (success, device.response, 1)
+
+        base, repeats = split
+        key = (device, tuple(base))
+
+        # Decide who transmits under the lock, since more presses may join
+        # as soon as it is released
+        with self._lock:
+            batch = self._batches.get(key)
+            creator = batch is None
+            if creator:
+                batch = self._batches[key] = _Batch(args, base, repeats)
+            else:
+                # Join the batch; the first press transmits for everyone
+                batch.frames += repeats + 1
+                batch.longest = max(batch.longest, repeats)
+                batch.presses += 1
+
+        if creator:
+            self._transmit(device, key, batch)
+        elif not batch.done.wait(self.window + self._TIMEOUT):
+            raise IrboxError(TimeoutError())
+
+        if batch.error is not None:
+            raise batch.error
+
+        return (batch.success, batch.response, batch.presses)
+
+    def _transmit(self, device, key, batch):
+        """
+        Waits for more presses, then transmits a batch and wakes its other
+        presses.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            device (IrBox): The device.
+            key (tuple): The batch's key in `_batches`.
+            batch (_Batch): The batch.
+        """
+
+        time.sleep(self.window)
+
+        # Close the batch, so later presses start a new one
+        with self._lock:
+            del self._batches[key]
+
+        args = batch.args
+        if batch.presses > 1:
+            repeats = min(
+                    batch.frames - 1,
+                    max(self.max_repeats, batch.longest)
+            )
+            args = batch.base + [hex(repeats)]
+            logger.debug('Merged %d presses: %d repeats', batch.presses, repeats)
+
+        try:
+            batch.success = self._send(device, args)
+            batch.response = device.response
+        except IrboxError as irbox_error:
+            batch.error = irbox_error
+        finally:
+            batch.done.set()
+
+    def _send(self, device, args):
+        """
+        Sends a ```tx``` command, through the scheduler if there is one.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            device (IrBox): The device.
+            args (list of str): ```tx()``` arguments.
+
+        Returns:
+            bool: Whether or not the IR box responded positively.
+
+        Raises:
+            IrboxError: An IR box error.
+        """
+
+        if self.scheduler is None:
+            return device.tx(args)
+
+        return self.scheduler.run(device, Priority.INTERACTIVE, 'tx', args)
+
+def _split_repeats(args):
+    """
+    Splits ```tx()``` arguments into the arguments identifying the command
+    and its repeats.
+
+    Args:
+        args (list of str): ```tx()``` arguments.
+
+    Returns:
+        tuple of (list of str, int): The arguments without repeats, and the
+            repeats (`0` if not given), or `None` if the command is not one
+            that can be merged.
+    """
+
+    try:
+        protocol = Protocol(int(args[0], 0))
+        if protocol in (Protocol.NEC, Protocol.APPLE):
+            length = 3
+        elif protocol == Protocol.SONY:
+            length = 4
+        else:
+            return None
+
+        if len(args) not in (length, length + 1):
+            return None
+
+        repeats = int(args[length], 0) if len(args) > length else 0
+    except (IndexError, TypeError, ValueError):
+        return None
+
+    if repeats < 0:
+        return None
+
+    return (list(args[:length]), repeats)
@@ -16,11 +16,12 @@ class IrboxError(Exception):
         # Note base exception
         self.base = base
 
-        # Set message from base exception
+        # Set message from base exception (or use it directly if it's
+        # already a message)
         try:
             self.message = base.message
         except AttributeError:
-            self.message = None
+            self.message = base if isinstance(base, str) else None
 
         # Update message if possible
         if isinstance(self.base, TimeoutError):
@@ -43,3 +44,53 @@ class MalformedArgumentsError(IrboxError):
 
         # Initialize ancestor
         super().__init__(self.message)
+
+class UnsupportedProtocolError(IrboxError):
+    """
+    Raised when a ```tx``` command uses a protocol the app does not support.
+    """
+
+    def __init__(self):
+        self.message = 'Unsupported protocol'
+
+        # Initialize ancestor
+        super().__init__(self.message)
+
+class NotConnectedError(IrboxError):
+    """
+    Raised instead of reconnecting on the caller's thread when a supervised IR
+    box is not connected.
+    """
+
+    def __init__(self):
+        self.message = 'Not connected'
+
+        # Initialize ancestor
+        super().__init__(self.message)
+
+class SceneRunningError(IrboxError):
+    """
+    Raised instead of starting a scene that is already running.
+    """
+
+    def __init__(self):
+        self.message = 'Scene already running'
+
+        # Initialize ancestor
+        super().__init__(self.message)
+
+class QueueFullError(IrboxError):
+    """
+    Raised instead of queueing a command when its priority class's queue is
+    full, or when it has waited too long to be sent.
+
+    Attributes:
+        retry_after (int): Suggested seconds to wait before trying again.
+    """
+
+    def __init__(self, retry_after=1):
+        self.message = 'Too busy'
+        self.retry_after = retry_after
+
+        # Initialize ancestor
+        super().__init__(self.message)
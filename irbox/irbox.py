@@ -2,6 +2,7 @@
 Contains class to facilitate communication with the IR box using its protocol.
 """
 
+import errno
 import logging
 import socket
 import threading
@@ -9,8 +10,12 @@ import time
 
 from irbox.errors import IrboxError
 from irbox.errors import MalformedArgumentsError
-from irbox.message import Message
-from irbox.count_generator import count_generator
+from irbox.errors import NotConnectedError
+from irbox.line_reader import LineReader
+from irbox.metrics import Metrics
+from irbox.pipeline import Pipeline
+from irbox.protocol import Protocol
+from irbox.ring_buffer import RingBuffer
 
 logger = logging.getLogger(__name__)
 
@@ -21,23 +26,53 @@ class IrBox:
     Class to facilitate communication with the IR box using its protocol.
 
     Attributes:
-        _WAIT (int): Number of seconds to wait each loop when reading data.
+        _WAIT (int): Number of seconds the reader thread waits each loop while
+            there is no connection.
         _TIMEOUT (int): Timeout (in seconds) for connection and to wait for
             messages to be received. Recommend a value no less than 5 to
             account for transmissions with many repeats (e.g., simulating
             holding a button).
         _socket (socket): TCP socket.
+        _line_reader (LineReader): Buffered line reader for `_socket`.
         _reader_thread (Thread): Thread that calls `_read()`.
-        _message_count_generator (generator of int): Transmitted message count
-            generator.
-        _message_count (int): Transmitted message count.
-        _messages (list of Message): Received messages, in the order they were
-            received.
-        _response (str): Last response received from the IR box.
+        _message_count (int): ID of the last message answered.
+        _pipeline (Pipeline): Messages awaiting a response, in the order they
+            were sent. Each response fills in the oldest message whose
+            request it echoes. Messages whose response timed out are
+            abandoned there, so a late response is discarded rather than
+            given to the next message.
+        _close_lock (Lock): Held while detaching the socket, so that only one
+            thread closes it.
+        _write_lock (RLock): Held while registering a message and writing it,
+            so that `_pipeline` order always matches the order messages are
+            written. Waiting for responses happens outside the lock, so
+            concurrent callers are pipelined.
+        _local (local): Per-thread state. `_local.response` is the last
+            response received from the IR box by the calling thread.
+        metrics (Metrics): Response latency histograms and event counters.
+        timing (TimingModel): Optional. Model used to set a deadline for each
+            response, learned from observed latencies. If `None`, every
+            response gets `_TIMEOUT`.
         _retry (bool): Whether or not to assume the connection has been
             destroyed after a failed transmission. Use this responsibly! (That
             means keep `_TIMEOUT` high relative to the duration of the longest
             ```tx``` command you wish to support.)
+        _fail_fast (bool): Whether or not to raise `NotConnectedError` instead
+            of reconnecting when a message is sent with no connection. Set
+            when a `Supervisor` reconnects in the background.
+        _responded_at (float): `time.perf_counter()` when the last response
+            to a message was read. The IR box starts on each message only
+            once it has answered the one before.
+        _last_activity (float): `time.monotonic()` of the last response
+            received.
+        rx_messages (RingBuffer): ```tx()``` commands written by the IR box
+            in receive mode, most recent last. The reader thread appends to
+            it; any number of readers can follow it with their own cursors.
+        _rx_mode (bool): Whether or not the IR box is in receive mode, i.e.,
+            whether or not the reader thread should route unsolicited
+            ```tx()``` commands to `rx_messages`.
+        _rx_cursor (int): `rx_messages` cursor used by `get_rx_message()`.
+        _rx_lock (Lock): Guards `_rx_cursor`.
     """
 
     _WAIT = 0.01
@@ -57,27 +92,48 @@ class IrBox:
 
         # No socket to start
         self._socket = None
+        self._line_reader = None
 
         # No reader thread until we do a connect()
         self._reader_thread = None
 
-        # Build generators
-        self._message_count_generator = count_generator()
-        self._message_count = next(self._message_count_generator)
+        # No messages answered yet
+        self._message_count = 0
+
+        # Initialize metrics
+        self.metrics = Metrics()
+
+        # Initialize pending messages table
+        self._pipeline = Pipeline(self.metrics)
+        self._close_lock = threading.Lock()
 
-        # Initialize received messages list
-        self._messages = list()
+        # Serialize writes
+        self._write_lock = threading.RLock()
 
         # No response by default
-        self._response = None
+        self._local = threading.local()
+
+        # Fixed response timeout by default
+        self.timing = None
 
         # Do not retry by default
         self._retry = False
 
-        # If host and port were specified, start the connection
+        # Reconnect on the caller's thread by default
+        self._fail_fast = False
+        self._responded_at = 0.0
+        self._last_activity = time.monotonic()
+
+        # Not in receive mode to start
+        self.rx_messages = RingBuffer()
+        self._rx_mode = False
+        self._rx_cursor = self.rx_messages.cursor
+        self._rx_lock = threading.Lock()
+
+        # Note host and port, and if they were specified, start the connection
+        self.host = host
+        self.port = port
         if host and port:
-            self.host = host
-            self.port = port
             try:
                 self.connect(host, port)
             except IrboxError as irbox_error:
@@ -103,6 +159,8 @@ class IrBox:
             bool: Whether or not to attempt to reconnect on response timeout.
         """
 
+        return self._retry
+
     @retry.setter
     def retry(self, retry):
         """
@@ -115,15 +173,100 @@ class IrBox:
 
         self._retry = retry
 
+    @property
+    def fail_fast(self):
+        """
+        Whether or not to raise `NotConnectedError` instead of reconnecting
+        when a message is sent with no connection.
+
+        Returns:
+            bool: Whether or not to fail fast.
+        """
+
+        return self._fail_fast
+
+    @fail_fast.setter
+    def fail_fast(self, fail_fast):
+        """
+        Whether or not to raise `NotConnectedError` instead of reconnecting
+        when a message is sent with no connection.
+
+        Args:
+            fail_fast (bool): Whether or not to fail fast.
+        """
+
+        self._fail_fast = fail_fast
+
+    @property
+    def connected(self):
+        """
+        Whether or not there is a connection to the IR box. The connection
+        may still be half-open.
+
+        Returns:
+            bool: Whether or not there is a connection.
+        """
+
+        return self._socket is not None
+
+    @property
+    def idle(self):
+        """
+        Returns the number of seconds since the last response was received.
+
+        Returns:
+            float: Seconds since the last response was received.
+        """
+
+        return time.monotonic() - self._last_activity
+
     @property
     def response(self):
         """
-        Returns the last response received from the IR box.
+        Returns the last response received from the IR box by the calling
+        thread.
 
         Returns:
             str: The last response received.
         """
-        return self._response
+        return getattr(self._local, 'response', None)
+
+    def stats(self):
+        """
+        Returns connection and message statistics.
+
+        Returns:
+            dict: `host`, `port`, whether or not the IR box is `connected`,
+                the number of messages `pending` a response, the number of
+                timed out messages held in case their responses arrive late
+                (`abandoned`), the pending messages table's `capacity`, and
+                the number of messages `sent`, responses `received`, and
+                response `timeouts` so far.
+        """
+
+        counters = self.metrics.counters()
+
+        return {
+                'host': self.host,
+                'port': self.port,
+                'connected': self.connected,
+                **self._pipeline.stats(),
+                'sent': counters['sent'],
+                'received': counters['received'],
+                'timeouts': counters['timeouts']
+        }
+
+    @property
+    def responses(self):
+        """
+        Returns the responses received from the IR box by the calling thread's
+        last `tx_many()` call.
+
+        Returns:
+            list of str: The responses received, in order.
+        """
+
+        return getattr(self._local, 'responses', None)
 
     def connect(self, host, port, soft_connect=False):
         """
@@ -149,39 +292,55 @@ class IrBox:
             self._socket = None
             return
 
-        # Establish TCP socket and configure timeout
-        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self._socket.settimeout(self._TIMEOUT)
+        with self._write_lock:
+            # Establish TCP socket and configure timeout
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.settimeout(self._TIMEOUT)
 
-        # Connect
-        try:
-            self._socket.connect((host, port))
-        except TimeoutError as timeout_error:
-            raise IrboxError(timeout_error) from timeout_error
-        except socket.timeout as timeout_error:
-            raise IrboxError(TimeoutError) from timeout_error
-        except PermissionError as permission_error:
-            logger.warning('Permission error')
-            raise IrboxError(permission_error) from permission_error
-        except ConnectionRefusedError as connection_refused_error:
-            logger.warning('Connection refused')
-            raise IrboxError(connection_refused_error) from connection_refused_error
-
-        # Disable timeout for reading on a separate thread
-        self._socket.settimeout(None)
-
-        # Start reader thread, if not already running
-        if self._reader_thread is None:
-            self._reader_thread = threading.Thread(
-                    target=self._read,
-                    args=(),
-                    daemon=True
-            )
-            self._reader_thread.start()
+            # Connect
+            try:
+                sock.connect((host, port))
+            except TimeoutError as timeout_error:
+                sock.close()
+                raise IrboxError(timeout_error) from timeout_error
+            except socket.timeout as timeout_error:
+                sock.close()
+                raise IrboxError(TimeoutError()) from timeout_error
+            except PermissionError as permission_error:
+                sock.close()
+                logger.warning('Permission error')
+                raise IrboxError(permission_error) from permission_error
+            except ConnectionRefusedError as connection_refused_error:
+                sock.close()
+                logger.warning('Connection refused')
+                raise IrboxError(connection_refused_error) from connection_refused_error
+            except OSError as os_error:
+                sock.close()
+                logger.warning('Connection failed')
+                raise IrboxError(os_error) from os_error
+
+            # Disable timeout for reading on a separate thread
+            sock.settimeout(None)
+            self._socket = sock
+
+            # Expect + before the reader thread can see the new socket
+            pending = self._pipeline.register()
+
+            # Build a line reader for the new socket
+            self._line_reader = LineReader(self._socket)
+
+            # Start reader thread, if not already running
+            if self._reader_thread is None:
+                self._reader_thread = threading.Thread(
+                        target=self._read,
+                        args=(),
+                        daemon=True
+                )
+                self._reader_thread.start()
 
         # Wait for +
-        if not self._send_message(''):
-            raise TimeoutError
+        if not self._await_response(pending, '', False):
+            raise IrboxError(TimeoutError())
 
         logger.info('Connected')
 
@@ -230,13 +389,77 @@ class IrBox:
         except TypeError as type_error:
             raise MalformedArgumentsError from type_error
 
+    def tx_many(self, commands):
+        """
+        Sends several ```tx``` commands to the IR box back-to-back, without
+        waiting for each response before writing the next. Returns values
+        indicating whether or not the IR box responded positively to each
+        ```tx``` command, in order. The responses themselves are available
+        from `responses`.
+
+        If a response times out, the remaining commands are reported as timed
+        out too, since the IR box handles commands in order.
+
+        Args:
+            commands (list of list of str): ```tx()``` arguments for each
+                command, as for `tx()`.
+
+        Returns:
+            list of bool: Values indicating whether or not the IR box
+                responded positively to each ```tx``` command.
+
+        Raises:
+            IrboxError: An IR box error.
+            MalformedArgumentsError: Unable to parse arguments.
+        """
+
+        try:
+            messages = [f"tx({','.join(args)})" for args in commands]
+        except TypeError as type_error:
+            raise MalformedArgumentsError from type_error
+
+        pending = self._write_messages(messages)
+        logger.debug('Messages: %s', messages)
+
+        results = []
+        responses = []
+        timed_out = False
+        for _pending in pending:
+            # The IR box transmits one command at a time, so each response
+            # gets a full deadline after the one before it
+            if not timed_out and _pending.wait(self._response_timeout(_pending)):
+                if _pending.lost:
+                    responses.append('Response lost')
+                    results.append(False)
+                    continue
+
+                self._message_count = _pending.message_id
+                responses.append(_pending.message)
+                results.append(_pending.message[:1] == '+')
+                continue
+
+            if not timed_out:
+                logger.debug('Response timeout')
+                timed_out = True
+                self.metrics.increment('timeouts')
+
+            self._pipeline.abandon(_pending)
+
+            responses.append('Response timeout')
+            results.append(False)
+
+        self._local.responses = responses
+        self._local.response = responses[-1] if responses else None
+
+        return results
+
     def rx(self): # pylint: disable=invalid-name
         """
         Sends an ```rx``` command to the IR box. This puts the IR box in
         receive mode, to be terminated with a ```norx``` command. In this mode,
         the IR box sends ```tx()``` commands that correspond to IR commands
-        that it receives. To obtain those, call `get_rx_message()` while in
-        receive mode.
+        that it receives. The reader thread collects those in `rx_messages`;
+        to obtain them, call `get_rx_messages()` or `get_rx_message()`.
 
         Returns a value indicating whether or not the IR box responded
         positively to the ```rx``` command.
@@ -249,31 +472,64 @@ class IrBox:
             IrboxError: An IR box error.
         """
 
+        # Route captures to rx_messages as soon as the IR box could send them
+        self._rx_mode = True
+
         try:
-            return self._send_message('rx')
+            success = self._send_message('rx')
         except IrboxError as irbox_error:
+            self._rx_mode = False
             raise irbox_error
 
-    def get_rx_message(self):
+        if not success:
+            self._rx_mode = False
+
+        return success
+
+    def get_rx_messages(self, cursor=None):
         """
-        Strictly for use in receive mode. Returns a ```tx()``` command written
-        by the IR box.
+        Returns the ```tx()``` commands written by the IR box in receive mode
+        since a cursor. Never blocks or touches the connection, so any number
+        of readers can poll at once, each seeing every command.
 
-        Returns the ```tx()``` command read from the IR box, or `None` if it
-        has not written one yet.
+        Args:
+            cursor (int): The cursor returned by the previous call, or `None`
+                to start from now.
 
         Returns:
-            str: The ```tx()``` command read from the IR box, or `None` if it
-                has not written one yet.
+            tuple of (list of str, int): The ```tx()``` commands, oldest
+                first, and the cursor to pass to the next call.
+        """
 
-        Raises:
-            IrboxError: An IR box error.
+        return self.rx_messages.read(cursor)
+
+    def get_rx_message(self):
         """
+        Returns the next ```tx()``` command written by the IR box in receive
+        mode, following a single cursor shared by all callers. Never blocks.
+        Use `get_rx_messages()` instead where several readers each need every
+        command.
 
-        try:
-            return self._send_message('', False)
-        except IrboxError as irbox_error:
-            raise irbox_error
+        Returns the ```tx()``` command, or `None` if the IR box has not written
+        one yet.
+
+        Returns:
+            str: The ```tx()``` command, or `None` if the IR box has not
+                written one yet.
+        """
+
+        with self._rx_lock:
+            messages, _ = self.rx_messages.read(self._rx_cursor)
+            if not messages:
+                self._local.response = None
+                return None
+
+            # Step past the returned message only
+            self._rx_cursor = self.rx_messages.cursor - len(messages) + 1
+
+        self._local.response = messages[0]
+
+        return messages[0]
 
     def norx(self):
         """
@@ -291,10 +547,15 @@ class IrBox:
         """
 
         try:
-            return self._send_message('norx')
+            success = self._send_message('norx')
         except IrboxError as irbox_error:
             raise irbox_error
 
+        if success:
+            self._rx_mode = False
+
+        return success
+
     def invalid(self):
         """
         Sends an ```invalid``` command (which is, indeed, an invalid command)
@@ -317,6 +578,28 @@ class IrBox:
         except IrboxError as irbox_error:
             raise irbox_error
 
+    def close(self):
+        """
+        Terminates the connection. The next message sent reconnects, unless
+        `fail_fast` is set.
+
+        Raises:
+            IrboxError: An IR box error.
+        """
+
+        self._close()
+
+    def reconnect(self):
+        """
+        Reconnects to the IR box using the host and port previously passed to
+        `connect()`.
+
+        Raises:
+            IrboxError: An IR box error.
+        """
+
+        self._reconnect()
+
     def _close(self):
         """
         Terminates the connection.
@@ -325,27 +608,30 @@ class IrBox:
             IrboxError: An IR box error.
         """
 
+        # Detach the socket first, so that only one thread closes it when the
+        # reader thread and a writer notice a dead connection at once
+        with self._close_lock:
+            sock = self._socket
+            self._socket = None
+            self._line_reader = None
+
+            # Take the opportunity to clear the messages table and
+            # potentially free a bit of memory
+            if sock is not None:
+                self._pipeline.clear()
+
         # Close socket connections
-        if self._socket is not None:
+        if sock is not None:
             try:
-                self._socket.shutdown(socket.SHUT_RDWR)
-                self._socket.close()
+                sock.shutdown(socket.SHUT_RDWR)
             except OSError as os_error:
-                # errno 57 means the socket is already closed
-                if os_error.errno == 57:
-                    pass
+                # errno 57 (ENOTCONN on macOS) means the socket is already
+                # closed
                 # errno 9 is bad file descriptor
-                elif os_error.errno == 9:
-                    pass
-                else:
+                if os_error.errno not in (57, errno.ENOTCONN, errno.EBADF):
                     raise IrboxError(os_error) from os_error
-
-            self._socket = None
-
-            # Take the opportunity to clear the messages list and potentially
-            # free a bit of memory
-            if self._messages is not None:
-                self._messages.clear()
+            finally:
+                sock.close()
 
             # If called from destructor, logger may no longer exist
             if logger is not None:
@@ -355,90 +641,143 @@ class IrBox:
     def _send_message(self, message, retry=True):
         """
         Sends a message to the IR box. Use this method to communicate with the
-        IR box.
+        IR box. Safe to call from several threads at once.
 
         Args:
             message (str): The message to send. Must contain only ASCII
                 characters.
-            validate (bool): Whether or not to validate by waiting for a
-                positive response (i.e., one that begins with `+`).
+            retry (bool): Whether or not to reconnect and try once more after
+                a response timeout, if `_retry` is enabled.
 
         Returns:
             bool:
                 A value indicating whether or not a positive response was
-                received (if validate) within `_TIMEOUT`
+                received within `_TIMEOUT`
 
         Raises:
             IrboxError: An IR box error.
         """
 
-        # Track message count internally for now
-        message_count = next(self._message_count_generator)
-
-        # Build a new message to receive data
-        self._messages.append(Message(message_count))
-
         try:
-            self._write(message.encode('ascii'))
+            pending, = self._write_messages([message])
         except TimeoutError:
             logger.debug('Message timeout')
-            self._response = 'Message timeout'
+            self._local.response = 'Message timeout'
             return False
-        logger.debug('Message(%d): [%s]', message_count, message)
 
-        # Check for a response within _TIMEOUT
-        start = time.perf_counter()
-        while time.perf_counter() - start < self._TIMEOUT:
-            response = self._receive_message(message_count)
-            if response is not None:
-                # Increment message count atomically
-                self._message_count = message_count
+        logger.debug('Message(%d): [%s]', pending.message_id, message)
 
-                # Return message
-                self._response = response
-                return response[:1] == '+'
+        return self._await_response(pending, message, retry)
 
-            time.sleep(self._WAIT)
+    def _write_messages(self, messages):
+        """
+        Registers and writes one or more messages back-to-back, with a single
+        write.
 
-        logger.debug('Response timeout')
+        This is a low-level method and not meant to be called directly.
 
-        # If retry is enabled, reconnect and try again
-        if retry and self._retry:
-            # Reconnect and try once more
-            self._reconnect()
-            return self._send_message(message, False)
+        Args:
+            messages (list of str): The messages to send. Must contain only
+                ASCII characters. Empty messages are registered but not
+                written.
 
-        self._response = 'Response timeout'
-        return False
+        Returns:
+            list of Message: The pending messages, in the same order.
+
+        Raises:
+            IrboxError: An IR box error.
+        """
+
+        encoded = [message.encode('ascii') for message in messages]
+        data = b''.join(message + b'\r\n' for message in encoded if message != b'')
 
-    def _receive_message(self, message_id):
+        # If the connection is being maintained in the background, don't
+        # make the caller wait for a reconnect
+        if data != b'' and self._socket is None and self._fail_fast:
+            raise NotConnectedError
+
+        with self._write_lock:
+            # If socket has been destroyed, reestablish first
+            if data != b'' and self._socket is None:
+                self._reconnect()
+
+            # Make room, dropping timed out messages whose responses never
+            # came
+            self._pipeline.reserve(len(messages))
+
+            # Build new messages to receive data
+            pending = [self._pipeline.register(message) for message in messages]
+
+            try:
+                self._write(data)
+            except BrokenPipeError:
+                # The connection is gone, so reestablish and send once more
+                self._reconnect()
+                pending = [self._pipeline.register(message) for message in messages]
+                self._write(data)
+
+            self.metrics.increment('sent', sum(1 for message in encoded if message != b''))
+            self.metrics.increment('bytes_out', len(data))
+
+        return pending
+
+    def _await_response(self, pending, message, retry):
         """
-        Returns the response corresponding to the message identified by the
-        specified message count.
+        Waits for the reader thread to fill in a response to a pending
+        message.
 
-        This is invoked automatically by `_send_message()` and should not need
-        to be called separately.
+        This is a low-level method and not meant to be called directly.
 
         Args:
-            message_id (int): The ID of the message to obtain a response to.
+            pending (Message): The pending message.
+            message (str): The message that was sent, for a retry.
+            retry (bool): Whether or not to reconnect and try once more after
+                a response timeout, if `_retry` is enabled.
 
         Returns:
-            str: The message that was received, or `None` if no message is
-                available.
+            bool: A value indicating whether or not a positive response was
+                received within `_TIMEOUT`.
+
+        Raises:
+            IrboxError: An IR box error.
         """
 
-        # Iterate through the list to find the correct message
-        message = None
-        for _message in self._messages:
-            if _message.message_id == message_id and _message.message is not None:
-                message = _message
+        # Wait for the reader thread to fill in a response within the
+        # deadline
+        if pending.wait(self._response_timeout(pending)) and not pending.lost:
+            response = pending.message
 
-        # Remove this message from the list, if found, and return it
-        if message is not None:
-            self._messages.remove(message)
-            return message.message
+            # Increment message count atomically
+            self._message_count = pending.message_id
 
-        return None
+            # Return message
+            self._local.response = response
+            return response[:1] == '+'
+
+        if pending.lost:
+            failure = 'Response lost'
+        else:
+            failure = 'Response timeout'
+            self.metrics.increment('timeouts')
+            self._pipeline.abandon(pending)
+
+        logger.debug(failure)
+
+        # If retry is enabled, reconnect and try again
+        if retry and self._retry:
+            # If the connection is being maintained in the background, just
+            # drop it and let that reconnect
+            if self._fail_fast:
+                self._close()
+                self._local.response = failure
+                return False
+
+            # Reconnect and try once more
+            self._reconnect()
+            return self._send_message(message, False)
+
+        self._local.response = failure
+        return False
 
     def _reconnect(self):
         """
@@ -451,20 +790,24 @@ class IrBox:
             IrboxError: An IR box error.
         """
 
+        self.metrics.increment('reconnects')
+
         # Close and connect again
-        self._close()
-        try:
-            self.connect(self.host, self.port)
-        except IrboxError as irbox_error:
-            raise irbox_error
+        with self._write_lock:
+            self._close()
+            try:
+                self.connect(self.host, self.port)
+            except IrboxError as irbox_error:
+                raise irbox_error
 
     def _read(self):
         """
-        Reads messages from the IR box, one byte at a time. Messages match
-        `/.*\r\n/`. Expects the _messages list to contain one Message object
-        per message received. Fills in the message text in the order messages
-        appear in the list. Blocks until a full message is received. Meant to
-        run forever in its own thread.
+        Reads messages from the IR box using a buffered `LineReader`. Messages
+        match `/.*\r\n/`. Fills in and removes the oldest pending message
+        whose request each message received echoes, waking any messages in
+        front of it as lost, and discarding late responses to abandoned
+        messages and responses that echo nothing pending. Blocks until a full
+        message is received. Meant to run forever in its own thread.
 
         This is a low-level method and not meant to be called directly.
 
@@ -473,51 +816,108 @@ class IrBox:
         """
 
         while True:
-            message = b''
-
-            # Read messages (any bytes until \r\n)
-            while not message.endswith('\r\n'.encode('ascii')):
-                if self._socket is None:
-                    time.sleep(self._WAIT)
-                    break
-
-                try:
-                    byte = self._socket.recv(1)
-                except TimeoutError:
-                    # Socket timed out, so close the connection
-                    self._close()
-                except ConnectionResetError:
-                    # Connection reset by peer
-                    self._close()
-                except OSError as os_error:
-                    # errno 57 means the socket is already closed
-                    if os_error.errno == 57:
-                        byte = b''
-                    # errno 9 is bad file descriptor
-                    elif os_error.errno == 9:
-                        byte = b''
-                    else:
-                        raise IrboxError(os_error) from os_error
-
-                if byte == b'':
-                    # Connection closed
+            line_reader = self._line_reader
+
+            if self._socket is None or line_reader is None:
+                time.sleep(self._WAIT)
+                continue
+
+            # Read a message (any bytes until \r\n)
+            try:
+                message = line_reader.readline()
+            except (TimeoutError, ConnectionResetError):
+                # Socket timed out or connection reset by peer
+                message = None
+            except OSError as os_error:
+                # errno 57 (ENOTCONN on macOS) means the socket is already
+                # closed
+                # errno 9 is bad file descriptor
+                if os_error.errno in (57, errno.ENOTCONN, errno.EBADF):
+                    message = None
+                else:
+                    raise IrboxError(os_error) from os_error
+
+            if message is None:
+                # Connection closed, unless we've already moved on to a new
+                # connection
+                if line_reader is self._line_reader:
                     self._close()
-                    break
-
-                message += byte
-
-            # Fill in the first message
-            if message != b'':
-                try:
-                    self._messages[-1].message = message.decode('ascii')[:-2]
-                    logger.debug(
-                            'Response(%d): [%s]',
-                            self._messages[-1].message_id,
-                            self._messages[-1].message
-                    )
-                except IndexError:
-                    # Something got out of sync, so start over
-                    self._reconnect()
+                continue
+
+            response = message.decode('ascii')
+            self._last_activity = time.monotonic()
+
+            # In receive mode, captures go to rx_messages rather than filling
+            # in a pending message
+            if self._rx_mode and self._pipeline.is_capture(response):
+                self.rx_messages.append(response)
+                logger.debug('Capture: [%s]', response)
+                continue
+
+            # Fill in the oldest pending message this response echoes, if
+            # anyone is still waiting for it
+            pending = self._pipeline.resolve(response)
+            started_at = self._responded_at
+            self._responded_at = time.perf_counter()
+            if pending is None:
+                continue
+
+            self._observe(pending, len(message) + 2, started_at)
+            pending.message = response
+            logger.debug('Response(%d): [%s]', pending.message_id, response)
+
+    def _response_timeout(self, pending):
+        """
+        Returns how long to wait for the response to a pending message,
+        allowing for the messages pipelined ahead of it.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            pending (Message): The pending message.
+
+        Returns:
+            float: Seconds to wait.
+        """
+
+        if self.timing is None:
+            return self._TIMEOUT
+
+        return self.timing.deadline(pending.request, self._pipeline.ahead(pending))
+
+    def _observe(self, pending, size, started_at):
+        """
+        Records metrics for a response about to be filled in.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            pending (Message): The pending message being responded to.
+            size (int): The size of the response, in bytes.
+            started_at (float): `time.perf_counter()` when the response
+                before it was read.
+        """
+
+        # Label by command, and by protocol (the first argument) for tx().
+        # Empty requests wait for the handshake or a receive mode message.
+        command, _, args = pending.request.partition('(')
+        protocol = ''
+        if command == 'tx':
+            try:
+                protocol = Protocol(int(args.partition(',')[0], 0)).name
+            except ValueError:
+                protocol = Protocol.UNKNOWN.name
+
+        now = time.perf_counter()
+        self.metrics.observe_latency(command or 'wait', protocol, now - pending.sent_at)
+
+        # Time spent waiting behind messages pipelined ahead is their on-air
+        # time, not overhead, so only learn from when the IR box started on
+        # this one
+        if self.timing is not None:
+            self.timing.observe(pending.request, now - max(pending.sent_at, started_at))
+        self.metrics.increment('received')
+        self.metrics.increment('bytes_in', size)
 
     def _write(self, message):
         """
@@ -533,6 +933,8 @@ class IrBox:
 
         Raises:
             IrboxError: An IR box error.
+            BrokenPipeError: The connection has been lost. The caller is
+                responsible for reconnecting.
         """
 
         sent = 0
@@ -542,34 +944,32 @@ class IrBox:
         if message == b'':
             return 0
 
-        # If socket has been destroyed, reestablish first
-        if self._socket is None:
-            try:
-                self._reconnect()
-            except IrboxError as irbox_error:
-                raise irbox_error
-
         # Append newline if not present
-        if message[:-2] != b'\r\n':
+        if message[-2:] != b'\r\n':
             message += b'\r\n'
 
+        # The reader thread may have closed the connection in the meantime
+        sock = self._socket
+        if sock is None:
+            raise BrokenPipeError
+
         # Send the message
         while total_sent < len(message):
             try:
-                sent = self._socket.send(message)
+                sent = sock.send(message[total_sent:])
             except TimeoutError as timeout_error:
                 raise IrboxError(timeout_error) from timeout_error
             except socket.timeout as socket_timeout:
                 raise IrboxError(TimeoutError) from socket_timeout
-            except BrokenPipeError:
-                try:
-                    self._reconnect()
-                except TimeoutError as timeout_error:
-                    raise IrboxError(timeout_error) from timeout_error
-
-                continue
+            except OSError as os_error:
+                # errno 9 is bad file descriptor (closed by the reader thread)
+                if os_error.errno == 9:
+                    raise BrokenPipeError from os_error
+                raise
 
             if sent == 0:
                 return 0
 
             total_sent += sent
+
+        return total_sent
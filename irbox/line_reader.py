@@ -0,0 +1,73 @@
+"""
+Contains class to facilitate buffered reading of lines from a socket.
+"""
+
+class LineReader:
+    # pylint: disable=too-few-public-methods
+
+    """
+    Class to facilitate buffered reading of `\r\n`-terminated lines from a
+    socket. Reads in bulk into a reusable buffer and keeps any bytes following
+    a line for the next call to `readline()`.
+
+    Attributes:
+        _CHUNK_SIZE (int): Maximum number of bytes to request per `recv`.
+        _TERMINATOR (bytes): Line terminator.
+        _socket (socket): Socket to read from.
+        _chunk (bytearray): Reusable receive buffer.
+        _chunk_view (memoryview): View of `_chunk`, to avoid copies.
+        _buffer (bytearray): Bytes received but not yet returned as a line.
+        _scanned (int): Number of bytes at the start of `_buffer` already
+            known not to contain a terminator.
+        recv_calls (int): Number of `recv` calls made so far.
+    """
+
+    _CHUNK_SIZE = 4096
+    _TERMINATOR = b'\r\n'
+
+    def __init__(self, sock, chunk_size=_CHUNK_SIZE):
+        """
+        Args:
+            sock (socket): Socket to read from.
+            chunk_size (int): Maximum number of bytes to request per `recv`.
+        """
+
+        self._socket = sock
+        self._chunk = bytearray(chunk_size)
+        self._chunk_view = memoryview(self._chunk)
+        self._buffer = bytearray()
+        self._scanned = 0
+        self.recv_calls = 0
+
+    def readline(self):
+        """
+        Returns the next line, without its terminator. Blocks until a full line
+        is available.
+
+        Returns:
+            bytes: The next line, or `None` if the connection was closed.
+
+        Raises:
+            OSError: A socket error.
+        """
+
+        while True:
+            # Look for a terminator, starting just before where we left off in
+            # case the last chunk ended between \r and \n
+            index = self._buffer.find(self._TERMINATOR, max(self._scanned - 1, 0))
+            if index != -1:
+                line = bytes(self._buffer[:index])
+                del self._buffer[:index + len(self._TERMINATOR)]
+                self._scanned = 0
+                return line
+
+            self._scanned = len(self._buffer)
+
+            # Need more data
+            received = self._socket.recv_into(self._chunk)
+            self.recv_calls += 1
+            if received == 0:
+                # Connection closed
+                return None
+
+            self._buffer += self._chunk_view[:received]
@@ -2,23 +2,50 @@
 Contains class to facilitate message processing.
 """
 
+import threading
+import time
+
 class Message:
     """
     Class to facilitate message processing.
 
     Attributes:
         _message_id (int): Message ID.
+        _request (str): The message sent that this message is a response to.
+        _sent_at (float): `time.perf_counter()` when the message was created,
+            immediately before it was sent.
         _message (str): Message.
+        _received (Event): Set once the message has been filled in.
+        _abandoned_at (float): `time.monotonic()` when the sender stopped
+            waiting for the message, or `None` if it has not.
+        _lost (bool): Whether or not the message's response was lost.
     """
 
-    def __init__(self, message_id):
+    __slots__ = (
+            '_message_id',
+            '_request',
+            '_sent_at',
+            '_message',
+            '_received',
+            '_abandoned_at',
+            '_lost'
+    )
+
+    def __init__(self, message_id, request=''):
         """
         Args:
             message_id (int): Message ID.
+            request (str): The message sent that this message is a response
+                to.
         """
 
         self._message_id = message_id
+        self._request = request
+        self._sent_at = time.perf_counter()
         self._message = None
+        self._received = threading.Event()
+        self._abandoned_at = None
+        self._lost = False
 
     @property
     def message_id(self):
@@ -31,6 +58,82 @@ class Message:
 
         return self._message_id
 
+    @property
+    def request(self):
+        """
+        Returns the message sent that this message is a response to.
+
+        Returns:
+            str: Request.
+        """
+
+        return self._request
+
+    @property
+    def sent_at(self):
+        """
+        Returns `time.perf_counter()` when the message was sent.
+
+        Returns:
+            float: Time sent.
+        """
+
+        return self._sent_at
+
+    @property
+    def abandoned(self):
+        """
+        Returns whether or not the sender has stopped waiting for the
+        message.
+
+        Returns:
+            bool: Whether or not the message is abandoned.
+        """
+
+        return self._abandoned_at is not None
+
+    @property
+    def abandoned_at(self):
+        """
+        Returns `time.monotonic()` when the sender stopped waiting for the
+        message.
+
+        Returns:
+            float: Time abandoned, or `None` if not abandoned.
+        """
+
+        return self._abandoned_at
+
+    def abandon(self):
+        """
+        Notes that the sender has stopped waiting for the message, so any
+        response that arrives for it is discarded.
+        """
+
+        if self._abandoned_at is None:
+            self._abandoned_at = time.monotonic()
+
+    @property
+    def lost(self):
+        """
+        Returns whether or not the message's response was lost, i.e., a
+        response to a later message arrived first.
+
+        Returns:
+            bool: Whether or not the response was lost.
+        """
+
+        return self._lost
+
+    def lose(self):
+        """
+        Notes that the message's response was lost and wakes any waiters, so
+        they stop waiting for a response that will never arrive.
+        """
+
+        self._lost = True
+        self._received.set()
+
     @property
     def message(self):
         """
@@ -45,10 +148,27 @@ class Message:
     @message.setter
     def message(self, message):
         """
-        Sets message.
+        Sets message and wakes any waiters.
 
         Args:
             message (str): Message.
         """
 
         self._message = message
+        self._received.set()
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the message has been filled in, its response is lost,
+        or the timeout expires.
+
+        Args:
+            timeout (float): Maximum number of seconds to wait, or `None` to
+                wait forever.
+
+        Returns:
+            bool: A value indicating whether or not the message was filled in
+                or lost.
+        """
+
+        return self._received.wait(timeout)
@@ -0,0 +1,355 @@
+"""
+Contains classes to collect IR box metrics and render them in Prometheus text
+format.
+"""
+
+import bisect
+import threading
+
+class Histogram:
+    """
+    Class to facilitate a cumulative histogram with fixed buckets. Not
+    thread-safe on its own; `Metrics` guards it.
+
+    Attributes:
+        BUCKETS (tuple of float): Default upper bounds, in seconds.
+        _bounds (tuple of float): Bucket upper bounds.
+        _counts (list of int): Observations per bucket (not cumulative). The
+            last entry counts observations above every bound.
+        sum (float): Sum of observations.
+        count (int): Number of observations.
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, bounds=BUCKETS):
+        """
+        Args:
+            bounds (tuple of float): Bucket upper bounds, in ascending order.
+        """
+
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """
+        Records an observation.
+
+        Args:
+            value (float): The observed value.
+        """
+
+        self._counts[bisect.bisect_left(self._bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def buckets(self):
+        """
+        Returns cumulative bucket counts.
+
+        Returns:
+            list of tuple of (str, int): Upper bound (`+Inf` last) and the
+                number of observations at or below it.
+        """
+
+        buckets = []
+        total = 0
+        for bound, count in zip(self._bounds + ('+Inf',), self._counts):
+            total += count
+            buckets.append((str(bound), total))
+
+        return buckets
+
+class Metrics:
+    """
+    Class to collect metrics for one IR box: response latency histograms per
+    command and protocol, and event counters. Cheap enough to leave on: each
+    update is one uncontended lock acquisition.
+
+    Attributes:
+        COUNTERS (tuple of str): Counter names.
+        _lock (Lock): Guards everything below.
+        _latency (dict of tuple of (str, str) to Histogram): Response latency
+            histograms, keyed by command and protocol.
+        _counters (dict of str to int): Counters, keyed by name.
+    """
+
+    COUNTERS = (
+            'sent',
+            'received',
+            'timeouts',
+            'reconnects',
+            'desyncs',
+            'late_responses',
+            'lost_responses',
+            'bytes_in',
+            'bytes_out'
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def observe_latency(self, command, protocol, seconds):
+        """
+        Records a write-to-response latency.
+
+        Args:
+            command (str): The command (e.g., `tx`).
+            protocol (str): The protocol, or an empty string if not
+                applicable.
+            seconds (float): The latency, in seconds.
+        """
+
+        with self._lock:
+            histogram = self._latency.get((command, protocol))
+            if histogram is None:
+                histogram = self._latency[(command, protocol)] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, amount=1):
+        """
+        Increments a counter.
+
+        Args:
+            name (str): The counter name, from `COUNTERS`.
+            amount (int): The amount to increment by.
+        """
+
+        with self._lock:
+            self._counters[name] += amount
+
+    def counters(self):
+        """
+        Returns a copy of the counters.
+
+        Returns:
+            dict of str to int: Counters, keyed by name.
+        """
+
+        with self._lock:
+            return dict(self._counters)
+
+    def latency(self):
+        """
+        Returns a copy of the latency histograms, as cumulative buckets.
+
+        Returns:
+            dict of tuple of (str, str) to tuple of (list, float, int):
+                Cumulative buckets (see `Histogram.buckets()`), sum, and
+                count, keyed by command and protocol.
+        """
+
+        with self._lock:
+            return {
+                    key: (histogram.buckets(), histogram.sum, histogram.count)
+                    for key, histogram in self._latency.items()
+            }
+
+def _labels(**labels):
+    """
+    Formats Prometheus labels.
+
+    Args:
+        labels (dict of str to str): Label values, keyed by label name.
+
+    Returns:
+        str: Formatted labels, including braces.
+    """
+
+    def escape(value):
+        return (
+                str(value)
+                .replace('\\', '\\\\')
+                .replace('"', '\\"')
+                .replace('\n', '\\n')
+        )
+
+    return '{' + ','.join(
+            f'{name}="{escape(value)}"' for name, value in labels.items()
+    ) + '}'
+
+def prometheus_text(devices, queues=None):
+    """
+    Renders metrics for several IR boxes in Prometheus text exposition format.
+
+    Args:
+        devices (dict of str to IrBox): IR boxes, keyed by device ID.
+        queues (dict of str to dict): Optional. Scheduler statistics (see
+            `Scheduler.stats()`), keyed by device ID.
+
+    Returns:
+        str: Metrics in Prometheus text format.
+    """
+
+    lines = (
+            _latency_lines(devices)
+            + _counter_lines(devices)
+            + _gauge_lines(devices)
+            + _queue_lines(queues or {})
+    )
+
+    return '\n'.join(lines) + '\n'
+
+def _latency_lines(devices):
+    """
+    Renders the latency histograms of several IR boxes.
+
+    Args:
+        devices (dict of str to IrBox): IR boxes, keyed by device ID.
+
+    Returns:
+        list of str: Prometheus text lines.
+    """
+
+    lines = [
+            '# HELP irbox_response_latency_seconds '
+            'Time from writing a message to reading its response.',
+            '# TYPE irbox_response_latency_seconds histogram'
+    ]
+    for device_id, device in devices.items():
+        for (command, protocol), (buckets, total, count) in sorted(
+                device.metrics.latency().items()
+        ):
+            labels = {
+                    'device': device_id,
+                    'command': command,
+                    'protocol': protocol
+            }
+            for bound, cumulative in buckets:
+                lines.append(
+                        'irbox_response_latency_seconds_bucket'
+                        + _labels(**labels, le=bound)
+                        + f' {cumulative}'
+                )
+            lines.append(
+                    'irbox_response_latency_seconds_sum'
+                    + _labels(**labels)
+                    + f' {total}'
+            )
+            lines.append(
+                    'irbox_response_latency_seconds_count'
+                    + _labels(**labels)
+                    + f' {count}'
+            )
+
+    return lines
+
+def _counter_lines(devices):
+    """
+    Renders the counters (see `Metrics.COUNTERS`) of several IR boxes.
+
+    Args:
+        devices (dict of str to IrBox): IR boxes, keyed by device ID.
+
+    Returns:
+        list of str: Prometheus text lines.
+    """
+
+    counters = {
+            device_id: device.metrics.counters()
+            for device_id, device in devices.items()
+    }
+
+    descriptions = {
+            'sent': 'Messages sent.',
+            'received': 'Responses received.',
+            'timeouts': 'Messages whose response timed out.',
+            'reconnects': 'Reconnects to the device.',
+            'desyncs': 'Responses discarded since they echo no message awaiting one.',
+            'late_responses': 'Responses discarded since their message had timed out.',
+            'lost_responses': 'Responses that never arrived.',
+            'bytes_in': 'Bytes read from the device.',
+            'bytes_out': 'Bytes written to the device.'
+    }
+
+    lines = []
+    for name in Metrics.COUNTERS:
+        lines.append(f'# HELP irbox_{name}_total {descriptions[name]}')
+        lines.append(f'# TYPE irbox_{name}_total counter')
+        for device_id, values in counters.items():
+            lines.append(
+                    f'irbox_{name}_total'
+                    + _labels(device=device_id)
+                    + f' {values[name]}'
+            )
+
+    return lines
+
+def _gauge_lines(devices):
+    """
+    Renders the connection and pending message gauges of several IR boxes.
+
+    Args:
+        devices (dict of str to IrBox): IR boxes, keyed by device ID.
+
+    Returns:
+        list of str: Prometheus text lines.
+    """
+
+    stats = {device_id: device.stats() for device_id, device in devices.items()}
+
+    gauges = (
+            ('connected', 'connected',
+                    'Whether or not the device is connected.'),
+            ('pending_messages', 'pending',
+                    'Messages awaiting a response.'),
+            ('abandoned_messages', 'abandoned',
+                    'Timed out messages held in case their responses arrive late.')
+    )
+
+    lines = []
+    for name, key, description in gauges:
+        lines.append(f'# HELP irbox_{name} {description}')
+        lines.append(f'# TYPE irbox_{name} gauge')
+        for device_id, values in stats.items():
+            lines.append(
+                    f'irbox_{name}'
+                    + _labels(device=device_id)
+                    + f' {int(values[key])}'
+            )
+
+    return lines
+
+def _queue_lines(queues):
+    """
+    Renders scheduler queue metrics, per priority class.
+
+    Args:
+        queues (dict of str to dict): Scheduler statistics (see
+            `Scheduler.stats()`), keyed by device ID.
+
+    Returns:
+        list of str: Prometheus text lines, or none without queues.
+    """
+
+    queue_metrics = (
+            ('queue_depth', 'depth', 'gauge', 'Commands waiting to be sent.'),
+            ('queue_admitted_total', 'admitted', 'counter',
+                    'Commands admitted after waiting their turn.'),
+            ('queue_rejected_total', 'rejected', 'counter',
+                    'Commands turned away with a full queue or a long wait.'),
+            ('queue_wait_seconds_mean', 'wait_mean', 'gauge',
+                    'Mean time admitted commands waited.'),
+            ('queue_wait_seconds_max', 'wait_max', 'gauge',
+                    'Longest time an admitted command waited.')
+    )
+
+    lines = []
+    for name, key, metric_type, description in queue_metrics:
+        if not queues:
+            break
+        lines.append(f'# HELP irbox_{name} {description}')
+        lines.append(f'# TYPE irbox_{name} {metric_type}')
+        for device_id, classes in queues.items():
+            for priority, values in classes.items():
+                lines.append(
+                        f'irbox_{name}'
+                        + _labels(device=device_id, priority=priority)
+                        + f' {values[key]}'
+                )
+
+    return lines
@@ -0,0 +1,380 @@
+"""
+Contains class to hold messages awaiting a response from the IR box.
+"""
+
+import collections
+import time
+
+from irbox.errors import IrboxError
+
+class PendingStore:
+    # pylint: disable=too-many-instance-attributes
+
+    """
+    Class to hold messages awaiting a response, in the order they were sent,
+    in a fixed number of slots. The IR box echoes each command in its
+    response (`+tx(...)`, `-invalid`), and responds in order, so a response
+    belongs to the oldest message whose request it echoes, and any message in
+    front of that one had its response lost. A response that echoes nothing
+    held is never given to anyone, so one lost or duplicated response can't
+    shift every later response onto the wrong message.
+
+    Responses carry no message ID, so a response can't be looked up by the
+    ID its message was given (see `count_generator()`). Instead, each message
+    is also indexed by its echo key (see `_echo_key()`), oldest first, so
+    that finding and removing the message a response belongs to takes
+    constant time however many messages are held. Messages are indexed by ID
+    too, for constant time lookups by callers that hold the message. The
+    slots keep the order messages were sent in, so IDs wrapping around at
+    `COUNT_MAX` don't matter; the store holds far fewer messages than that,
+    so IDs held never collide.
+
+    A message whose sender stops waiting (e.g., on a response timeout) is
+    abandoned and stays behind as a tombstone, so that its response, if it
+    arrives late, is discarded rather than mistaken for a lost one.
+    Tombstones older than `expiry` seconds are evicted, as are the oldest
+    tombstones whenever room is needed, so the store never grows.
+
+    Not thread-safe. Callers hold a lock around every call.
+
+    Attributes:
+        capacity (int): Maximum number of messages held.
+        expiry (float): Seconds after which an abandoned message is evicted.
+        _slots (list of Message): Message storage, used as a ring.
+        _head (int): Index of the oldest message in `_slots`.
+        _count (int): Number of messages held.
+        _ids (dict of int to Message): Messages held, keyed by message ID.
+        _echoes (dict of str to deque of Message): Messages held, oldest
+            first, keyed by the echo key of their request.
+        _abandoned (int): Number of abandoned messages held.
+    """
+
+    __slots__ = (
+            'capacity',
+            'expiry',
+            '_slots',
+            '_head',
+            '_count',
+            '_ids',
+            '_echoes',
+            '_abandoned'
+    )
+
+    def __init__(self, capacity=256, expiry=30):
+        """
+        Args:
+            capacity (int): Maximum number of messages held.
+            expiry (float): Seconds after which an abandoned message is
+                evicted.
+        """
+
+        self.capacity = capacity
+        self.expiry = expiry
+        self._slots = [None] * capacity
+        self._head = 0
+        self._count = 0
+        self._ids = {}
+        self._echoes = {}
+        self._abandoned = 0
+
+    def __len__(self):
+        """
+        Returns the number of messages held, including abandoned ones.
+
+        Returns:
+            int: The number of messages held.
+        """
+
+        return self._count
+
+    def __contains__(self, message):
+        """
+        Returns whether or not a message is held.
+
+        Args:
+            message (Message): The message.
+
+        Returns:
+            bool: Whether or not the message is held.
+        """
+
+        return self._ids.get(message.message_id) is message
+
+    @property
+    def abandoned(self):
+        """
+        Returns the number of abandoned messages held.
+
+        Returns:
+            int: The number of abandoned messages held.
+        """
+
+        return self._abandoned
+
+    def peek(self):
+        """
+        Returns the oldest message, without removing it.
+
+        Returns:
+            Message: The oldest message, or `None` if there is none.
+        """
+
+        return self._slots[self._head] if self._count else None
+
+    def reserve(self, count):
+        """
+        Makes room for messages about to be added, evicting expired abandoned
+        messages, then the oldest abandoned messages if still needed.
+
+        Args:
+            count (int): The number of messages about to be added.
+
+        Returns:
+            int: The number of abandoned messages evicted.
+
+        Raises:
+            IrboxError: There is no room, even after evicting every abandoned
+                message at the front.
+        """
+
+        evicted = self.expire()
+
+        while self.capacity - self._count < count:
+            head = self.peek()
+            if head is None or not head.abandoned:
+                raise IrboxError('Too many messages pending')
+            self._pop()
+            evicted += 1
+
+        return evicted
+
+    def add(self, message):
+        """
+        Adds a message. Call `reserve()` first.
+
+        Args:
+            message (Message): The message.
+
+        Raises:
+            IrboxError: There is no room.
+        """
+
+        if self._count == self.capacity:
+            raise IrboxError('Too many messages pending')
+
+        self._slots[(self._head + self._count) % self.capacity] = message
+        self._count += 1
+        self._ids[message.message_id] = message
+        self._echoes.setdefault(_echo_key(message.request), collections.deque()).append(message)
+
+        if message.abandoned:
+            self._abandoned += 1
+
+    def abandon(self, message):
+        """
+        Abandons a message (see `Message.abandon()`), counting it if it is
+        held.
+
+        Args:
+            message (Message): The message.
+        """
+
+        if not message.abandoned:
+            message.abandon()
+            if message in self:
+                self._abandoned += 1
+
+    def matches(self, response):
+        """
+        Returns whether or not a response echoes the request of a message
+        held.
+
+        Args:
+            response (str): The response, without `\\r\\n`.
+
+        Returns:
+            bool: Whether or not a message matches the response.
+        """
+
+        return _echo_key(response[1:]) in self._echoes
+
+    def ahead(self, message):
+        """
+        Returns the messages in front of a message that are still awaiting a
+        response, i.e., not abandoned.
+
+        Args:
+            message (Message): The message.
+
+        Returns:
+            list of Message: The messages, oldest first. Empty if the message
+                is not held.
+        """
+
+        if message not in self:
+            return []
+
+        ahead = []
+
+        for held in self._messages():
+            if held is message:
+                break
+            if not held.abandoned:
+                ahead.append(held)
+
+        return ahead
+
+    def pop(self, response):
+        """
+        Removes and returns the message a response belongs to: the oldest
+        message whose request the response echoes. Messages in front of it,
+        whose responses were evidently lost, are removed too.
+
+        Args:
+            response (str): The response, without `\\r\\n`.
+
+        Returns:
+            tuple of (Message, list of Message): The message, which is
+                abandoned if the response arrived too late and should be
+                discarded, and the messages whose responses were lost, oldest
+                first.
+
+        Raises:
+            KeyError: No message matches the response. Nothing is removed.
+        """
+
+        message = self._echoes[_echo_key(response[1:])][0]
+
+        lost = []
+        while self.peek() is not message:
+            lost.append(self._pop())
+
+        return (self._pop(), lost)
+
+    def expire(self):
+        """
+        Evicts abandoned messages at the front that are older than `expiry`.
+        The IR box answers in order, so only the front needs checking.
+
+        Returns:
+            int: The number of abandoned messages evicted.
+        """
+
+        deadline = time.monotonic() - self.expiry
+        evicted = 0
+
+        while self._count:
+            head = self.peek()
+            if not head.abandoned or head.abandoned_at > deadline:
+                break
+            self._pop()
+            evicted += 1
+
+        return evicted
+
+    def clear(self):
+        """
+        Removes every message.
+
+        Returns:
+            list of Message: The messages removed, oldest first.
+        """
+
+        messages = list(self._messages())
+
+        self._slots = [None] * self.capacity
+        self._head = 0
+        self._count = 0
+        self._ids = {}
+        self._echoes = {}
+        self._abandoned = 0
+
+        return messages
+
+    def _pop(self):
+        """
+        Removes and returns the oldest message.
+
+        This is a low-level method and not meant to be called directly.
+
+        Returns:
+            Message: The oldest message.
+        """
+
+        message = self._slots[self._head]
+        self._slots[self._head] = None
+        self._head = (self._head + 1) % self.capacity
+        self._count -= 1
+        del self._ids[message.message_id]
+
+        # The oldest message is also the oldest with its echo key
+        key = _echo_key(message.request)
+        echoes = self._echoes[key]
+        echoes.popleft()
+        if not echoes:
+            del self._echoes[key]
+
+        if message.abandoned:
+            self._abandoned -= 1
+
+        return message
+
+    def _messages(self):
+        """
+        Returns every message held, oldest first.
+
+        This is a low-level method and not meant to be called directly.
+
+        Returns:
+            generator of Message: The messages.
+        """
+
+        return (
+                self._slots[(self._head + index) % self.capacity]
+                for index in range(self._count)
+        )
+
+def _echo_key(command):
+    """
+    Returns the form of a command that its response is matched by: the
+    command with whitespace around its arguments removed, and arguments that
+    are integers written in lowercase hex. A response then matches its
+    command whether the IR box echoes arguments as they were sent or as it
+    parsed them (e.g., `tx(8, 1,2)` as `tx(0x8,0x1,0x2)`).
+
+    This is a low-level function and not meant to be called directly.
+
+    Args:
+        command (str): The command, or a response without its leading `+` or
+            `-`.
+
+    Returns:
+        str: The echo key.
+    """
+
+    name, parenthesis, args = command.partition('(')
+    if not parenthesis or not args.endswith(')'):
+        return command.strip()
+
+    return f"{name.strip()}({','.join(_echo_arg(arg) for arg in args[:-1].split(','))})"
+
+def _echo_arg(arg):
+    """
+    Returns the form of a command argument that its echo is matched by.
+
+    This is a low-level function and not meant to be called directly.
+
+    Args:
+        arg (str): The argument.
+
+    Returns:
+        str: The argument in lowercase hex if it is an integer, or as is
+            otherwise, without surrounding whitespace.
+    """
+
+    arg = arg.strip()
+
+    try:
+        return hex(int(arg, 0))
+    except ValueError:
+        return arg
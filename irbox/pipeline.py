@@ -0,0 +1,198 @@
+"""
+Contains class to track messages pipelined over one IR box connection.
+"""
+
+import logging
+import threading
+
+from irbox.count_generator import count_generator
+from irbox.message import Message
+from irbox.pending import PendingStore
+
+logger = logging.getLogger(__name__)
+
+class Pipeline:
+    """
+    Class to track messages pipelined over one IR box connection: registers
+    each message as it is written, and routes each response read back to the
+    message it belongs to (see `PendingStore`). Safe to use from several
+    threads at once.
+
+    Attributes:
+        metrics (Metrics): Counts lost, late, and unexpected responses.
+        _messages (PendingStore): Messages awaiting a response, in the order
+            they were sent.
+        _message_count_generator (generator of int): Transmitted message count
+            generator.
+        _lock (Lock): Guards `_messages` and `_message_count_generator`.
+    """
+
+    def __init__(self, metrics):
+        """
+        Args:
+            metrics (Metrics): Counts lost, late, and unexpected responses.
+        """
+
+        self.metrics = metrics
+        self._messages = PendingStore()
+        self._message_count_generator = count_generator()
+        self._lock = threading.Lock()
+
+    def stats(self):
+        """
+        Returns pending message statistics.
+
+        Returns:
+            dict: The number of messages `pending` a response, the number of
+                timed out messages held in case their responses arrive late
+                (`abandoned`), and the pending messages table's `capacity`.
+        """
+
+        with self._lock:
+            held = len(self._messages)
+            abandoned = self._messages.abandoned
+
+        return {
+                'pending': held - abandoned,
+                'abandoned': abandoned,
+                'capacity': self._messages.capacity
+        }
+
+    def reserve(self, count):
+        """
+        Makes room for messages about to be registered, dropping timed out
+        messages whose responses never came.
+
+        Args:
+            count (int): The number of messages about to be registered.
+
+        Raises:
+            IrboxError: The pending messages table is full.
+        """
+
+        with self._lock:
+            evicted = self._messages.reserve(count)
+
+        if evicted:
+            self.metrics.increment('lost_responses', evicted)
+
+    def register(self, request=''):
+        """
+        Adds a new message to the pending messages table. Must be called
+        immediately before the message is written, under the same lock as the
+        write, and after making room with `reserve()` (except right after a
+        connect, which empties the table).
+
+        Args:
+            request (str): The message about to be written.
+
+        Returns:
+            Message: The new pending message.
+
+        Raises:
+            IrboxError: The pending messages table is full.
+        """
+
+        with self._lock:
+            pending = Message(next(self._message_count_generator), request)
+            self._messages.add(pending)
+
+        return pending
+
+    def ahead(self, pending):
+        """
+        Returns the requests of the messages in front of a pending message
+        that are still awaiting a response.
+
+        Args:
+            pending (Message): The pending message.
+
+        Returns:
+            list of str: The requests, oldest first.
+        """
+
+        with self._lock:
+            return [message.request for message in self._messages.ahead(pending)]
+
+    def abandon(self, pending):
+        """
+        Stops waiting for a pending message, so that its response is
+        discarded if it arrives late.
+
+        Args:
+            pending (Message): The pending message.
+        """
+
+        with self._lock:
+            self._messages.abandon(pending)
+
+    def clear(self):
+        """
+        Removes every message, e.g., when the connection is closed, waking
+        their waiters as lost, since no response to them will ever arrive.
+        """
+
+        with self._lock:
+            cleared = self._messages.clear()
+
+        for message in cleared:
+            logger.debug('Lost response(%d)', message.message_id)
+            message.lose()
+
+    def is_capture(self, line):
+        """
+        Determines whether or not a line read in receive mode is a ```tx()```
+        command the IR box captured, as opposed to the response to a ```tx```
+        command still pending.
+
+        Args:
+            line (str): The line, without `\\r\\n`.
+
+        Returns:
+            bool: Whether or not the line is a capture.
+        """
+
+        if not line.startswith('+tx('):
+            return False
+
+        with self._lock:
+            return not self._messages.matches(line)
+
+    def resolve(self, response):
+        """
+        Removes the message a response belongs to, waking messages in front
+        of it as lost.
+
+        Args:
+            response (str): The response, without `\\r\\n`.
+
+        Returns:
+            Message: The message to fill in, or `None` if nobody is waiting
+                for the response (it arrived late, or echoes nothing
+                pending).
+        """
+
+        try:
+            with self._lock:
+                pending, lost = self._messages.pop(response)
+        except KeyError:
+            # Not a response to anything pending (e.g., a duplicate), so
+            # nobody gets it
+            logger.debug('Unexpected response: [%s]', response)
+            self.metrics.increment('desyncs')
+            return None
+
+        # The IR box answers in order, so anything in front never will
+        for skipped in lost:
+            logger.debug('Lost response(%d)', skipped.message_id)
+            skipped.lose()
+        if lost:
+            self.metrics.increment('lost_responses', len(lost))
+
+        # Nobody is waiting for a late response
+        if pending.abandoned:
+            logger.debug('Late response(%d): [%s]', pending.message_id, response)
+            self.metrics.increment('late_responses')
+            return None
+
+        return pending
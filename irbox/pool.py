@@ -0,0 +1,162 @@
+"""
+Contains class to manage several IR boxes and route remotes to them.
+"""
+
+import logging
+import threading
+
+from irbox.errors import IrboxError
+from irbox.irbox import IrBox
+
+logger = logging.getLogger(__name__)
+
+class IrBoxPool:
+    """
+    Class to manage several IR boxes (devices), each with its own persistent
+    connection, and route remotes to them. Each device has its own socket,
+    reader thread, and pending messages table, so a slow or dead device never
+    delays commands to another.
+
+    Attributes:
+        DEFAULT (str): ID of the default device, used for remotes with no
+            route.
+        _devices (dict of str to IrBox): Devices, keyed by device ID.
+        _routes (dict of str to str): Device IDs, keyed by remote ID.
+        _lock (Lock): Guards `_devices` and `_routes` during configuration.
+    """
+
+    DEFAULT = 'default'
+
+    def __init__(self, default=None):
+        """
+        Args:
+            default (IrBox): Optional. Existing IR box to use as the default
+                device.
+        """
+
+        self._devices = {}
+        self._routes = {}
+        self._lock = threading.Lock()
+
+        if default is not None:
+            self._devices[self.DEFAULT] = default
+
+    @property
+    def default(self):
+        """
+        Returns the default device.
+
+        Returns:
+            IrBox: The default device, or `None` if there is none.
+        """
+
+        return self._devices.get(self.DEFAULT)
+
+    def devices(self):
+        """
+        Returns all devices.
+
+        Returns:
+            dict of str to IrBox: Devices, keyed by device ID.
+        """
+
+        return dict(self._devices)
+
+    def add_device(self, device_id, host, port, retry=False):
+        """
+        Adds a device and soft connects to it. If the device already exists,
+        it is soft connected to the new host and port instead.
+
+        Args:
+            device_id (str): The device ID.
+            host (str): The host to connect to.
+            port (int): The port to connect to.
+            retry (bool): Whether or not to attempt to reconnect on response
+                timeout.
+
+        Returns:
+            IrBox: The device.
+        """
+
+        with self._lock:
+            device = self._devices.get(device_id)
+            if device is None:
+                device = IrBox()
+                self._devices[device_id] = device
+
+        # We don't care about errors right now since we're only doing a soft
+        # connect
+        try:
+            device.connect(host, port, True)
+        except IrboxError:
+            pass
+
+        device.retry = retry
+
+        return device
+
+    def set_device(self, device_id, device):
+        """
+        Adds a device that is already configured, or replaces an existing
+        one (e.g., with a `BrokerClient`).
+
+        Args:
+            device_id (str): The device ID.
+            device (IrBox): The device.
+        """
+
+        with self._lock:
+            self._devices[device_id] = device
+
+    def route(self, remote_id, device_id):
+        """
+        Routes a remote to a device.
+
+        Args:
+            remote_id (str): The remote ID.
+            device_id (str): The device ID.
+
+        Raises:
+            KeyError: The device does not exist.
+        """
+
+        if device_id not in self._devices:
+            raise KeyError(device_id)
+
+        with self._lock:
+            self._routes[remote_id] = device_id
+
+    def get(self, remote_id=None):
+        """
+        Returns the device a remote is routed to.
+
+        Args:
+            remote_id (str): The remote ID, or `None` for the default device.
+
+        Returns:
+            IrBox: The device the remote is routed to, or the default device
+                if the remote has no route.
+        """
+
+        return self._devices[self._routes.get(remote_id, self.DEFAULT)]
+
+    def stats(self):
+        """
+        Returns statistics for each device.
+
+        Returns:
+            dict of str to dict: Device statistics (see `IrBox.stats()`),
+                keyed by device ID, each with the IDs of the remotes routed to
+                the device added under `remotes`.
+        """
+
+        stats = {}
+        for device_id, device in list(self._devices.items()):
+            stats[device_id] = device.stats()
+            stats[device_id]['remotes'] = sorted(
+                    remote_id
+                    for remote_id, route in list(self._routes.items())
+                    if route == device_id
+            )
+
+        return stats
@@ -0,0 +1,111 @@
+"""
+Contains class to fan out messages to several readers.
+"""
+
+import threading
+
+class RingBuffer:
+    """
+    Class to fan out messages to several readers. Holds the most recent
+    `capacity` messages, each numbered with a sequence number. Each reader
+    keeps its own cursor (the sequence number of the next message it wants),
+    so every reader sees every message, and reading never blocks or consumes
+    anything. A reader that falls more than `capacity` messages behind skips
+    ahead to the oldest message still held.
+
+    Attributes:
+        _capacity (int): Maximum number of messages held.
+        _items (list of str): Message storage, indexed by sequence number
+            modulo `_capacity`.
+        _next (int): Sequence number of the next message appended.
+        _condition (Condition): Guards everything above and signals appends.
+    """
+
+    def __init__(self, capacity=256):
+        """
+        Args:
+            capacity (int): Maximum number of messages held.
+        """
+
+        self._capacity = capacity
+        self._items = [None] * capacity
+        self._next = 0
+        self._condition = threading.Condition()
+
+    @property
+    def cursor(self):
+        """
+        Returns a cursor positioned after the newest message, for a new
+        reader that only wants messages from now on.
+
+        Returns:
+            int: The cursor.
+        """
+
+        with self._condition:
+            return self._next
+
+    def append(self, item):
+        """
+        Appends a message, overwriting the oldest one if full, and wakes any
+        waiting readers.
+
+        Args:
+            item (str): The message.
+        """
+
+        with self._condition:
+            self._items[self._next % self._capacity] = item
+            self._next += 1
+            self._condition.notify_all()
+
+    def read(self, cursor=None):
+        """
+        Returns the messages from a cursor onward. Never blocks.
+
+        Args:
+            cursor (int): The reader's cursor, or `None` to start from now.
+                Cursors ahead of the newest message (e.g., from before a
+                restart) start from the oldest message held.
+
+        Returns:
+            tuple of (list of str, int): The messages, oldest first, and the
+                reader's new cursor.
+        """
+
+        with self._condition:
+            oldest = max(self._next - self._capacity, 0)
+
+            if cursor is None:
+                cursor = self._next
+            elif cursor > self._next:
+                cursor = oldest
+
+            start = max(cursor, oldest)
+            items = [
+                    self._items[sequence % self._capacity]
+                    for sequence in range(start, self._next)
+            ]
+
+            return (items, self._next)
+
+    def wait(self, cursor, timeout=None):
+        """
+        Blocks until there is a message at or after a cursor, or the timeout
+        expires.
+
+        Args:
+            cursor (int): The reader's cursor.
+            timeout (float): Maximum number of seconds to wait, or `None` to
+                wait forever.
+
+        Returns:
+            bool: A value indicating whether or not there is a message to
+                read.
+        """
+
+        with self._condition:
+            return self._condition.wait_for(
+                    lambda: self._next != cursor,
+                    timeout
+            )
@@ -0,0 +1,368 @@
+"""
+Contains classes to run scenes: timed sequences of button presses.
+"""
+
+import collections
+import logging
+import threading
+import time
+import uuid
+
+from irbox.errors import IrboxError
+from irbox.errors import QueueFullError
+from irbox.errors import SceneRunningError
+from irbox.scheduler import Priority
+
+logger = logging.getLogger(__name__)
+
+class Press:
+    # pylint: disable=too-few-public-methods
+
+    """
+    A scene step that presses a button one or more times.
+
+    Attributes:
+        device (IrBox): The device to send the ```tx``` command to.
+        args (list of str): ```tx()``` arguments (see `IrBox.tx()`).
+        count (int): Number of presses.
+        interval (float): Seconds from the start of one press to the start of
+            the next.
+    """
+
+    __slots__ = ('device', 'args', 'count', 'interval')
+
+    def __init__(self, device, args, count=1, interval=0.25):
+        """
+        Args:
+            device (IrBox): The device to send the ```tx``` command to.
+            args (list of str): ```tx()``` arguments (see `IrBox.tx()`).
+            count (int): Number of presses.
+            interval (float): Seconds from the start of one press to the
+                start of the next.
+        """
+
+        self.device = device
+        self.args = args
+        self.count = count
+        self.interval = interval
+
+class _Job:
+    # pylint: disable=too-few-public-methods,too-many-instance-attributes
+
+    """
+    A scene being run, or one that has finished.
+
+    Attributes:
+        job_id (str): The job ID.
+        scene (str): The scene name.
+        steps (list of object): The steps: `Press` objects, and numbers of
+            seconds to wait after the previous step finishes.
+        state (str): `queued`, `running`, `succeeded`, or `failed`.
+        step (int): Number of steps finished.
+        presses (int): Number of presses sent.
+        error (str): Why the scene failed, if it did.
+        created (float): Time the job was created (seconds since the epoch).
+        finished (float): Time the job finished (seconds since the epoch),
+            if it has.
+    """
+
+    __slots__ = (
+            'job_id',
+            'scene',
+            'steps',
+            'state',
+            'step',
+            'presses',
+            'error',
+            'created',
+            'finished'
+    )
+
+    def __init__(self, scene, steps):
+        self.job_id = uuid.uuid4().hex
+        self.scene = scene
+        self.steps = steps
+        self.state = 'queued'
+        self.step = 0
+        self.presses = 0
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+
+class SceneRunner:
+    """
+    Class to run scenes in the background, so a sequence of presses and
+    waits completes however the client that started it behaves afterward.
+    Each scene runs on its own thread; its waits are measured from when the
+    previous step finished, and repeated presses are spaced from the start of
+    one press to the start of the next, so the IR box's response time doesn't
+    stretch them.
+
+    A scene stops at the first press the IR box fails or responds negatively
+    to. A press turned away by the scheduler is retried after the time it
+    suggests, up to `ATTEMPTS` times.
+
+    A scene is not started while another run of it is unfinished, nor while
+    `limit` scenes are, so repeated requests can't pile up threads or
+    interleave the same presses.
+
+    Attributes:
+        HISTORY (int): Default number of finished jobs kept.
+        LIMIT (int): Default number of scenes run at once.
+        ATTEMPTS (int): Attempts per press turned away by the scheduler.
+        history (int): Number of finished jobs kept, oldest evicted first.
+        limit (int): Number of scenes run at once.
+        scheduler (Scheduler): Optional. Admits each press as
+            `Priority.INTERACTIVE`.
+        _jobs (OrderedDict of str to _Job): Jobs, oldest first, keyed by job
+            ID.
+        _lock (Lock): Guards `_jobs` and job state.
+        _stop_event (Event): Set to stop every running scene.
+    """
+
+    HISTORY = 64
+
+    LIMIT = 4
+
+    ATTEMPTS = 3
+
+    def __init__(self, history=HISTORY, limit=LIMIT, scheduler=None):
+        """
+        Args:
+            history (int): Number of finished jobs kept.
+            limit (int): Number of scenes run at once.
+            scheduler (Scheduler): Optional. Admits each press as
+                `Priority.INTERACTIVE`.
+        """
+
+        self.history = history
+        self.limit = limit
+        self.scheduler = scheduler
+        self._jobs = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def start(self, scene, steps):
+        """
+        Starts running a scene in the background.
+
+        Args:
+            scene (str): The scene name.
+            steps (list of object): The steps: `Press` objects, and numbers
+                of seconds to wait after the previous step finishes.
+
+        Returns:
+            str: The job ID, for `job()`.
+
+        Raises:
+            SceneRunningError: The scene is already running.
+            QueueFullError: `limit` scenes are already running.
+        """
+
+        job = _Job(scene, steps)
+
+        with self._lock:
+            unfinished = [
+                    other.scene
+                    for other in self._jobs.values()
+                    if other.finished is None
+            ]
+            if scene in unfinished:
+                raise SceneRunningError
+            if len(unfinished) >= self.limit:
+                raise QueueFullError
+
+            self._jobs[job.job_id] = job
+            self._evict()
+
+        threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+        return job.job_id
+
+    def job(self, job_id):
+        """
+        Returns the status of a job.
+
+        Args:
+            job_id (str): The job ID.
+
+        Returns:
+            dict: The job's `id`, `scene`, `state` (`queued`, `running`,
+                `succeeded`, or `failed`), number of steps finished (`step`)
+                and in total (`steps`), number of `presses` sent, `error`
+                message if it failed, and `created` and `finished` times
+                (seconds since the epoch), or `None` if there is no such job.
+        """
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+
+            return {
+                    'id': job.job_id,
+                    'scene': job.scene,
+                    'state': job.state,
+                    'step': job.step,
+                    'steps': len(job.steps),
+                    'presses': job.presses,
+                    'error': job.error,
+                    'created': job.created,
+                    'finished': job.finished
+            }
+
+    def stop(self):
+        """
+        Stops every running scene at its next step or wait.
+        """
+
+        self._stop_event.set()
+
+    def _run(self, job):
+        """
+        Runs a scene's steps in order.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            job (_Job): The job.
+        """
+
+        with self._lock:
+            job.state = 'running'
+
+        # Failed unless every step completes, so the job always finishes and
+        # frees its slot, whatever is raised
+        error = 'Failed'
+        try:
+            for step in job.steps:
+                if isinstance(step, Press):
+                    self._press(job, step)
+                elif not self._sleep(step):
+                    raise IrboxError('Stopped')
+
+                with self._lock:
+                    job.step += 1
+
+            error = None
+        except IrboxError as irbox_error:
+            error = irbox_error.message or 'Failed'
+            logger.warning("Scene `%s' failed: %s", job.scene, error)
+        except Exception as exception: # pylint: disable=broad-except
+            error = str(exception) or type(exception).__name__
+            logger.exception("Scene `%s' failed", job.scene)
+        finally:
+            with self._lock:
+                job.state = 'failed' if error else 'succeeded'
+                job.error = error
+                job.finished = time.time()
+                self._evict()
+
+    def _press(self, job, press):
+        """
+        Presses a button as many times as a step asks, spaced by its
+        interval.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            job (_Job): The job.
+            press (Press): The step.
+
+        Raises:
+            IrboxError: An IR box error, a negative response, or the scene
+                was stopped.
+        """
+
+        for index in range(press.count):
+            started = time.monotonic()
+
+            if not self._send(press.device, press.args):
+                raise IrboxError(press.device.response or 'Negative response')
+
+            with self._lock:
+                job.presses += 1
+
+            if index < press.count - 1:
+                remaining = press.interval - (time.monotonic() - started)
+                if not self._sleep(remaining):
+                    raise IrboxError('Stopped')
+
+    def _send(self, device, args):
+        """
+        Sends a ```tx``` command, through the scheduler if there is one,
+        retrying while it is turned away.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            device (IrBox): The device.
+            args (list of str): ```tx()``` arguments.
+
+        Returns:
+            bool: Whether or not the IR box responded positively.
+
+        Raises:
+            IrboxError: An IR box error, or the scene was stopped.
+        """
+
+        if self.scheduler is None:
+            return device.tx(args)
+
+        for attempt in range(self.ATTEMPTS):
+            try:
+                return self.scheduler.run(
+                        device,
+                        Priority.INTERACTIVE,
+                        'tx',
+                        args
+                )
+            except QueueFullError as queue_full_error:
+                if attempt == self.ATTEMPTS - 1:
+                    raise
+                if not self._sleep(queue_full_error.retry_after):
+                    raise IrboxError('Stopped') from queue_full_error
+
+        return False
+
+    def _sleep(self, seconds):
+        """
+        Waits until a number of seconds have passed, or the runner is
+        stopped.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            seconds (float): Seconds to wait. Nonpositive returns at once.
+
+        Returns:
+            bool: Whether or not the wait completed without being stopped.
+        """
+
+        deadline = time.monotonic() + seconds
+
+        # Event.wait() may return early, so wait out the remainder
+        while not self._stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            self._stop_event.wait(remaining)
+
+        return False
+
+    def _evict(self):
+        """
+        Evicts the oldest finished jobs beyond `history`. Call with `_lock`
+        held.
+
+        This is a low-level method and not meant to be called directly.
+        """
+
+        finished = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job.finished is not None
+        ]
+
+        for job_id in finished[:max(len(finished) - self.history, 0)]:
+            del self._jobs[job_id]
@@ -0,0 +1,287 @@
+"""
+Contains class to admit commands to IR boxes by priority.
+"""
+
+import collections
+import contextlib
+import math
+import threading
+import time
+
+from enum import IntEnum, unique
+
+from irbox.errors import QueueFullError
+
+@unique
+class Priority(IntEnum):
+    """
+    Command priority classes, most urgent first.
+
+    Attributes:
+        INTERACTIVE: Button presses.
+        RX: Entering and leaving receive mode.
+        BACKGROUND: Keepalives.
+        DEBUG: ```invalid``` commands.
+    """
+
+    INTERACTIVE = 0
+    RX = 1
+    BACKGROUND = 2
+    DEBUG = 3
+
+class _Lane:
+    # pylint: disable=too-few-public-methods,too-many-instance-attributes
+
+    """
+    Admission state for one device.
+
+    Attributes:
+        condition (Condition): Guards everything below and signals freed
+            slots.
+        in_flight (int): Commands admitted and not yet finished.
+        queues (dict of Priority to deque of object): Tickets of commands
+            waiting to be admitted, oldest first, keyed by priority class.
+        service (float): Smoothed seconds each command holds its slot.
+        admitted (dict of Priority to int): Commands admitted so far.
+        rejected (dict of Priority to int): Commands turned away so far.
+        wait_total (dict of Priority to float): Total seconds admitted
+            commands waited.
+        wait_max (dict of Priority to float): Longest seconds an admitted
+            command waited.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.queues = {priority: collections.deque() for priority in Priority}
+        self.service = 0.0
+        self.admitted = dict.fromkeys(Priority, 0)
+        self.rejected = dict.fromkeys(Priority, 0)
+        self.wait_total = dict.fromkeys(Priority, 0.0)
+        self.wait_max = dict.fromkeys(Priority, 0.0)
+
+    def next_ticket(self):
+        """
+        Returns the ticket of the command to admit next: the oldest in the
+        most urgent nonempty queue.
+
+        Returns:
+            object: The ticket, or `None` if nothing is waiting.
+        """
+
+        for queue in self.queues.values():
+            if queue:
+                return queue[0]
+
+        return None
+
+class Scheduler:
+    """
+    Class to admit commands to IR boxes by priority. At most `max_in_flight`
+    commands are sent to each device at once (still pipelined, as `IrBox`
+    does); the rest wait in a queue per priority class, and whenever a
+    command finishes, the oldest waiting command of the most urgent class
+    goes next. So button presses overtake keepalives and debugging commands
+    however many of those are waiting.
+
+    Each class's queue holds at most its `queue_limits` entry. A command that
+    finds its queue full, or waits longer than `max_wait`, fails fast with
+    `QueueFullError` rather than piling up behind commands that will time
+    out anyway.
+
+    Attributes:
+        QUEUE_LIMITS (dict of Priority to int): Default queue limits.
+        _SERVICE_GAIN (float): Weight of each new sample in the smoothed
+            time commands hold their slot, used for `Retry-After` estimates.
+        max_in_flight (int): Commands sent to each device at once. `0`
+            admits every command immediately.
+        queue_limits (dict of Priority to int): Commands that may wait per
+            device, keyed by priority class.
+        max_wait (float): Seconds a command may wait to be admitted.
+        _lanes (dict of IrBox to _Lane): Admission state, keyed by device.
+        _lock (Lock): Guards `_lanes`.
+    """
+
+    QUEUE_LIMITS = {
+            Priority.INTERACTIVE: 16,
+            Priority.RX: 4,
+            Priority.BACKGROUND: 2,
+            Priority.DEBUG: 2
+    }
+
+    _SERVICE_GAIN = 1 / 8
+
+    def __init__(self, max_in_flight=0, queue_limits=None, max_wait=5):
+        """
+        Args:
+            max_in_flight (int): Commands sent to each device at once. `0`
+                admits every command immediately.
+            queue_limits (dict of Priority to int): Optional. Commands that
+                may wait per device, keyed by priority class. Classes not
+                given use `QUEUE_LIMITS`.
+            max_wait (float): Seconds a command may wait to be admitted.
+        """
+
+        self.max_in_flight = max_in_flight
+        self.queue_limits = {**self.QUEUE_LIMITS, **(queue_limits or {})}
+        self.max_wait = max_wait
+        self._lanes = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def admit(self, device, priority):
+        """
+        Waits for a command's turn to be sent to a device. Use in a `with`
+        statement around sending the command.
+
+        Args:
+            device (IrBox): The device.
+            priority (Priority): The command's priority class.
+
+        Raises:
+            QueueFullError: The class's queue is full, or the command waited
+                longer than `max_wait`.
+        """
+
+        if self.max_in_flight <= 0:
+            yield
+            return
+
+        lane = self._lane(device)
+        started = time.monotonic()
+
+        with lane.condition:
+            queue = lane.queues[priority]
+
+            if lane.in_flight >= self.max_in_flight or lane.next_ticket() is not None:
+                if len(queue) >= self.queue_limits[priority]:
+                    lane.rejected[priority] += 1
+                    raise QueueFullError(self._retry_after(lane))
+
+                # Wait for a free slot and for every more urgent or older
+                # command to go first
+                ticket = object()
+                queue.append(ticket)
+                admitted = lane.condition.wait_for(
+                        lambda: lane.in_flight < self.max_in_flight
+                                and lane.next_ticket() is ticket,
+                        self.max_wait
+                )
+                queue.remove(ticket)
+
+                # Whoever is next in line may be able to go too
+                lane.condition.notify_all()
+
+                if not admitted:
+                    lane.rejected[priority] += 1
+                    raise QueueFullError(self._retry_after(lane))
+
+            lane.in_flight += 1
+            waited = time.monotonic() - started
+            lane.admitted[priority] += 1
+            lane.wait_total[priority] += waited
+            lane.wait_max[priority] = max(lane.wait_max[priority], waited)
+
+        admitted_at = time.monotonic()
+        try:
+            yield
+        finally:
+            with lane.condition:
+                lane.in_flight -= 1
+                lane.service += self._SERVICE_GAIN * (
+                        time.monotonic() - admitted_at - lane.service
+                )
+                lane.condition.notify_all()
+
+    def run(self, device, priority, name, *args):
+        """
+        Runs a command on a device when its turn comes.
+
+        Args:
+            device (IrBox): The device.
+            priority (Priority): The command's priority class.
+            name (str): The `IrBox` command method name (e.g., `tx`).
+            args (list): Arguments to the command.
+
+        Returns:
+            object: The command's result.
+
+        Raises:
+            IrboxError: An IR box error.
+            QueueFullError: The command was turned away (see `admit()`).
+        """
+
+        with self.admit(device, priority):
+            return getattr(device, name)(*args)
+
+    def stats(self, device):
+        """
+        Returns queue statistics for a device.
+
+        Args:
+            device (IrBox): The device.
+
+        Returns:
+            dict of str to dict: The number of commands waiting (`depth`)
+                and allowed to wait (`limit`), commands `admitted` and
+                `rejected` so far, and the mean and longest seconds admitted
+                commands waited (`wait_mean` and `wait_max`), keyed by
+                lowercase priority class name.
+        """
+
+        lane = self._lane(device)
+
+        with lane.condition:
+            return {
+                    priority.name.lower(): {
+                            'depth': len(lane.queues[priority]),
+                            'limit': self.queue_limits[priority],
+                            'admitted': lane.admitted[priority],
+                            'rejected': lane.rejected[priority],
+                            'wait_mean': round(
+                                    lane.wait_total[priority]
+                                    / max(lane.admitted[priority], 1),
+                                    6
+                            ),
+                            'wait_max': round(lane.wait_max[priority], 6)
+                    }
+                    for priority in Priority
+            }
+
+    def _lane(self, device):
+        """
+        Returns a device's admission state, creating it if needed.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            device (IrBox): The device.
+
+        Returns:
+            _Lane: The admission state.
+        """
+
+        with self._lock:
+            lane = self._lanes.get(device)
+            if lane is None:
+                lane = self._lanes[device] = _Lane()
+
+        return lane
+
+    def _retry_after(self, lane):
+        """
+        Estimates how long until a device's queues drain. Call with the
+        lane's condition held.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            lane (_Lane): The device's admission state.
+
+        Returns:
+            int: Seconds, at least 1.
+        """
+
+        waiting = sum(len(queue) for queue in lane.queues.values())
+
+        return max(math.ceil(waiting * lane.service / self.max_in_flight), 1)
@@ -0,0 +1,429 @@
+"""
+Contains a stand-in IR box: a TCP server that speaks the IR box line protocol,
+with configurable latency and fault injection, for testing and benchmarking
+without hardware.
+
+Run it with `python -m irbox.simulator` (see `--help`), then point
+`HOST_ADDRESS` and `HOST_PORT` at it.
+"""
+
+import argparse
+import logging
+import random
+import socket
+import struct
+import threading
+import time
+
+from irbox.line_reader import LineReader
+from irbox.protocol import Protocol
+from irbox.timing import TimingModel
+
+logger = logging.getLogger(__name__)
+
+class Simulator:
+    # pylint: disable=too-many-instance-attributes
+
+    """
+    Stand-in IR box. Accepts any number of connections, each handled on its
+    own thread. Like the real IR box, it sends `+` on connect, answers each
+    command in order (`+nop`, `+tx(...)`, `+rx`, `+norx`, or `-` followed by
+    the command if it is invalid), and in receive mode writes a
+    ```tx()``` command every `rx_interval` seconds until ```norx```.
+
+    Each response is delayed by `latency`, plus up to `jitter`, plus the
+    command's on-air time (see `TimingModel.on_air()`) if `on_air` is set.
+    Faults are injected per command with the given probabilities.
+
+    Attributes:
+        RX_COMMANDS (tuple of str): ```tx()``` arguments written in receive
+            mode, in rotation.
+        host (str): The host to listen on.
+        port (int): The port listened on. If constructed with `0`, an
+            ephemeral port is chosen and set here once started.
+        latency (float): Seconds before each response.
+        jitter (float): Maximum additional random seconds before each
+            response.
+        on_air (bool): Whether or not to also wait for each ```tx```
+            command's on-air time.
+        drop (float): Probability that a response is never sent.
+        reset (float): Probability that the connection is reset instead of a
+            response being sent.
+        desync (float): Probability that a response is sent twice.
+        rx_interval (float): Seconds between ```tx()``` commands written in
+            receive mode.
+        _random (Random): Fault and jitter source.
+        _server (socket): Listening socket.
+        _connections (set of socket): Open connections.
+        _lock (Lock): Guards `_connections` and `_random`.
+        _stop_event (Event): Set to stop the server.
+        _thread (Thread): Accept thread.
+    """
+
+    RX_COMMANDS = (
+            '0x8,0x4,0x8',
+            '0x13,0x1,0x15,0xc',
+            '0x15,0x87ee,0x5'
+    )
+
+    def __init__(
+            self,
+            host='127.0.0.1',
+            port=4333,
+            *,
+            latency=0.0,
+            jitter=0.0,
+            on_air=False,
+            drop=0.0,
+            reset=0.0,
+            desync=0.0,
+            rx_interval=1.0,
+            seed=None
+    ):
+        # pylint: disable=too-many-arguments
+
+        """
+        Args:
+            host (str): The host to listen on.
+            port (int): The port to listen on, or `0` for any free port.
+            latency (float): Seconds before each response.
+            jitter (float): Maximum additional random seconds before each
+                response.
+            on_air (bool): Whether or not to also wait for each ```tx```
+                command's on-air time.
+            drop (float): Probability that a response is never sent.
+            reset (float): Probability that the connection is reset instead
+                of a response being sent.
+            desync (float): Probability that a response is sent twice.
+            rx_interval (float): Seconds between ```tx()``` commands written
+                in receive mode.
+            seed (int): Optional. Random seed, for reproducible faults.
+        """
+
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.on_air = on_air
+        self.drop = drop
+        self.reset = reset
+        self.desync = desync
+        self.rx_interval = rx_interval
+        self._random = random.Random(seed)
+        self._server = None
+        self._connections = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Starts listening, if not already listening.
+
+        Returns:
+            int: The port listened on.
+        """
+
+        if self._thread is not None:
+            return self.port
+
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((self.host, self.port))
+        self._server.listen()
+        self.port = self._server.getsockname()[1]
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+
+        logger.info('Listening on %s:%d', self.host, self.port)
+
+        return self.port
+
+    def stop(self):
+        """
+        Stops listening and closes every connection.
+        """
+
+        self._stop_event.set()
+
+        if self._server is not None:
+            try:
+                self._server.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._server.close()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            _close(connection)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def respond(self, command):
+        """
+        Returns the IR box's response to a command.
+
+        Args:
+            command (str): The command, without `\\r\\n`.
+
+        Returns:
+            str: The response, without `\\r\\n`.
+        """
+
+        if command in ('nop', 'rx', 'norx'):
+            return f'+{command}'
+
+        if command.startswith('tx(') and command.endswith(')'):
+            args = command[3:-1].split(',')
+            try:
+                protocol = Protocol(int(args[0], 0))
+                values = [int(arg, 0) for arg in args]
+            except (IndexError, ValueError):
+                return f'-{command}'
+
+            # Sony takes bits, then optional repeats; NEC and Apple take
+            # optional repeats
+            if protocol == Protocol.SONY:
+                valid = len(values) in (4, 5)
+            elif protocol in (Protocol.NEC, Protocol.APPLE):
+                valid = len(values) in (3, 4)
+            else:
+                valid = False
+
+            return f'+{command}' if valid else f'-{command}'
+
+        return f'-{command}'
+
+    def _accept(self):
+        """
+        Accept thread main loop.
+
+        This is a low-level method and not meant to be called directly.
+        """
+
+        while not self._stop_event.is_set():
+            try:
+                connection, address = self._server.accept()
+            except OSError:
+                # Server socket closed
+                return
+
+            logger.info('Connection from %s:%d', *address)
+
+            with self._lock:
+                self._connections.add(connection)
+
+            threading.Thread(
+                    target=self._serve,
+                    args=(connection,),
+                    daemon=True
+            ).start()
+
+    def _serve(self, connection):
+        """
+        Handles one connection until it is closed.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            connection (socket): The connection.
+        """
+
+        write_lock = threading.Lock()
+        rx_stop = threading.Event()
+        rx_stop.set()
+
+        def write(line):
+            with write_lock:
+                connection.sendall(line.encode('ascii') + b'\r\n')
+
+        try:
+            write('+')
+
+            line_reader = LineReader(connection)
+            while True:
+                line = line_reader.readline()
+                if line is None:
+                    break
+
+                command = line.decode('ascii', 'replace').strip()
+                if command == '':
+                    continue
+
+                if not self._handle(connection, command, write, rx_stop):
+                    break
+        except OSError:
+            # Connection reset or closed by stop()
+            pass
+        finally:
+            rx_stop.set()
+            with self._lock:
+                self._connections.discard(connection)
+            _close(connection)
+
+    def _handle(self, connection, command, write, rx_stop):
+        """
+        Responds to one command, injecting faults.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            connection (socket): The connection.
+            command (str): The command.
+            write (function): Writes a line to the connection.
+            rx_stop (Event): Cleared while in receive mode.
+
+        Returns:
+            bool: Whether or not the connection is still open.
+        """
+
+        response = self.respond(command)
+
+        with self._lock:
+            roll = self._random.random()
+            delay = self.latency + self._random.uniform(0, self.jitter)
+
+        if self.on_air and response[:1] == '+':
+            delay += TimingModel.on_air(command) or 0.0
+
+        time.sleep(delay)
+
+        # Faults, in order of severity
+        if roll < self.reset:
+            logger.info('Injecting reset after [%s]', command)
+            _reset(connection)
+            return False
+        roll -= self.reset
+        if roll < self.drop:
+            logger.info('Dropping response to [%s]', command)
+            return True
+        roll -= self.drop
+
+        write(response)
+        if roll < self.desync:
+            logger.info('Duplicating response to [%s]', command)
+            write(response)
+
+        # Enter or leave receive mode
+        if response == '+rx' and rx_stop.is_set():
+            rx_stop.clear()
+            threading.Thread(
+                    target=self._emit,
+                    args=(write, rx_stop),
+                    daemon=True
+            ).start()
+        elif response == '+norx':
+            rx_stop.set()
+
+        return True
+
+    def _emit(self, write, rx_stop):
+        """
+        Writes ```tx()``` commands until receive mode ends.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            write (function): Writes a line to the connection.
+            rx_stop (Event): Set when receive mode ends.
+        """
+
+        index = 0
+        while not rx_stop.wait(self.rx_interval):
+            try:
+                write(f'+tx({self.RX_COMMANDS[index % len(self.RX_COMMANDS)]})')
+            except OSError:
+                return
+            index += 1
+
+def _close(connection):
+    """
+    Closes a connection, ignoring errors.
+
+    Args:
+        connection (socket): The connection.
+    """
+
+    try:
+        connection.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    connection.close()
+
+def _reset(connection):
+    """
+    Resets a connection (sends RST rather than FIN).
+
+    Args:
+        connection (socket): The connection.
+    """
+
+    connection.setsockopt(
+            socket.SOL_SOCKET,
+            socket.SO_LINGER,
+            struct.pack('ii', 1, 0)
+    )
+    connection.close()
+
+def main():
+    """
+    Runs the simulator until interrupted.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4333)
+    parser.add_argument('--latency', type=float, default=0.0,
+            help='seconds before each response')
+    parser.add_argument('--jitter', type=float, default=0.0,
+            help='maximum additional random seconds before each response')
+    parser.add_argument('--on-air', action='store_true',
+            help="also wait for each tx command's on-air time")
+    parser.add_argument('--drop', type=float, default=0.0,
+            help='probability that a response is never sent')
+    parser.add_argument('--reset', type=float, default=0.0,
+            help='probability that the connection is reset instead')
+    parser.add_argument('--desync', type=float, default=0.0,
+            help='probability that a response is sent twice')
+    parser.add_argument('--rx-interval', type=float, default=1.0,
+            help='seconds between tx() commands written in receive mode')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    simulator = Simulator(
+            args.host,
+            args.port,
+            latency=args.latency,
+            jitter=args.jitter,
+            on_air=args.on_air,
+            drop=args.drop,
+            reset=args.reset,
+            desync=args.desync,
+            rx_interval=args.rx_interval,
+            seed=args.seed
+    )
+    simulator.start()
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+Contains class to keep an IR box connection alive in the background.
+"""
+
+import logging
+import random
+import threading
+
+from irbox.errors import IrboxError
+from irbox.errors import QueueFullError
+from irbox.scheduler import Priority
+
+logger = logging.getLogger(__name__)
+
+class Supervisor:
+    # pylint: disable=too-many-instance-attributes
+
+    """
+    Class to keep an IR box connection alive in the background. Sends a
+    ```nop``` whenever the connection has been idle for `interval` seconds,
+    treats an unanswered ```nop``` as a half-open connection, and reconnects
+    with exponential backoff and full jitter. While supervised, the IR box
+    fails fast instead of reconnecting on the caller's thread.
+
+    Attributes:
+        _POLL (float): Maximum seconds between connection checks while
+            connected, so a connection closed by the peer is noticed quickly.
+        _irbox (IrBox): The IR box to supervise.
+        _interval (float): Idle seconds before sending a keepalive ```nop```.
+        _backoff_min (float): Initial reconnect backoff ceiling, in seconds.
+        _backoff_max (float): Maximum reconnect backoff ceiling, in seconds.
+        _scheduler (Scheduler): Optional. Admits keepalives as
+            `Priority.BACKGROUND`.
+        _attempts (int): Consecutive failed reconnect attempts.
+        _stop_event (Event): Set to stop the supervisor thread.
+        _thread (Thread): Supervisor thread.
+    """
+
+    _POLL = 1
+
+    def __init__(
+            self,
+            irbox,
+            interval,
+            backoff_min=0.5,
+            backoff_max=30,
+            scheduler=None
+    ):
+        # pylint: disable=too-many-arguments
+
+        """
+        Args:
+            irbox (IrBox): The IR box to supervise.
+            interval (float): Idle seconds before sending a keepalive
+                ```nop```.
+            backoff_min (float): Initial reconnect backoff ceiling, in
+                seconds.
+            backoff_max (float): Maximum reconnect backoff ceiling, in
+                seconds.
+            scheduler (Scheduler): Optional. Admits keepalives as
+                `Priority.BACKGROUND`.
+        """
+
+        self._irbox = irbox
+        self._interval = interval
+        self._backoff_min = backoff_min
+        self._backoff_max = backoff_max
+        self._scheduler = scheduler
+        self._attempts = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Starts the supervisor thread, if not already running.
+        """
+
+        if self._thread is not None:
+            return
+
+        self._irbox.fail_fast = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the supervisor thread and returns the IR box to reconnecting on
+        the caller's thread.
+        """
+
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        self._irbox.fail_fast = False
+
+    def _run(self):
+        """
+        Supervisor thread main loop.
+
+        This is a low-level method and not meant to be called directly.
+        """
+
+        while not self._stop_event.is_set():
+            if not self._irbox.connected:
+                delay = self._reconnect()
+            else:
+                delay = self._keepalive()
+
+            self._stop_event.wait(delay)
+
+    def _reconnect(self):
+        """
+        Makes one reconnect attempt.
+
+        This is a low-level method and not meant to be called directly.
+
+        Returns:
+            float: Seconds to wait before the next check.
+        """
+
+        try:
+            self._irbox.reconnect()
+        except IrboxError as irbox_error:
+            # Full jitter: wait anywhere up to an exponentially growing
+            # ceiling, so that several workers don't retry in lockstep
+            ceiling = min(
+                    self._backoff_max,
+                    self._backoff_min * 2 ** self._attempts
+            )
+            self._attempts += 1
+            delay = random.uniform(0, ceiling)
+
+            logger.info(
+                    'Reconnect attempt %d failed (%s); retrying in %.2f s',
+                    self._attempts,
+                    irbox_error.message,
+                    delay
+            )
+
+            return delay
+
+        self._attempts = 0
+        logger.info('Reconnected')
+
+        return 0
+
+    def _keepalive(self):
+        """
+        Sends a keepalive ```nop``` if the connection has been idle for
+        `_interval` seconds.
+
+        This is a low-level method and not meant to be called directly.
+
+        Returns:
+            float: Seconds to wait before the next check.
+        """
+
+        idle = self._irbox.idle
+        if idle < self._interval:
+            return min(self._interval - idle, self._POLL)
+
+        # Any response, even a negative one, means the connection is alive
+        try:
+            if self._scheduler is None:
+                success = self._irbox.nop()
+            else:
+                success = self._scheduler.run(
+                        self._irbox,
+                        Priority.BACKGROUND,
+                        'nop'
+                )
+            alive = success or self._irbox.response[:1] == '-'
+        except QueueFullError:
+            # Busy with other commands, which will do
+            return self._POLL
+        except IrboxError:
+            alive = False
+
+        if not alive and self._irbox.connected:
+            # No answer, so assume the connection is half-open
+            logger.info('Keepalive failed; dropping connection')
+            try:
+                self._irbox.close()
+            except IrboxError:
+                pass
+
+            return 0
+
+        return min(self._interval, self._POLL)
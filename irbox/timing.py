@@ -0,0 +1,160 @@
+"""
+Contains class to estimate how long the IR box should take to respond to a
+command.
+"""
+
+import threading
+
+from irbox.protocol import Protocol
+
+class TimingModel:
+    """
+    Class to estimate how long the IR box should take to respond to a command,
+    so that lost responses are noticed quickly without failing long
+    transmissions.
+
+    A command's deadline is its expected on-air time, computed from its
+    protocol and repeat count, plus that of every command pipelined ahead of
+    it on the same connection (the IR box transmits one command at a time),
+    plus the overhead (network and processing) learned from observed
+    response latencies, each measured from when the IR box could start on the
+    command. The overhead estimate works like TCP's retransmission timeout: a
+    smoothed mean plus four times the smoothed mean deviation.
+
+    Attributes:
+        FRAME_PERIODS (dict of Protocol to float): Seconds from the start of
+            one frame to the start of the next, per supported protocol. Each
+            repeat adds one period.
+        _GAIN (float): Weight of each new sample in the smoothed overhead.
+        _DEVIATION_GAIN (float): Weight of each new sample in the smoothed
+            deviation.
+        _DEVIATIONS (int): Number of smoothed deviations to allow for.
+        _floor (float): Minimum deadline, in seconds.
+        _ceiling (float): Maximum allowance for overhead, in seconds, and the
+            deadline for commands with no known on-air time.
+        _overhead (float): Smoothed overhead, in seconds.
+        _deviation (float): Smoothed mean deviation of the overhead, in
+            seconds.
+        _lock (Lock): Guards `_overhead` and `_deviation`.
+    """
+
+    FRAME_PERIODS = {
+            Protocol.NEC: 0.110,
+            Protocol.APPLE: 0.110,
+            Protocol.SONY: 0.045
+    }
+
+    _GAIN = 1 / 8
+    _DEVIATION_GAIN = 1 / 4
+    _DEVIATIONS = 4
+
+    def __init__(self, floor=0.5, ceiling=5, overhead=1.0, deviation=0.5):
+        """
+        Args:
+            floor (float): Minimum deadline, in seconds.
+            ceiling (float): Maximum allowance for overhead, in seconds, and
+                the deadline for commands with no known on-air time.
+            overhead (float): Initial overhead estimate, in seconds.
+            deviation (float): Initial overhead deviation estimate, in
+                seconds.
+        """
+
+        self._floor = floor
+        self._ceiling = ceiling
+        self._overhead = overhead
+        self._deviation = deviation
+        self._lock = threading.Lock()
+
+    @classmethod
+    def on_air(cls, request):
+        """
+        Returns the expected on-air time of a command.
+
+        Args:
+            request (str): The command, as sent to the IR box (e.g.,
+                `tx(0x13,0x1,0x14,0xc,0x2)`).
+
+        Returns:
+            float: Expected on-air time, in seconds, `0` for commands that do
+                not transmit, or `None` if unknown (including empty requests,
+                which wait for the IR box rather than command it).
+        """
+
+        command, _, args = request.partition('(')
+
+        if command == '':
+            return None
+        if command != 'tx':
+            return 0.0
+
+        args = args.rstrip(')').split(',')
+        try:
+            protocol = Protocol(int(args[0], 0))
+        except ValueError:
+            return None
+
+        period = cls.FRAME_PERIODS.get(protocol)
+        if period is None:
+            return None
+
+        # Sony has bits before repeats
+        repeats_index = 4 if protocol == Protocol.SONY else 3
+        try:
+            repeats = int(args[repeats_index], 0)
+        except IndexError:
+            repeats = 0
+        except ValueError:
+            return None
+
+        return period * (1 + repeats)
+
+    def deadline(self, request, ahead=()):
+        """
+        Returns how long to wait for the response to a command.
+
+        Args:
+            request (str): The command, as sent to the IR box.
+            ahead (iterable of str): Commands sent before it on the same
+                connection and not yet answered, which the IR box transmits
+                first. Those with no known on-air time count as `0`.
+
+        Returns:
+            float: Seconds to wait.
+        """
+
+        on_air = self.on_air(request)
+        if on_air is None:
+            return self._ceiling
+
+        for earlier in ahead:
+            on_air += self.on_air(earlier) or 0.0
+
+        with self._lock:
+            overhead = self._overhead + self._DEVIATIONS * self._deviation
+
+        return max(self._floor, on_air + min(overhead, self._ceiling))
+
+    def observe(self, request, latency):
+        """
+        Learns from an observed response latency.
+
+        Args:
+            request (str): The command, as sent to the IR box.
+            latency (float): Seconds from when the IR box could start on the
+                command (once it was written and the response to the command
+                before it was read) to reading its response. Time spent
+                behind commands pipelined ahead of it must not be included,
+                or the overhead estimate grows with concurrency.
+        """
+
+        on_air = self.on_air(request)
+        if on_air is None:
+            return
+
+        sample = max(latency - on_air, 0.0)
+
+        with self._lock:
+            self._deviation += self._DEVIATION_GAIN * (
+                    abs(sample - self._overhead) - self._deviation
+            )
+            self._overhead += self._GAIN * (sample - self._overhead)
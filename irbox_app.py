@@ -4,20 +4,35 @@ Flask app.
 
 import logging
 import os
+import threading
 
 from flask import Flask
 
-from irbox.errors import IrboxError
-
-from app import irbox
+from irbox.scheduler import Priority
+
+from app import coalescer
+from app import include_index
+from app import scene_runner
+from app import scheduler
+from app.api import api_blueprint
+from app.asset_pipeline import asset_manifest
+from app.asset_pipeline import asset_url
+from app.assets import assets_blueprint
+from app.devices import configure_devices
+from app.devices import use_broker
 from app.error import error_blueprint
 from app.include import check_safety
 from app.index import index_blueprint
 from app.invalid import invalid_blueprint
+from app.metrics import metrics_blueprint
 from app.nop import nop_blueprint
 from app.norx import norx_blueprint
+from app.ready import ready_blueprint
 from app.remote import remote_blueprint
 from app.rx import rx_blueprint
+from app.scene import check_scenes
+from app.scene import scene_blueprint
+from app.stats import stats_blueprint
 from app.status import status_blueprint
 from app.tx import tx_blueprint
 
@@ -26,6 +41,21 @@ _ENV = 'IRBOX_CONFIG'
 Name of config file environment variable.
 """
 
+_supervisors = {}
+"""
+Background connection supervisors, keyed by device ID.
+"""
+
+_initialized = threading.Event()
+"""
+Set once `init()` has succeeded.
+"""
+
+_init_lock = threading.Lock()
+"""
+Guards `_initialized`.
+"""
+
 logger = logging.getLogger(__name__)
 
 # Set up logging depending on whether or not we're using the built-in Flask
@@ -59,35 +89,93 @@ for remote_id in app.config['REMOTES']:
 app.jinja_env.trim_blocks = True
 app.jinja_env.lstrip_blocks = True
 
+# Serve built static assets, preferring them wherever static files are
+# referenced
+asset_manifest.load()
+app.jinja_env.globals['asset_url'] = asset_url
+
 # Register blueprints
+app.register_blueprint(api_blueprint)
+app.register_blueprint(assets_blueprint)
 app.register_blueprint(error_blueprint)
 app.register_blueprint(index_blueprint)
 app.register_blueprint(invalid_blueprint)
+app.register_blueprint(metrics_blueprint)
 app.register_blueprint(nop_blueprint)
 app.register_blueprint(norx_blueprint)
+app.register_blueprint(ready_blueprint)
 app.register_blueprint(remote_blueprint)
 app.register_blueprint(rx_blueprint)
+app.register_blueprint(scene_blueprint)
+app.register_blueprint(stats_blueprint)
 app.register_blueprint(status_blueprint)
 app.register_blueprint(tx_blueprint)
 
-@app.before_first_request
+# Find each remote's includes now, so views don't touch the filesystem
+include_index.build(app)
+
 def init():
     """
-    Establish soft connection to the IR box immediately before the first
-    request.
+    Configure IR box devices and establish soft connections to them (see
+    `configure_devices()`), or use the broker's if `BROKER_SOCKET` is set.
+    Safe to call more than once; once a call succeeds, later calls have no
+    effect. If a call raises, the next one carries on where it left off.
     """
 
-    # We don't care about errors right now since we're only doing a soft
-    # connect. It's up to each routine that communicates with the IR box from
-    # here on out to handle them, though.
-    try:
-        irbox.connect(app.config['HOST_ADDRESS'], app.config['HOST_PORT'], True)
-    except IrboxError:
-        pass
-
-    # If we should use retry, configure that
-    if app.config['RETRY']:
-        irbox.retry = True
+    if _initialized.is_set():
+        return
+
+    with _init_lock:
+        if _initialized.is_set():
+            return
+
+        _configure()
+        _initialized.set()
+
+def _configure():
+    """
+    Does the work of `init()`.
+    """
+
+    # Admit commands by priority, if configured
+    scheduler.max_in_flight = app.config['MAX_IN_FLIGHT']
+    for name, limit in app.config['QUEUE_LIMITS'].items():
+        try:
+            scheduler.queue_limits[Priority[name.upper()]] = limit
+        except KeyError:
+            logger.warning(
+                    "QUEUE_LIMITS names unknown priority class `%s'. Expected "
+                    'one of %s. Ignoring it.',
+                    name,
+                    ', '.join(priority.name.lower() for priority in Priority)
+            )
+
+    # Use the broker's connections if configured, or make our own
+    if app.config['BROKER_SOCKET']:
+        use_broker(app.config)
+    else:
+        configure_devices(app.config, _supervisors)
+
+    # Merge repeated button presses, if configured
+    coalescer.window = app.config['COALESCE_WINDOW']
+
+    # Check scenes now, since they are otherwise only built when started
+    check_scenes(app.config)
+
+    # Cap scenes run at once
+    scene_runner.limit = app.config['MAX_SCENES']
+
+    # Watch for remote includes being added or removed, if configured
+    if app.config['INCLUDE_POLL_INTERVAL']:
+        include_index.start(app.config['INCLUDE_POLL_INTERVAL'])
+
+# Initialize now if configured to connect eagerly, so that the connection is
+# warm before the WSGI server starts serving. Otherwise, wait for the first
+# request. (Every request checks, but only the first does any work.)
+if app.config['EAGER_CONNECT']:
+    init()
+else:
+    app.before_request(init)
 
 # Kick off Flask in debug mode
 if __name__ == '__main__':
@@ -0,0 +1,273 @@
+"""
+ASGI app serving the JSON command API (see `app.api`) with `AsyncIrBox`
+devices. Each waiting request holds a future on the ASGI server's event loop
+rather than a worker thread, so one process can hold many commands waiting
+on the IR box at once. Serve it with any ASGI server that runs one event loop
+per process (e.g., `uvicorn irbox_asgi:app`). Reads the same configuration
+file as the app.
+
+Only the commands are served. The IR box handles one session at a time, so
+don't point this and the WSGI app (or a broker) at the same IR box.
+"""
+
+import json
+import logging
+import os
+import time
+from urllib.parse import parse_qs
+
+from flask import Config
+
+from irbox.async_irbox import AsyncIrBox
+from irbox.errors import IrboxError
+from irbox.pool import IrBoxPool
+
+from app.tx import build_args
+
+_ENV = 'IRBOX_CONFIG'
+"""
+Name of config file environment variable.
+"""
+
+_PREFIX = '/api/v1'
+"""
+Path prefix of the command endpoints.
+"""
+
+logger = logging.getLogger(__name__)
+
+logging.basicConfig(level=logging.WARNING)
+
+class AsgiApp:
+    # pylint: disable=too-few-public-methods
+
+    """
+    ASGI app serving ```tx```, ```nop```, ```rx```, ```norx```, and
+    ```invalid``` at the same paths, with the same JSON results, as
+    `app.api`. Devices and remote routes come from the configuration;
+    `MAX_IN_FLIGHT`, `QUEUE_LIMITS`, and `COALESCE_WINDOW` don't apply, since
+    commands are pipelined straight to each device.
+
+    Every request must be served on the same event loop, which the devices'
+    connections are bound to on first use.
+
+    Attributes:
+        config (Config): The configuration.
+        pool (IrBoxPool): `AsyncIrBox` devices, with remotes routed to them.
+    """
+
+    def __init__(self, config):
+        """
+        Args:
+            config (Config): The configuration.
+        """
+
+        self.config = config
+
+        # Soft connect only. Connections are made on the first command, on
+        # the server's event loop.
+        self.pool = IrBoxPool(AsyncIrBox(config['HOST_ADDRESS'], config['HOST_PORT']))
+        for device_id, (host, port) in config['DEVICES'].items():
+            self.pool.set_device(device_id, AsyncIrBox(host, port))
+        for device in self.pool.devices().values():
+            device.retry = config['RETRY']
+
+        for remote_id, device_id in config['REMOTE_DEVICES'].items():
+            try:
+                self.pool.route(remote_id, device_id)
+            except KeyError:
+                logger.warning(
+                        "Remote `%s' is routed to unknown device `%s'. Using "
+                        'the default device instead.',
+                        remote_id,
+                        device_id
+                )
+
+    async def __call__(self, scope, receive, send):
+        """
+        ASGI entry point.
+
+        Args:
+            scope (dict): The connection scope.
+            receive (callable): Awaitable that returns the next event.
+            send (callable): Awaitable that sends an event.
+        """
+
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, send)
+
+    async def _lifespan(self, receive, send):
+        """
+        Handles server startup and shutdown. With `EAGER_CONNECT`, connects
+        to each IR box on startup. Closes every connection on shutdown.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            receive (callable): Awaitable that returns the next event.
+            send (callable): Awaitable that sends an event.
+        """
+
+        while True:
+            event = await receive()
+
+            if event['type'] == 'lifespan.startup':
+                if self.config['EAGER_CONNECT']:
+                    await self._connect()
+                await send({'type': 'lifespan.startup.complete'})
+            elif event['type'] == 'lifespan.shutdown':
+                for device in self.pool.devices().values():
+                    await device.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _connect(self):
+        """
+        Connects to each IR box and waits for its handshake.
+
+        This is a low-level method and not meant to be called directly.
+        """
+
+        for device_id, device in self.pool.devices().items():
+            try:
+                await device.connect(device.host, device.port)
+            except IrboxError as irbox_error:
+                logger.warning(
+                        "Unable to connect to device `%s': %s",
+                        device_id,
+                        irbox_error.message
+                )
+
+    async def _http(self, scope, send):
+        """
+        Runs the command a request names and sends its JSON result.
+
+        This is a low-level method and not meant to be called directly.
+
+        Args:
+            scope (dict): The connection scope.
+            send (callable): Awaitable that sends an event.
+        """
+
+        started = time.perf_counter()
+
+        path = scope['path']
+        name = path[len(_PREFIX) + 1:] if path.startswith(f'{_PREFIX}/') else None
+        if name not in ('tx', 'nop', 'rx', 'norx', 'invalid'):
+            await _send(send, 404, b'Not Found', 'text/plain; charset=utf-8')
+            return
+        if scope['method'] != 'GET':
+            await _send(send, 405, b'Method Not Allowed', 'text/plain; charset=utf-8')
+            return
+
+        query = {
+                key: values[0]
+                for key, values in parse_qs(scope['query_string'].decode('latin-1')).items()
+        }
+
+        # Receive mode belongs to the default device, as in app.api
+        if name in ('rx', 'norx'):
+            device = self.pool.default
+        else:
+            device = self.pool.get(query.get('remote'))
+
+        args = []
+        if name == 'tx':
+            try:
+                args.append(build_args(
+                        query.get('p'),
+                        query.get('a'),
+                        query.get('c'),
+                        query.get('r'),
+                        query.get('b')
+                ))
+            except IrboxError as irbox_error:
+                await _send_result(send, False, irbox_error.message, started, 400)
+                return
+
+        try:
+            success = await getattr(device, name)(*args)
+            message = device.response
+        except IrboxError as irbox_error:
+            success = False
+            message = irbox_error.message
+
+        await _send_result(send, success, message, started)
+
+async def _send_result(send, success, message, started, status=200):
+    """
+    Sends a JSON command result, as `app.api.api_response()` builds it.
+
+    This is a low-level function and not meant to be called directly.
+
+    Args:
+        send (callable): Awaitable that sends an event.
+        success (bool): Whether or not the IR box responded positively.
+        message (str): The IR box response, or an error message.
+        started (float): `time.perf_counter()` before the command was sent.
+        status (int): HTTP status code.
+    """
+
+    body = json.dumps({
+            'latency': round(time.perf_counter() - started, 6),
+            'response': message,
+            'success': success
+    }).encode('utf-8')
+
+    await _send(
+            send,
+            status,
+            body,
+            'application/json',
+            [(b'irbox-success', b'true' if success else b'false')]
+    )
+
+async def _send(send, status, body, content_type, headers=()):
+    """
+    Sends a complete response.
+
+    This is a low-level function and not meant to be called directly.
+
+    Args:
+        send (callable): Awaitable that sends an event.
+        status (int): HTTP status code.
+        body (bytes): Response body.
+        content_type (str): Content type.
+        headers (list of tuple of (bytes, bytes)): Additional headers.
+    """
+
+    await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                    (b'content-type', content_type.encode('latin-1')),
+                    (b'content-length', str(len(body)).encode('latin-1')),
+                    *headers
+            ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+def create_app():
+    """
+    Loads the default configuration, then the runtime configuration, and
+    creates the app.
+
+    Returns:
+        AsgiApp: The app.
+    """
+
+    config = Config(os.getcwd())
+    config.from_object('app.config.DefaultConfig')
+    try:
+        config.from_envvar(_ENV)
+    except RuntimeError:
+        logger.warning(
+                'The IRBOX_CONFIG environment variable is not set. '
+                'Proceeding with default configuration.'
+        )
+
+    return AsgiApp(config)
+
+app = create_app()
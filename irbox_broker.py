@@ -0,0 +1,63 @@
+"""
+IR box broker. Owns every IR box connection and serves the devices to the
+IR box app's WSGI workers over the Unix domain socket at `BROKER_SOCKET`.
+Reads the same configuration file as the app.
+"""
+
+import logging
+import os
+import sys
+import threading
+
+from flask import Config
+
+from irbox.broker import Broker
+
+from app import pool
+from app.devices import configure_devices
+
+_ENV = 'IRBOX_CONFIG'
+"""
+Name of config file environment variable.
+"""
+
+logger = logging.getLogger(__name__)
+
+def main():
+    """
+    Configure IR box devices and serve them until interrupted.
+    """
+
+    logging.basicConfig(level=logging.INFO)
+
+    # Load default configuration, then runtime configuration
+    config = Config(os.getcwd())
+    config.from_object('app.config.DefaultConfig')
+    try:
+        config.from_envvar(_ENV)
+    except RuntimeError:
+        logger.warning(
+                'The IRBOX_CONFIG environment variable is not set. '
+                'Proceeding with default configuration.'
+        )
+
+    if not config['BROKER_SOCKET']:
+        logger.error('BROKER_SOCKET is not set.')
+        sys.exit(1)
+
+    supervisors = configure_devices(config)
+
+    broker = Broker(pool, config['BROKER_SOCKET'])
+    broker.start()
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.stop()
+        for supervisor in supervisors.values():
+            supervisor.stop()
+
+if __name__ == '__main__':
+    main()
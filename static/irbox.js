@@ -36,6 +36,22 @@ document.addEventListener('DOMContentLoaded', function() {
   /* The last timeout for callbacks */
   window._timeout = null;
 
+  /* Receive mode cursor: where the next /rx/message poll picks up */
+  window._rxCursor = null;
+
+  /* Receive mode: stream captures from /rx/stream if supported, rather than
+     polling /rx/message. Set to false to force polling. */
+  window._rxStream = typeof EventSource !== 'undefined';
+
+  /* The receive mode event stream, while open */
+  window._rxEventSource = null;
+
+  /* Send commands through the JSON API (/api/v1/...), which answers in a
+     single response, rather than through the HTML endpoints, which redirect
+     to a rendered result page. Set to true in a remote script to use the JSON
+     API; results are then rendered in the same style as the result pages. */
+  window._useApi = false;
+
   /* The Start button */
   window._start = document.getElementById('start');
 
@@ -51,7 +67,7 @@ document.addEventListener('DOMContentLoaded', function() {
  * Sends a nop command to the IR box.
  */
 function nop() {
-  _request('/nop');
+  _request('/nop' + _remoteQuery('?'));
 }
 
 /*
@@ -63,7 +79,7 @@ function tx(args) {
     if (Number.isInteger(args[key])) args[key] = '0x' + args[key].toString(16);
   }
 
-  _request('/tx?' + new URLSearchParams(args));
+  _request('/tx?' + new URLSearchParams(args) + _remoteQuery('&'));
 }
 
 /*
@@ -86,7 +102,17 @@ function norx() {
  * Sends an invalid command to the IR box (for debugging purposes).
  */
 function invalid() {
-  _request('/invalid');
+  _request('/invalid' + _remoteQuery('?'));
+}
+
+/*
+ * Starts a scene, which the IR box app runs in the background.
+ *
+ * Args:
+ *     name (str): The scene name.
+ */
+function scene(name) {
+  _request('/scene/' + encodeURIComponent(name), 0, true, 'POST');
 }
 
 /*
@@ -96,12 +122,18 @@ function invalid() {
  *     start (bool): Start if true, stop if false.
  */
 function rxMessages(start = true) {
-  if (start) {
+  if (_rxStream) {
+    _rxMessagesStream(start);
+  } else if (start) {
     /* Call me again in one second */
     _timeout = setTimeout(rxMessages, 250);
 
-    /* Request a message */
-    _request('/rx/message', 3);
+    /* Request any messages since the last poll */
+    _request(
+      '/rx/message'
+      + (_rxCursor === null ? '' : '?' + new URLSearchParams({ 'cursor': _rxCursor })),
+      3
+    );
   } else {
     /* Cancel timeout */
     clearTimeout(_timeout);
@@ -109,6 +141,54 @@ function rxMessages(start = true) {
   }
 }
 
+/*
+ * Processes received messages as they are pushed from /rx/stream, for receive
+ * mode.
+ *
+ * Args:
+ *     start (bool): Start if true, stop if false.
+ */
+function _rxMessagesStream(start) {
+  if (start) {
+    if (_rxEventSource) return;
+
+    /* Pick up where polling left off, if it ran */
+    _rxEventSource = new EventSource(
+      '/rx/stream'
+      + (_rxCursor === null ? '' : '?' + new URLSearchParams({ 'cursor': _rxCursor }))
+    );
+
+    /* Log each message as it arrives */
+    _rxEventSource.onmessage = function(e) {
+      _rxCursor = e.lastEventId;
+      _logRxMessage(e.data);
+    };
+  } else if (_rxEventSource) {
+    /* Close stream */
+    _rxEventSource.close();
+    _rxEventSource = null;
+  }
+}
+
+/*
+ * Logs a received message to the inner receive mode page.
+ *
+ * Args:
+ *     message (str): The raw message.
+ */
+function _logRxMessage(message) {
+  messages = document.getElementById('messages')
+
+  /* Ignore empty messages */
+  if (messages && message !== '') {
+    messages.innerHTML += (
+      '<li><span class="message">'
+      + _formatMessage(message)
+      + '</span></li>'
+    );
+  }
+}
+
 /*
  * Toggles visibility of the response container.
  */
@@ -205,35 +285,152 @@ function _getAltState() {
   return false;
 }
 
+/*
+ * Returns the query string parameter that routes a command to the current
+ * remote's IR box, or an empty string if not on a remote page.
+ *
+ * Args:
+ *     separator (str): The separator to prepend ('?' or '&').
+ */
+function _remoteQuery(separator) {
+  if (!window._remoteId) return '';
+
+  return separator + new URLSearchParams({ 'remote': _remoteId });
+}
+
+/*
+ * Escapes text for inclusion in HTML.
+ *
+ * Args:
+ *     text (str): The text.
+ *
+ * Returns:
+ *     str: The escaped text.
+ */
+function _escapeHtml(text) {
+  var element = document.createElement('span');
+  element.textContent = text;
+
+  return element.innerHTML;
+}
+
+/*
+ * Formats a JSON API result for the response container, like the result pages
+ * of the HTML endpoints (see command-base.html).
+ *
+ * Args:
+ *     result (object): The result, with success, response, and latency.
+ *     uri (str): The URI requested, without the JSON API prefix.
+ *
+ * Returns:
+ *     str: An HTML document describing the result.
+ */
+function _formatApiResult(result, uri) {
+  /* Commands named as their result pages name them */
+  var commands = {
+    '/tx': 'Transmit',
+    '/nop': 'No-op',
+    '/invalid': 'Invalid Command'
+  };
+  var path = uri.split('?')[0];
+  var command = commands[path] || (path.startsWith('/scene/') ? 'Scene' : 'Command');
+  var title = command + (result.success ? ' Succeeded' : ' Failed');
+
+  /* The page's first stylesheet is the one the result pages use (see
+     base.html) */
+  var stylesheet = document.querySelector('link[rel="stylesheet"]');
+
+  /* Format the response like code if it appears to be an IR box response,
+     breaking at commas */
+  var response = String(result.response);
+  var message = _escapeHtml(response).replace(/,/g, ',<wbr>');
+  if (response[0] === '+' || response[0] === '-') {
+    message = '<span class="message">' + message + '</span>';
+  }
+
+  return (
+    '<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8">'
+    + (stylesheet !== null
+      ? '<link rel="stylesheet" href="' + _escapeHtml(stylesheet.href).replace(/"/g, '&quot;') + '">'
+      : '')
+    + '<title>' + title + '</title></head><body>'
+    + '<h1>' + title + '</h1>'
+    + '<p>' + message + '.</p>'
+    + '<dl><dt>Latency</dt><dd>' + (result.latency * 1000).toFixed(1) + ' ms</dd></dl>'
+    + '</body></html>'
+  );
+}
+
+/*
+ * Determines whether or not a JSON API request succeeded: HTTP 200, and the IR
+ * box responded positively.
+ *
+ * Args:
+ *     request (XMLHttpRequest): The completed request.
+ *
+ * Returns:
+ *     bool: Whether or not the request succeeded.
+ */
+function _apiSucceeded(request) {
+  if (request.status !== 200) return false;
+
+  try {
+    return JSON.parse(request.responseText).success === true;
+  } catch (e) {
+    return false;
+  }
+}
+
 /*
  * Performs an asynchronous GET request. Updates the status "LED" to indicate
  * progress.
  *
  * Args:
- *     uri (str): The URI with GET parameters to request.
+ *     uri (str): The URI with GET parameters to request. Command URIs (all
+ *         but the inner receive mode stage) are sent to the JSON API if
+ *         _useApi is set.
  *     receiveMode (int): Receive mode stage. 0 to disable (for normal
  *         requests), 1 for an outer rx (Start), 2 for an outer norx (Stop),
  *         and 3 for the second stage (inner).
+ *     json (bool): Whether or not the URI always answers in JSON, like the
+ *         JSON API (e.g., scenes), and so is requested as is.
+ *     method (str): The HTTP method.
  */
-function _request(uri, receiveMode = 0) {
+function _request(uri, receiveMode = 0, json = false, method = 'GET') {
   var request = new XMLHttpRequest();
 
+  /* Use the JSON API for commands, if enabled */
+  var api = json || (_useApi && receiveMode < 3);
+
   /* Set up request */
-  request.open('GET', uri, true);
+  request.open(method, (api && !json ? '/api/v1' : '') + uri, true);
 
   /* Called when request performs an action */
   request.onload = function(e) {
     /* Request completed */
     if (request.readyState === 4) {
-      /* HTTP 200 */
-      if (request.status === 200) {
+      /* HTTP 200, or a JSON API result (which may be HTTP 400 for malformed
+         arguments, or HTTP 202 for a scene started, 409 for one already
+         running, or 503 for too many running) */
+      if (request.status === 200 || (api && [202, 400, 409, 503].includes(request.status))) {
         /* Either no receive mode, or all receive modes except inner page */
         if (receiveMode < 3) {
           /* Receive mode */
           if (receiveMode > 0) _statusColor(_statusGenericColor);
 
+          /* Receive mode, but the JSON API says the command failed (e.g.,
+             HTTP 503 when too busy): leave the buttons as they are */
+          if (receiveMode > 0 && api && !_apiSucceeded(request)) {
+            /* Log error */
+            console.error(request.responseText);
+
+            /* Failure status */
+            _statusColor(_statusFailureColor);
+
+            /* Undo starting (or stopping) the inner page */
+            _responseContainer.contentWindow.rxMessages(receiveMode === 2);
           /* Receive mode Start button */
-          if (receiveMode === 1) {
+          } else if (receiveMode === 1) {
             /* Disable Start button, enable Stop button */
             _start.attributes.setNamedItem(document.createAttribute('disabled'));
             _stop.attributes.removeNamedItem('disabled');
@@ -255,23 +452,21 @@ function _request(uri, receiveMode = 0) {
           /* Not receive mode */
           if (receiveMode === 0) {
             /* Update response */
-            _responseContainer.srcdoc = request.responseText;
+            if (api) {
+              _responseContainer.srcdoc = _formatApiResult(JSON.parse(request.responseText), uri);
+            } else {
+              _responseContainer.srcdoc = request.responseText;
+            }
           }
         /* Receive mode, inner page */
         } else {
-          messages = document.getElementById('messages')
-
-          if (messages) {
-            /* Ignore empty messages */
-            if (request.responseText !== '') {
-              /* Log message */
-              messages.innerHTML += (
-                '<li><span class="message">'
-                + _formatMessage(request.responseText)
-                + '</span></li>'
-              );
-            }
+          /* Pick up where this poll left off */
+          if (request.getResponseHeader('Irbox-Cursor') !== null) {
+            _rxCursor = request.getResponseHeader('Irbox-Cursor');
           }
+
+          /* One message per line */
+          request.responseText.split('\n').forEach(_logRxMessage);
         }
       /* HTTP other than 200 */
       } else {
@@ -0,0 +1,119 @@
+"""
+Tests for the ASGI command API against the simulator.
+"""
+
+import asyncio
+import json
+import os
+import unittest
+
+from flask import Config
+
+from irbox.simulator import Simulator
+
+from irbox_asgi import AsgiApp
+
+async def _get(app, path, query=b''):
+    """
+    Sends a GET request to an ASGI app.
+
+    Args:
+        app (AsgiApp): The app.
+        path (str): The request path.
+        query (bytes): The query string.
+
+    Returns:
+        tuple of (int, dict of bytes to bytes, bytes): The status, headers,
+            and body.
+    """
+
+    events = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(event):
+        events.append(event)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query}
+    await app(scope, receive, send)
+
+    return (events[0]['status'], dict(events[0]['headers']), events[1]['body'])
+
+class AsgiAppTest(unittest.TestCase):
+    """
+    Concurrent requests are pipelined over one connection per device, on one
+    event loop, and get the same JSON results as the WSGI API.
+    """
+
+    def setUp(self):
+        self.simulator = Simulator(port=0, latency=0.01)
+        self.simulator.start()
+
+        config = Config(os.getcwd())
+        config.from_object('app.config.DefaultConfig')
+        config['HOST_ADDRESS'] = '127.0.0.1'
+        config['HOST_PORT'] = self.simulator.port
+        self.app = AsgiApp(config)
+
+    def tearDown(self):
+        self.simulator.stop()
+
+    def _run(self, coroutine):
+        """
+        Runs a coroutine, then the app's shutdown, on one event loop.
+        """
+
+        async def run():
+            try:
+                return await coroutine
+            finally:
+                for device in self.app.pool.devices().values():
+                    await device.close()
+
+        return asyncio.run(run())
+
+    def test_tx(self):
+        """
+        A ```tx``` request returns its own response.
+        """
+
+        status, headers, body = self._run(
+                _get(self.app, '/api/v1/tx', b'p=0x8&a=0x1&c=0x2')
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'irbox-success'], b'true')
+        self.assertEqual(json.loads(body)['response'], '+tx(0x8,0x1,0x2)')
+
+    def test_concurrent(self):
+        """
+        Requests waiting at once each get their own response.
+        """
+
+        async def run():
+            return await asyncio.gather(*(
+                    _get(self.app, '/api/v1/tx', f'p=0x8&a=0x1&c={hex(command)}'.encode())
+                    for command in range(50)
+            ))
+
+        results = self._run(run())
+
+        for command, (status, _, body) in enumerate(results):
+            self.assertEqual(status, 200)
+            self.assertEqual(json.loads(body)['response'], f'+tx(0x8,0x1,{hex(command)})')
+
+    def test_errors(self):
+        """
+        Malformed arguments are a 400, and unknown paths a 404.
+        """
+
+        status, _, body = self._run(_get(self.app, '/api/v1/tx'))
+        self.assertEqual(status, 400)
+        self.assertFalse(json.loads(body)['success'])
+
+        status, _, _ = self._run(_get(self.app, '/api/v1/scene'))
+        self.assertEqual(status, 404)
+
+if __name__ == '__main__':
+    unittest.main()
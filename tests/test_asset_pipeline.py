@@ -0,0 +1,243 @@
+"""
+Tests for the static asset pipeline's minifiers and builds.
+"""
+
+import glob
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+
+from app.asset_pipeline import MANIFEST
+from app.asset_pipeline import build
+from app.asset_pipeline import minify_css
+from app.asset_pipeline import minify_js
+from app.asset_pipeline import prune
+
+class MinifyJsTest(unittest.TestCase):
+    """
+    Comments and indentation go; strings, template literals, regular
+    expression literals, and line breaks stay.
+    """
+
+    def test_comments(self):
+        """
+        Line and block comments are dropped, keeping line breaks.
+        """
+
+        source = (
+                '/*\n * Header\n */\n'
+                'function f(a) {\n'
+                '  // Comment\n'
+                '  var b = a; /* inline */ return b;\n'
+                '}\n'
+        )
+
+        self.assertEqual(
+                minify_js(source),
+                'function f(a) {\nvar b = a;   return b;\n}'
+        )
+
+    def test_strings(self):
+        """
+        Comment-like text in strings and template literals is kept.
+        """
+
+        source = (
+                "var a = '// not a comment';\n"
+                'var b = "/* nor */ this \\" // one";\n'
+                'var c = `line\n  // kept ${a}`;\n'
+        )
+
+        self.assertEqual(
+                minify_js(source),
+                "var a = '// not a comment';\n"
+                'var b = "/* nor */ this \\" // one";\n'
+                'var c = `line\n// kept ${a}`;'
+        )
+
+    def test_regex(self):
+        """
+        Regular expression literals are kept, even with slashes, quotes, and
+        comment-like text in them.
+        """
+
+        source = (
+                "var a = s.replace(/\\/\\/.*'/g, '');\n"
+                'var b = [/[/*]/];\n'
+                'function c(s) { return /a\\/*b/.test(s); }\n'
+        )
+
+        self.assertEqual(minify_js(source), source.strip())
+
+    def test_division(self):
+        """
+        Slashes after identifiers, numbers, and closing brackets are
+        divisions.
+        """
+
+        source = 'var a = b / c / 2; var d = (a) / e[0] / f; // g / h\n'
+
+        self.assertEqual(
+                minify_js(source),
+                'var a = b / c / 2; var d = (a) / e[0] / f;'
+        )
+
+    @unittest.skipUnless(shutil.which('node'), 'node not installed')
+    def test_static_scripts(self):
+        """
+        Every script in `static/` still parses once minified.
+        """
+
+        scripts = glob.glob('static/**/*.js', recursive=True)
+        scripts = [script for script in scripts if 'dist' not in script.split(os.sep)]
+        self.assertTrue(scripts)
+
+        with tempfile.TemporaryDirectory() as directory:
+            for script in scripts:
+                with open(script, encoding='utf-8') as source:
+                    minified = minify_js(source.read())
+
+                path = os.path.join(directory, 'minified.js')
+                with open(path, 'w', encoding='utf-8') as output:
+                    output.write(minified)
+
+                result = subprocess.run(
+                        ['node', '--check', path],
+                        capture_output=True,
+                        check=False,
+                        text=True
+                )
+                self.assertEqual(result.returncode, 0, f'{script}: {result.stderr}')
+
+class MinifyCssTest(unittest.TestCase):
+    """
+    Comments and insignificant whitespace go; strings stay.
+    """
+
+    def test_minify(self):
+        """
+        Whitespace around punctuation and comments is dropped.
+        """
+
+        source = (
+                '/* Header */\n'
+                'body,\nhtml {\n'
+                '  margin: 0;  /* reset */\n'
+                '  font-family: "Open Sans", sans-serif;\n'
+                '}\n'
+                '\n'
+                '@media (max-width: 600px) {\n'
+                '  a :hover { color: red; }\n'
+                '}\n'
+        )
+
+        self.assertEqual(
+                minify_css(source),
+                'body,html{margin:0;font-family:"Open Sans",sans-serif}'
+                '@media (max-width:600px){a :hover{color:red}}'
+        )
+
+    def test_strings(self):
+        """
+        Comment-like text, punctuation, and whitespace in strings is kept.
+        """
+
+        source = 'a::before { content: "a /* b */ ; } c"; } b { content: \'x , y\' }'
+
+        self.assertEqual(
+                minify_css(source),
+                'a::before{content:"a /* b */ ; } c"}b{content:\'x , y\'}'
+        )
+
+class BuildTest(unittest.TestCase):
+    """
+    Each build is swapped in whole, and previous builds stay until pruned.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory() # pylint: disable=consider-using-with
+        self.static = os.path.join(self.directory.name, 'static')
+        self.output = os.path.join(self.static, 'dist')
+        os.makedirs(self.static)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _build(self, script):
+        """
+        Builds a static directory holding one script.
+
+        Args:
+            script (str): The script.
+
+        Returns:
+            str: The built script's path, relative to the output directory.
+        """
+
+        with open(os.path.join(self.static, 'a.js'), 'w', encoding='utf-8') as source:
+            source.write(script)
+
+        return build(self.static, self.output)['a.js']['path']
+
+    def _manifest(self):
+        """
+        Returns the manifest in the output directory.
+
+        Returns:
+            dict of str to dict: The manifest.
+        """
+
+        with open(os.path.join(self.output, MANIFEST), encoding='utf-8') as manifest:
+            return json.load(manifest)
+
+    def test_rebuild(self):
+        """
+        A rebuild swaps in its manifest, and leaves the previous build's files
+        in place.
+        """
+
+        first = self._build('var a = 1;')
+        second = self._build('var a = 2;')
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(self._manifest()['a.js']['path'], second)
+        for path in (first, second):
+            self.assertTrue(os.path.isfile(os.path.join(self.output, path)), path)
+
+        # Nothing half-written is left behind
+        self.assertEqual(len(os.listdir(self.output)), 3)
+
+    def test_unchanged(self):
+        """
+        Rebuilding unchanged files reuses the existing build.
+        """
+
+        self.assertEqual(self._build('var a = 1;'), self._build('var a = 1;'))
+        self.assertEqual(len(os.listdir(self.output)), 2)
+
+    def test_prune(self):
+        """
+        Pruning keeps the current build and the one before it.
+        """
+
+        paths = []
+        for index in range(4):
+            paths.append(self._build(f'var a = {index};'))
+            # Builds are told apart by modification time
+            time.sleep(0.01)
+
+        # The current build is kept even if it isn't the newest on disk
+        current = self._build('var a = 1;')
+
+        self.assertEqual(len(prune(self.output)), 2)
+        self.assertEqual(
+                sorted(os.listdir(self.output)),
+                sorted([MANIFEST, paths[3].split('/')[0], current.split('/')[0]])
+        )
+
+if __name__ == '__main__':
+    unittest.main()
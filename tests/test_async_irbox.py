@@ -0,0 +1,94 @@
+"""
+Tests for `AsyncIrBox` pipelining against the simulator.
+"""
+
+import asyncio
+import collections
+import unittest
+
+from irbox.async_irbox import AsyncIrBox
+from irbox.simulator import Simulator
+
+class _AsyncIrBox(AsyncIrBox):
+    # pylint: disable=too-few-public-methods
+
+    """
+    `AsyncIrBox` with a short response timeout, so a response dropped last
+    doesn't hold up the tests.
+    """
+
+    _TIMEOUT = 0.5
+
+class AsyncPipeliningTest(unittest.TestCase):
+    """
+    Concurrent tasks pipelined over one connection each get the response to
+    their own command, however many responses are lost, duplicated, or late.
+    """
+
+    TASKS = 8
+    COMMANDS = 40
+
+    def test_faults(self):
+        """
+        A dropped response fails only its own command, and a duplicated one
+        is discarded.
+        """
+
+        async def run(port):
+            irbox = _AsyncIrBox()
+            await irbox.connect('127.0.0.1', port)
+            outcomes = collections.Counter()
+
+            async def caller(index):
+                for command in range(self.COMMANDS):
+                    args = ['0x8', hex(index), hex(command)]
+                    success = await irbox.tx(args)
+                    response = irbox.response
+                    if success:
+                        outcome = 'own' if response == f"+tx({','.join(args)})" else 'other'
+                    else:
+                        outcome = response
+                    outcomes[outcome] += 1
+
+            await asyncio.gather(*(caller(index) for index in range(self.TASKS)))
+            await irbox.close()
+
+            return outcomes
+
+        faults = {'drop': 0.05, 'desync': 0.05}
+        with Simulator(port=0, latency=0.002, jitter=0.003, seed=1, **faults) as simulator:
+            outcomes = asyncio.run(run(simulator.port))
+
+        self.assertEqual(outcomes['other'], 0)
+        self.assertGreater(outcomes['own'], 0)
+        self.assertEqual(
+                outcomes['own'] + outcomes['Response lost'] + outcomes['Response timeout'],
+                self.TASKS * self.COMMANDS
+        )
+
+    def test_late_response(self):
+        """
+        A response that arrives after its command timed out is discarded
+        rather than given to the next command.
+        """
+
+        async def run(simulator):
+            irbox = _AsyncIrBox()
+            await irbox.connect('127.0.0.1', simulator.port)
+
+            simulator.latency = 0.8
+            late = (await irbox.nop(), irbox.response)
+            simulator.latency = 0
+            following = (await irbox.tx(['0x8', '0x1', '0x2']), irbox.response)
+            await irbox.close()
+
+            return (late, following)
+
+        with Simulator(port=0) as simulator:
+            late, following = asyncio.run(run(simulator))
+
+        self.assertEqual(late, (False, 'Response timeout'))
+        self.assertEqual(following, (True, '+tx(0x8,0x1,0x2)'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+Smoke tests for the benchmark harnesses, so that they keep running as the app
+changes.
+"""
+
+import os
+import unittest
+
+from irbox.simulator import Simulator
+
+from bench import e2e
+from bench import line_reader
+from bench import loadgen
+
+class BenchTest(unittest.TestCase):
+    """
+    The harnesses import, and the end-to-end benchmark can load the app and
+    drive it against the simulator.
+    """
+
+    def setUp(self):
+        self.simulator = Simulator(port=0)
+        self.simulator.start()
+        self.cwd = os.getcwd()
+        self.config = os.environ.get('IRBOX_CONFIG')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        if self.config is None:
+            os.environ.pop('IRBOX_CONFIG', None)
+        else:
+            os.environ['IRBOX_CONFIG'] = self.config
+        self.simulator.stop()
+
+    def test_imports(self):
+        """
+        Every harness has its entry point.
+        """
+
+        for module in (e2e, line_reader, loadgen):
+            self.assertTrue(callable(module.main), module.__name__)
+
+    def test_e2e(self):
+        """
+        The end-to-end benchmark loads the app and measures a command.
+        """
+
+        target = e2e.TestClientTarget(e2e.load_app(self.simulator.port))
+
+        result = e2e.run(target, '/api/v1/nop', 2, 10)
+
+        self.assertEqual(result['errors'], 0)
+        self.assertIsNotNone(result['p99_ms'])
+
+if __name__ == '__main__':
+    unittest.main()
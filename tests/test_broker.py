@@ -0,0 +1,130 @@
+"""
+Tests for `Broker` request handling against the simulator.
+"""
+
+import os
+import stat
+import tempfile
+import threading
+import time
+import unittest
+
+from irbox.broker import Broker
+from irbox.broker import BrokerClient
+from irbox.broker import BrokerConnection
+from irbox.errors import MalformedArgumentsError
+from irbox.errors import QueueFullError
+from irbox.irbox import IrBox
+from irbox.pool import IrBoxPool
+from irbox.simulator import Simulator
+
+class _Broker(Broker):
+    # pylint: disable=too-few-public-methods
+
+    """
+    `Broker` with few threads, so they are easy to use up.
+    """
+
+    _WORKERS = 2
+    _WAITERS = 2
+
+class BrokerTest(unittest.TestCase):
+    """
+    Commands are served however many receive mode viewers are waiting, and
+    only malformed arguments are reported as such.
+    """
+
+    def setUp(self):
+        self.simulator = Simulator(port=0)
+        self.simulator.start()
+        self.irbox = IrBox('127.0.0.1', self.simulator.port)
+
+        self.directory = tempfile.TemporaryDirectory() # pylint: disable=consider-using-with
+        self.broker = _Broker(
+                IrBoxPool(self.irbox),
+                os.path.join(self.directory.name, 'broker.sock')
+        )
+        self.broker.start()
+
+        self.connection = BrokerConnection(os.path.join(self.directory.name, 'broker.sock'))
+        self.client = BrokerClient(self.connection)
+
+    def tearDown(self):
+        self.connection.close()
+        self.broker.stop()
+        self.directory.cleanup()
+        self.irbox.close()
+        self.simulator.stop()
+
+    def test_waiters(self):
+        """
+        Long polls beyond every worker don't hold up commands.
+        """
+
+        cursor = self.client.rx_messages.cursor
+        waiters = [
+                threading.Thread(target=self.client.rx_messages.wait, args=(cursor, 2))
+                for _ in range(4)
+        ]
+        for waiter in waiters:
+            waiter.start()
+
+        # Let the long polls reach the broker
+        time.sleep(0.2)
+
+        started = time.monotonic()
+        self.assertTrue(self.client.nop())
+        self.assertLess(time.monotonic() - started, 1)
+
+        for waiter in waiters:
+            waiter.join()
+
+    def test_malformed_arguments(self):
+        """
+        Arguments that don't fit the method are malformed.
+        """
+
+        reply = self.broker.call('default', 'nop', [1])
+        self.assertEqual(reply['error_type'], MalformedArgumentsError.__name__)
+
+        with self.assertRaises(MalformedArgumentsError):
+            self.connection.call('default', 'rx_wait')
+
+    def test_internal_type_error(self):
+        """
+        A `TypeError` raised by the method itself is not reported as
+        malformed arguments.
+        """
+
+        reply = self.broker.call('default', 'get_rx_messages', ['cursor'])
+
+        self.assertIn('error', reply)
+        self.assertNotIn('error_type', reply)
+
+    def test_socket_permissions(self):
+        """
+        Only the broker's owner and group can connect.
+        """
+
+        mode = os.stat(os.path.join(self.directory.name, 'broker.sock')).st_mode
+
+        self.assertEqual(stat.S_IMODE(mode), 0o660)
+
+    def test_queue_full(self):
+        """
+        A full queue is raised by the client as such, with its
+        `retry_after`.
+        """
+
+        def nop():
+            raise QueueFullError(7)
+
+        self.irbox.nop = nop
+
+        with self.assertRaises(QueueFullError) as context:
+            self.client.nop()
+
+        self.assertEqual(context.exception.retry_after, 7)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Tests for `Coalescer` button press merging.
+"""
+
+import threading
+import time
+import unittest
+
+from irbox.coalescer import Coalescer
+
+class _Device:
+    # pylint: disable=too-few-public-methods
+
+    """
+    Stand-in IR box that records each ```tx``` command it is sent.
+
+    Attributes:
+        sent (list of list of str): ```tx()``` arguments of each command.
+        response (str): The last response.
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.response = None
+        self._lock = threading.Lock()
+
+    def tx(self, args): # pylint: disable=invalid-name
+        """
+        Records a ```tx``` command and responds positively.
+        """
+
+        with self._lock:
+            self.sent.append(args)
+        self.response = f"+tx({','.join(args)})"
+
+        return True
+
+class _YieldingLock:
+    """
+    Lock that pauses after each release, so that a thread waiting for it gets
+    in before the releasing thread carries on.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+        time.sleep(0.05)
+
+class CoalescerTest(unittest.TestCase):
+    """
+    Identical presses within the window are sent once, with their repeats
+    merged, and every press gets the result.
+    """
+
+    def _press(self, coalescer, device, args, count):
+        """
+        Presses a button from several threads at once.
+
+        Args:
+            coalescer (Coalescer): The coalescer.
+            device (_Device): The device.
+            args (list of str): ```tx()``` arguments.
+            count (int): Number of presses.
+
+        Returns:
+            list of tuple: Each press's result (see `Coalescer.tx()`).
+        """
+
+        results = []
+        lock = threading.Lock()
+
+        def press():
+            result = coalescer.tx(device, args)
+            with lock:
+                results.append(result)
+
+        threads = [threading.Thread(target=press, daemon=True) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+            self.assertFalse(thread.is_alive(), 'Press never completed')
+
+        return results
+
+    def test_merge(self):
+        """
+        Concurrent identical presses are sent as one command.
+        """
+
+        coalescer = Coalescer(window=0.2)
+        device = _Device()
+
+        results = self._press(coalescer, device, ['0x8', '0x1', '0x2', '0x1'], 5)
+
+        self.assertEqual(device.sent, [['0x8', '0x1', '0x2', '0x9']])
+        self.assertEqual(results, [(True, '+tx(0x8,0x1,0x2,0x9)', 5)] * 5)
+
+    def test_cap(self):
+        """
+        Merged repeats are capped.
+        """
+
+        coalescer = Coalescer(window=0.2, max_repeats=3)
+        device = _Device()
+
+        self._press(coalescer, device, ['0x8', '0x1', '0x2'], 8)
+
+        self.assertEqual(device.sent, [['0x8', '0x1', '0x2', '0x3']])
+
+    def test_join_after_release(self):
+        """
+        A press that joins right after the first press releases the lock
+        doesn't leave both waiting for the other to transmit.
+        """
+
+        coalescer = Coalescer(window=0.2)
+        coalescer._lock = _YieldingLock() # pylint: disable=protected-access
+        device = _Device()
+
+        results = self._press(coalescer, device, ['0x8', '0x1', '0x2'], 2)
+
+        self.assertEqual(device.sent, [['0x8', '0x1', '0x2', '0x1']])
+        self.assertEqual([result[2] for result in results], [2, 2])
+
+        # The batch is closed, so the next press is sent on its own
+        self.assertEqual(
+                self._press(coalescer, device, ['0x8', '0x1', '0x2'], 1),
+                [(True, '+tx(0x8,0x1,0x2)', 1)]
+        )
+
+    def test_not_merged(self):
+        """
+        Unmergeable commands, and every command with no window, are sent as
+        is.
+        """
+
+        device = _Device()
+
+        self.assertEqual(
+                Coalescer(window=0.2).tx(device, ['0x11', '0x7', '0x2']),
+                (True, '+tx(0x11,0x7,0x2)', 1)
+        )
+        self._press(Coalescer(), device, ['0x8', '0x1', '0x2'], 3)
+
+        self.assertEqual(len(device.sent), 4)
+
+if __name__ == '__main__':
+    unittest.main()
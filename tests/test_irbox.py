@@ -0,0 +1,150 @@
+"""
+Tests for `IrBox` pipelining against the simulator.
+"""
+
+import collections
+import threading
+import time
+import unittest
+
+from irbox.irbox import IrBox
+from irbox.simulator import Simulator
+
+class _IrBox(IrBox):
+    # pylint: disable=too-few-public-methods
+
+    """
+    `IrBox` with a short response timeout, so a response dropped last doesn't
+    hold up the tests.
+    """
+
+    _TIMEOUT = 1
+
+class PipeliningTest(unittest.TestCase):
+    """
+    Concurrent callers pipelined over one connection each get the response to
+    their own command, however many responses are lost or duplicated.
+    """
+
+    THREADS = 8
+    COMMANDS = 40
+
+    def _run(self, **faults):
+        """
+        Sends `COMMANDS` distinct ```tx``` commands from each of `THREADS`
+        threads through one `IrBox`.
+
+        Args:
+            faults (dict): Fault probabilities for the simulator.
+
+        Returns:
+            tuple of (Counter, dict): Outcomes (`own` for a successful
+                response echoing the caller's command, `other` for one
+                echoing another command, or the failure response), and the IR
+                box's counters.
+        """
+
+        outcomes = collections.Counter()
+        lock = threading.Lock()
+
+        with Simulator(port=0, latency=0.002, jitter=0.003, seed=1, **faults) as simulator:
+            irbox = _IrBox('127.0.0.1', simulator.port)
+
+            def caller(index):
+                for command in range(self.COMMANDS):
+                    args = ['0x8', hex(index), hex(command)]
+                    success = irbox.tx(args)
+                    response = irbox.response
+                    if success:
+                        outcome = 'own' if response == f"+tx({','.join(args)})" else 'other'
+                    else:
+                        outcome = response
+                    with lock:
+                        outcomes[outcome] += 1
+
+            threads = [
+                    threading.Thread(target=caller, args=(index,))
+                    for index in range(self.THREADS)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            irbox.close()
+
+        return (outcomes, irbox.metrics.counters())
+
+    def test_no_faults(self):
+        """
+        Every caller gets its own response.
+        """
+
+        outcomes, _ = self._run()
+
+        self.assertEqual(outcomes['own'], self.THREADS * self.COMMANDS)
+
+    def test_dropped_responses(self):
+        """
+        A dropped response fails only its own command.
+        """
+
+        outcomes, counters = self._run(drop=0.05)
+
+        self.assertEqual(outcomes['other'], 0)
+        self.assertGreater(outcomes['own'], 0)
+        self.assertGreater(counters['lost_responses'], 0)
+        self.assertEqual(
+                outcomes['own'] + outcomes['Response lost'] + outcomes['Response timeout'],
+                self.THREADS * self.COMMANDS
+        )
+
+    def test_duplicated_responses(self):
+        """
+        A duplicated response is discarded rather than given to the next
+        command.
+        """
+
+        outcomes, counters = self._run(desync=0.05)
+
+        self.assertEqual(outcomes['other'], 0)
+        self.assertEqual(outcomes['own'], self.THREADS * self.COMMANDS)
+        self.assertGreater(counters['desyncs'], 0)
+
+class CloseTest(unittest.TestCase):
+    """
+    Closing the connection fails commands awaiting a response at once.
+    """
+
+    def test_close_wakes_waiters(self):
+        """
+        A caller blocked on a response gets `Response lost` as soon as the
+        connection is closed, rather than waiting out its deadline.
+        """
+
+        results = []
+
+        with Simulator(port=0, latency=3) as simulator:
+            irbox = IrBox('127.0.0.1', simulator.port)
+
+            def caller():
+                results.append((irbox.nop(), irbox.response))
+
+            sent = irbox.stats()['sent']
+            thread = threading.Thread(target=caller, daemon=True)
+            thread.start()
+
+            deadline = time.monotonic() + 5
+            while irbox.stats()['sent'] == sent:
+                self.assertLess(time.monotonic(), deadline, 'Command never sent')
+                time.sleep(0.01)
+
+            started = time.monotonic()
+            irbox.close()
+            thread.join(5)
+
+            self.assertLess(time.monotonic() - started, 1)
+            self.assertEqual(results, [(False, 'Response lost')])
+
+if __name__ == '__main__':
+    unittest.main()
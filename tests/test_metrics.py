@@ -0,0 +1,44 @@
+"""
+Tests for the Prometheus text exposition of IR box metrics.
+"""
+
+import unittest
+
+from irbox.irbox import IrBox
+from irbox.metrics import prometheus_text
+
+class PrometheusTextTest(unittest.TestCase):
+    """
+    Every metric family is described and typed, once, before its samples.
+    """
+
+    def test_help_and_type(self):
+        """
+        Each family has a `# HELP` line, then a `# TYPE` line.
+        """
+
+        device = IrBox()
+        device.metrics.observe_latency('tx', 'NEC', 0.1)
+        device.metrics.increment('sent')
+        queues = {'default': {'interactive': {
+                'depth': 0,
+                'admitted': 1,
+                'rejected': 0,
+                'wait_mean': 0.0,
+                'wait_max': 0.0
+        }}}
+
+        lines = prometheus_text({'default': device}, queues).splitlines()
+
+        helps = [line.split()[2] for line in lines if line.startswith('# HELP ')]
+        types = [line.split()[2] for line in lines if line.startswith('# TYPE ')]
+        self.assertEqual(helps, types)
+        self.assertEqual(len(set(types)), len(types))
+        self.assertIn('irbox_sent_total', types)
+
+        for index, line in enumerate(lines):
+            if line.startswith('# TYPE '):
+                self.assertTrue(lines[index - 1].startswith('# HELP '), line)
+
+if __name__ == '__main__':
+    unittest.main()
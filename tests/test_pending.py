@@ -0,0 +1,265 @@
+"""
+Tests for `PendingStore` and `Pipeline` message tracking.
+"""
+
+import time
+import unittest
+
+from irbox.count_generator import COUNT_MAX
+from irbox.errors import IrboxError
+from irbox.message import Message
+from irbox.metrics import Metrics
+from irbox.pending import PendingStore
+from irbox.pipeline import Pipeline
+
+def _store(requests, **kwargs):
+    """
+    Builds a store holding messages for some requests.
+
+    Args:
+        requests (list of str): The requests, oldest first.
+        kwargs (dict): Arguments to `PendingStore`.
+
+    Returns:
+        tuple of (PendingStore, list of Message): The store and its messages.
+    """
+
+    store = PendingStore(**kwargs)
+    messages = [Message(index, request) for index, request in enumerate(requests)]
+    store.reserve(len(messages))
+    for message in messages:
+        store.add(message)
+
+    return (store, messages)
+
+class PendingStoreTest(unittest.TestCase):
+    """
+    The store never grows past its capacity, and routes each response to the
+    oldest message it echoes.
+    """
+
+    def test_capacity(self):
+        """
+        The store holds 256 messages by default, and makes room only by
+        evicting abandoned ones.
+        """
+
+        store, messages = _store([f'tx(0x8,0x1,{index})' for index in range(256)])
+
+        self.assertEqual(len(store), 256)
+        with self.assertRaises(IrboxError):
+            store.reserve(1)
+        with self.assertRaises(IrboxError):
+            store.add(Message(256, 'nop'))
+
+        store.abandon(messages[0])
+        store.abandon(messages[1])
+        self.assertEqual(store.reserve(2), 2)
+        self.assertEqual(len(store), 254)
+        self.assertIs(store.peek(), messages[2])
+
+        # Only abandoned messages at the front can go
+        store.abandon(messages[10])
+        store.add(Message(256, 'nop'))
+        store.add(Message(257, 'nop'))
+        with self.assertRaises(IrboxError):
+            store.reserve(1)
+
+    def test_expiry(self):
+        """
+        Abandoned messages at the front are evicted once they expire.
+        """
+
+        store, messages = _store(['nop', 'rx', 'norx'], expiry=0.05)
+        store.abandon(messages[0])
+        store.abandon(messages[2])
+
+        self.assertEqual(store.expire(), 0)
+        self.assertEqual(store.abandoned, 2)
+
+        time.sleep(0.1)
+
+        self.assertEqual(store.expire(), 1)
+        self.assertIs(store.peek(), messages[1])
+        self.assertEqual(len(store), 2)
+
+    def test_pop_lost(self):
+        """
+        A response to a later message pops the messages in front of it as
+        lost.
+        """
+
+        store, messages = _store(['nop', 'tx(0x8,0x1,0x2)', 'nop', 'tx(0x8,0x1,0x2)'])
+
+        pending, lost = store.pop('+tx(0x8,0x1,0x2)')
+
+        self.assertIs(pending, messages[1])
+        self.assertEqual(lost, [messages[0]])
+        self.assertIs(store.peek(), messages[2])
+
+    def test_pop_unmatched(self):
+        """
+        A response that echoes nothing held removes nothing.
+        """
+
+        store, _ = _store(['nop', 'rx'])
+
+        with self.assertRaises(KeyError):
+            store.pop('+tx(0x8,0x1,0x2)')
+        self.assertEqual(len(store), 2)
+
+    def test_echo_forms(self):
+        """
+        A response matches its command whether the IR box echoes arguments
+        as sent or as it parsed them.
+        """
+
+        store, messages = _store(['tx(8, 0x1,2)', 'tx(0x13,0X1,0x15,0xC)', 'nop'])
+
+        self.assertTrue(store.matches('+tx(0x8,0x1,0x2)'))
+        self.assertFalse(store.matches('+tx(0x8,0x1,0x3)'))
+        self.assertIs(store.pop('+tx(0x8,0x1,0x2)')[0], messages[0])
+        self.assertIs(store.pop('+tx( 19, 1, 21, 12 )')[0], messages[1])
+        self.assertIs(store.pop('+nop')[0], messages[2])
+
+    def test_abandoned_count(self):
+        """
+        Abandoned messages are counted while held, and only once.
+        """
+
+        store, messages = _store(['nop', 'rx', 'norx'])
+        store.abandon(messages[1])
+        store.abandon(messages[1])
+        store.abandon(Message(3, 'nop'))
+
+        self.assertEqual(store.abandoned, 1)
+
+        store.pop('+norx')
+        self.assertEqual(store.abandoned, 0)
+        self.assertEqual(len(store), 0)
+
+    def test_id_wraparound(self):
+        """
+        Messages keep their order, and can be told apart, as message IDs wrap
+        around at `COUNT_MAX`.
+        """
+
+        store = PendingStore()
+        messages = [
+                Message(message_id, 'nop')
+                for message_id in (COUNT_MAX - 2, COUNT_MAX - 1, 0, 1)
+        ]
+        store.reserve(len(messages))
+        for message in messages:
+            store.add(message)
+
+        self.assertIn(messages[2], store)
+        self.assertNotIn(Message(0, 'nop'), store)
+        self.assertEqual(store.ahead(messages[2]), messages[:2])
+        self.assertEqual([store.pop('+nop')[0] for _ in messages], messages)
+
+    def test_wraparound(self):
+        """
+        Messages keep their order as the slots wrap around.
+        """
+
+        store, _ = _store(['nop', 'rx', 'norx'], capacity=4)
+
+        for index in range(10):
+            request = f'tx(0x8,0x1,{index})'
+            store.reserve(1)
+            store.add(Message(index + 3, request))
+            pending, lost = store.pop('+' + store.peek().request)
+            self.assertEqual(lost, [])
+            self.assertIsNotNone(pending)
+
+        self.assertEqual(
+                [message.request for message in store.clear()],
+                ['tx(0x8,0x1,7)', 'tx(0x8,0x1,8)', 'tx(0x8,0x1,9)']
+        )
+        self.assertEqual(len(store), 0)
+
+class PipelineTest(unittest.TestCase):
+    """
+    Lost, late, and unexpected responses are counted, and never given to the
+    wrong message.
+    """
+
+    def setUp(self):
+        self.metrics = Metrics()
+        self.pipeline = Pipeline(self.metrics)
+
+    def test_lost(self):
+        """
+        Messages skipped by a later response are woken as lost.
+        """
+
+        first = self.pipeline.register('nop')
+        second = self.pipeline.register('nop')
+        third = self.pipeline.register('tx(0x8,0x1,0x2)')
+
+        self.assertIs(self.pipeline.resolve('+tx(0x8,0x1,0x2)'), third)
+        self.assertTrue(first.lost and second.lost)
+        self.assertTrue(first.wait(0))
+        self.assertEqual(self.metrics.counters()['lost_responses'], 2)
+
+    def test_late(self):
+        """
+        A response to an abandoned message is discarded and counted as late.
+        """
+
+        first = self.pipeline.register('nop')
+        second = self.pipeline.register('nop')
+        self.pipeline.abandon(first)
+
+        self.assertIsNone(self.pipeline.resolve('+nop'))
+        self.assertIs(self.pipeline.resolve('+nop'), second)
+        self.assertEqual(self.metrics.counters()['late_responses'], 1)
+        self.assertEqual(self.metrics.counters()['lost_responses'], 0)
+
+    def test_unexpected(self):
+        """
+        A response that echoes nothing pending is discarded and counted as a
+        desync.
+        """
+
+        pending = self.pipeline.register('nop')
+
+        self.assertIsNone(self.pipeline.resolve('+rx'))
+        self.assertFalse(pending.lost)
+        self.assertEqual(self.metrics.counters()['desyncs'], 1)
+        self.assertEqual(self.pipeline.stats()['pending'], 1)
+
+    def test_clear(self):
+        """
+        Clearing wakes every waiter as lost at once, rather than leaving it
+        to wait out its deadline.
+        """
+
+        first = self.pipeline.register('nop')
+        second = self.pipeline.register('tx(0x8,0x1,0x2)')
+
+        self.pipeline.clear()
+
+        self.assertTrue(first.wait(0) and second.wait(0))
+        self.assertTrue(first.lost and second.lost)
+        self.assertEqual(self.pipeline.stats()['pending'], 0)
+
+    def test_reserve_counts_evictions(self):
+        """
+        Abandoned messages evicted to make room are counted as lost.
+        """
+
+        messages = [self.pipeline.register('nop') for _ in range(256)]
+        for message in messages[:3]:
+            self.pipeline.abandon(message)
+
+        self.assertEqual(self.pipeline.stats()['abandoned'], 3)
+
+        self.pipeline.reserve(2)
+
+        self.assertEqual(self.metrics.counters()['lost_responses'], 2)
+        self.assertEqual(self.pipeline.stats()['abandoned'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
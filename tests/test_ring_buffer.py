@@ -0,0 +1,117 @@
+"""
+Tests for `RingBuffer` fan-out.
+"""
+
+import threading
+import time
+import unittest
+
+from irbox.ring_buffer import RingBuffer
+
+class RingBufferTest(unittest.TestCase):
+    """
+    Every reader sees every message held, from its own cursor.
+    """
+
+    def test_read_from_now(self):
+        """
+        A reader without a cursor only sees messages appended after it
+        started.
+        """
+
+        ring_buffer = RingBuffer(4)
+        ring_buffer.append('a')
+
+        items, cursor = ring_buffer.read()
+        self.assertEqual(items, [])
+
+        ring_buffer.append('b')
+        self.assertEqual(ring_buffer.read(cursor), (['b'], 2))
+
+    def test_subscribers(self):
+        """
+        Several readers each see every message, whenever they read.
+        """
+
+        ring_buffer = RingBuffer(8)
+        first = second = ring_buffer.cursor
+
+        ring_buffer.append('a')
+        items, first = ring_buffer.read(first)
+        self.assertEqual(items, ['a'])
+
+        ring_buffer.append('b')
+        items, first = ring_buffer.read(first)
+        self.assertEqual(items, ['b'])
+
+        items, second = ring_buffer.read(second)
+        self.assertEqual(items, ['a', 'b'])
+
+        self.assertEqual(first, second)
+        self.assertEqual(ring_buffer.read(first), ([], 2))
+
+    def test_wraparound(self):
+        """
+        Past the capacity, the oldest messages are overwritten, and a reader
+        that fell behind skips ahead to the oldest message still held.
+        """
+
+        ring_buffer = RingBuffer()
+        cursor = ring_buffer.cursor
+        for index in range(300):
+            ring_buffer.append(str(index))
+
+        items, cursor = ring_buffer.read(cursor)
+        self.assertEqual(items, [str(index) for index in range(44, 300)])
+        self.assertEqual(cursor, 300)
+
+        ring_buffer.append('300')
+        self.assertEqual(ring_buffer.read(cursor), (['300'], 301))
+
+    def test_cursor_ahead(self):
+        """
+        A cursor ahead of the newest message (e.g., from before a restart)
+        starts from the oldest message held.
+        """
+
+        ring_buffer = RingBuffer(4)
+        for item in 'abcdef':
+            ring_buffer.append(item)
+
+        self.assertEqual(ring_buffer.read(100), (['c', 'd', 'e', 'f'], 6))
+
+    def test_wait_timeout(self):
+        """
+        Waiting with nothing to read times out.
+        """
+
+        ring_buffer = RingBuffer(4)
+
+        started = time.monotonic()
+        self.assertFalse(ring_buffer.wait(ring_buffer.cursor, 0.1))
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+
+    def test_wait_append(self):
+        """
+        Every waiting reader wakes when a message is appended.
+        """
+
+        ring_buffer = RingBuffer(4)
+        cursor = ring_buffer.cursor
+        results = []
+
+        def reader():
+            results.append(ring_buffer.wait(cursor, 5))
+
+        threads = [threading.Thread(target=reader) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+
+        ring_buffer.append('a')
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [True] * 3)
+
+if __name__ == '__main__':
+    unittest.main()
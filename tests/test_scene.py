@@ -0,0 +1,166 @@
+"""
+Tests for scenes: `SceneRunner` and building steps from the configuration.
+"""
+
+import time
+import unittest
+
+from irbox.errors import IrboxError
+from irbox.errors import MalformedArgumentsError
+from irbox.errors import SceneRunningError
+from irbox.scene import Press
+from irbox.scene import SceneRunner
+
+from app.scene import build_steps
+
+class _Device:
+    # pylint: disable=too-few-public-methods
+
+    """
+    Stand-in IR box that responds positively to every ```tx``` command, or
+    raises an error if given one.
+
+    Attributes:
+        error (Exception): Raised by every ```tx``` command, if set.
+        response (str): The last response.
+    """
+
+    def __init__(self, error=None):
+        self.error = error
+        self.response = None
+
+    def tx(self, args): # pylint: disable=invalid-name
+        """
+        Responds positively, or raises `error`.
+        """
+
+        if self.error is not None:
+            raise self.error
+
+        self.response = f"+tx({','.join(args)})"
+
+        return True
+
+class SceneRunnerTest(unittest.TestCase):
+    """
+    Every job finishes, however its presses fail.
+    """
+
+    def _finish(self, runner, job_id):
+        """
+        Waits for a job to finish.
+
+        Args:
+            runner (SceneRunner): The runner.
+            job_id (str): The job ID.
+
+        Returns:
+            dict: The job's status.
+        """
+
+        deadline = time.monotonic() + 5
+        while runner.job(job_id)['finished'] is None:
+            self.assertLess(time.monotonic(), deadline, 'Job never finished')
+            time.sleep(0.01)
+
+        return runner.job(job_id)
+
+    def test_succeeded(self):
+        """
+        A scene whose presses all succeed succeeds.
+        """
+
+        runner = SceneRunner()
+        steps = [Press(_Device(), ['0x8', '0x1', '0x2'], 2, 0), 0.01]
+
+        status = self._finish(runner, runner.start('scene', steps))
+
+        self.assertEqual(status['state'], 'succeeded')
+        self.assertEqual((status['step'], status['presses']), (2, 2))
+
+    def test_irbox_error(self):
+        """
+        An IR box error fails the scene with its message.
+        """
+
+        runner = SceneRunner()
+        steps = [Press(_Device(IrboxError('Timeout')), ['0x8', '0x1', '0x2'])]
+
+        status = self._finish(runner, runner.start('scene', steps))
+
+        self.assertEqual((status['state'], status['error']), ('failed', 'Timeout'))
+
+    def test_unexpected_error(self):
+        """
+        Any other error fails the scene too, and frees its slot.
+        """
+
+        runner = SceneRunner(limit=1)
+        steps = [Press(_Device(UnicodeEncodeError('ascii', 'é', 0, 1, 'no')), ['0x8'])]
+
+        with self.assertLogs('irbox.scene', 'ERROR'):
+            status = self._finish(runner, runner.start('scene', steps))
+
+        self.assertEqual(status['state'], 'failed')
+        self.assertIsNotNone(status['error'])
+
+        # Neither the scene nor the slot is still taken
+        job_id = runner.start('scene', [Press(_Device(), ['0x8', '0x1', '0x2'])])
+        self.assertEqual(self._finish(runner, job_id)['state'], 'succeeded')
+
+    def test_running(self):
+        """
+        A scene can't be started again while it is running.
+        """
+
+        runner = SceneRunner()
+        job_id = runner.start('scene', [0.2])
+
+        with self.assertRaises(SceneRunningError):
+            runner.start('scene', [0.2])
+
+        self._finish(runner, job_id)
+
+class BuildStepsTest(unittest.TestCase):
+    """
+    Malformed steps are rejected when the scene is built, rather than failing
+    it partway through.
+    """
+
+    def test_build(self):
+        """
+        Waits and presses are built, with integer arguments in hex.
+        """
+
+        steps = build_steps([1.5, {'p': 0x8, 'a': 0x4, 'c': '0x8', 'times': '3'}])
+        press = steps[1]
+
+        self.assertEqual(steps[0], 1.5)
+        self.assertIsInstance(press, Press)
+        self.assertEqual(press.args, ['0x8', '0x4', '0x8'])
+        self.assertEqual((press.count, press.interval), (3, 0.25))
+
+    def test_booleans(self):
+        """
+        Booleans are not numbers.
+        """
+
+        for steps in (
+                [True],
+                [{'p': 0x8, 'a': True, 'c': 0x8}],
+                [{'p': 0x8, 'a': 0x4, 'c': 0x8, 'times': True}],
+                [{'p': 0x8, 'a': 0x4, 'c': 0x8, 'interval': False}]
+        ):
+            with self.assertRaises(MalformedArgumentsError):
+                build_steps(steps)
+
+    def test_non_ascii(self):
+        """
+        Arguments the IR box can't take are malformed.
+        """
+
+        with self.assertRaises(MalformedArgumentsError):
+            build_steps([{'p': '0x8', 'a': '0x４', 'c': '0x8'}])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,219 @@
+"""
+Tests for `Scheduler` admission by priority.
+"""
+
+import threading
+import time
+import unittest
+
+from irbox.errors import IrboxError
+from irbox.errors import QueueFullError
+from irbox.scheduler import Priority
+from irbox.scheduler import Scheduler
+
+class _Device:
+    """
+    Stand-in IR box whose commands record their order, and can be held until
+    released.
+
+    Attributes:
+        order (list of str): Commands run, in order.
+        release (Event): Set to let `hold()` return.
+    """
+
+    def __init__(self):
+        self.order = []
+        self.release = threading.Event()
+
+    def hold(self):
+        """
+        Blocks until `release` is set.
+        """
+
+        self.release.wait(5)
+
+        return True
+
+    def record(self, name):
+        """
+        Records a command.
+        """
+
+        self.order.append(name)
+
+        return True
+
+    def fail(self):
+        """
+        Raises an IR box error.
+        """
+
+        raise IrboxError('Failed')
+
+class SchedulerTest(unittest.TestCase):
+    """
+    Commands are admitted most urgent first, up to `max_in_flight` at once,
+    and turned away rather than piling up.
+    """
+
+    def setUp(self):
+        self.device = _Device()
+        self.threads = []
+
+    def tearDown(self):
+        self.device.release.set()
+        for thread in self.threads:
+            thread.join(5)
+
+    def _start(self, target, *args):
+        """
+        Runs a function on a new thread.
+
+        Args:
+            target (function): The function.
+            args (list): Arguments to the function.
+        """
+
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def _wait_for(self, scheduler, priority, key, value):
+        """
+        Waits for one of a priority class's statistics to reach a value.
+
+        Args:
+            scheduler (Scheduler): The scheduler.
+            priority (Priority): The priority class.
+            key (str): The statistic (see `Scheduler.stats()`).
+            value (int): The value.
+        """
+
+        deadline = time.monotonic() + 5
+        while scheduler.stats(self.device)[priority.name.lower()][key] < value:
+            self.assertLess(time.monotonic(), deadline, f'{key} never reached {value}')
+            time.sleep(0.01)
+
+    def _hold(self, scheduler):
+        """
+        Takes a slot with a command that holds it until `release` is set.
+
+        Args:
+            scheduler (Scheduler): The scheduler.
+        """
+
+        self._start(scheduler.run, self.device, Priority.INTERACTIVE, 'hold')
+        self._wait_for(scheduler, Priority.INTERACTIVE, 'admitted', 1)
+
+    def test_unlimited(self):
+        """
+        With no `max_in_flight`, every command is admitted at once.
+        """
+
+        scheduler = Scheduler(max_wait=0.1)
+        self._start(scheduler.run, self.device, Priority.INTERACTIVE, 'hold')
+
+        self.assertTrue(scheduler.run(self.device, Priority.DEBUG, 'record', 'debug'))
+
+    def test_priority_order(self):
+        """
+        When a slot frees up, the oldest command of the most urgent class
+        goes first, whatever order they arrived in.
+        """
+
+        scheduler = Scheduler(max_in_flight=1)
+        self._hold(scheduler)
+
+        for name, priority in (
+                ('debug', Priority.DEBUG),
+                ('background', Priority.BACKGROUND),
+                ('interactive 1', Priority.INTERACTIVE),
+                ('rx', Priority.RX),
+                ('interactive 2', Priority.INTERACTIVE)
+        ):
+            depth = scheduler.stats(self.device)[priority.name.lower()]['depth']
+            self._start(scheduler.run, self.device, priority, 'record', name)
+            self._wait_for(scheduler, priority, 'depth', depth + 1)
+
+        self.device.release.set()
+        for thread in self.threads:
+            thread.join(5)
+
+        self.assertEqual(
+                self.device.order,
+                ['interactive 1', 'interactive 2', 'rx', 'background', 'debug']
+        )
+
+    def test_queue_full(self):
+        """
+        A command that finds its class's queue full fails fast, with a
+        `Retry-After` estimate.
+        """
+
+        scheduler = Scheduler(max_in_flight=1, queue_limits={Priority.BACKGROUND: 1})
+        self._hold(scheduler)
+        self._start(scheduler.run, self.device, Priority.BACKGROUND, 'record', 'queued')
+        self._wait_for(scheduler, Priority.BACKGROUND, 'depth', 1)
+
+        started = time.monotonic()
+        with self.assertRaises(QueueFullError) as context:
+            scheduler.run(self.device, Priority.BACKGROUND, 'record', 'rejected')
+
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertGreaterEqual(context.exception.retry_after, 1)
+        self.assertEqual(scheduler.stats(self.device)['background']['rejected'], 1)
+
+        # Other classes still queue
+        self._start(scheduler.run, self.device, Priority.INTERACTIVE, 'record', 'interactive')
+        self._wait_for(scheduler, Priority.INTERACTIVE, 'depth', 1)
+
+        self.device.release.set()
+        for thread in self.threads:
+            thread.join(5)
+
+        self.assertEqual(self.device.order, ['interactive', 'queued'])
+
+    def test_max_wait(self):
+        """
+        A command that waits longer than `max_wait` is turned away, and
+        leaves its queue.
+        """
+
+        scheduler = Scheduler(max_in_flight=1, max_wait=0.2)
+        self._hold(scheduler)
+
+        started = time.monotonic()
+        with self.assertRaises(QueueFullError):
+            scheduler.run(self.device, Priority.INTERACTIVE, 'record', 'late')
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual(scheduler.stats(self.device)['interactive']['depth'], 0)
+        self.assertEqual(self.device.order, [])
+
+    def test_release_on_error(self):
+        """
+        A command that raises gives its slot back.
+        """
+
+        scheduler = Scheduler(max_in_flight=1, max_wait=0.2)
+
+        with self.assertRaises(IrboxError):
+            scheduler.run(self.device, Priority.INTERACTIVE, 'fail')
+
+        self.assertTrue(scheduler.run(self.device, Priority.INTERACTIVE, 'record', 'next'))
+        self.assertEqual(self.device.order, ['next'])
+        self.assertEqual(scheduler.stats(self.device)['interactive']['admitted'], 2)
+
+    def test_devices_independent(self):
+        """
+        Each device has its own slots.
+        """
+
+        scheduler = Scheduler(max_in_flight=1, max_wait=0.2)
+        self._hold(scheduler)
+
+        other = _Device()
+        self.assertTrue(scheduler.run(other, Priority.INTERACTIVE, 'record', 'other'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Tests for `TimingModel` response deadlines.
+"""
+
+import threading
+import unittest
+
+from irbox.irbox import IrBox
+from irbox.simulator import Simulator
+from irbox.timing import TimingModel
+
+class TimingModelTest(unittest.TestCase):
+    """
+    Deadlines allow for each command's on-air time, the commands ahead of it,
+    and the learned overhead.
+    """
+
+    def test_on_air(self):
+        """
+        On-air time follows the protocol's frame period and the repeats.
+        """
+
+        self.assertAlmostEqual(TimingModel.on_air('tx(0x8,0x1,0x2)'), 0.110)
+        self.assertAlmostEqual(TimingModel.on_air('tx(0x8,0x1,0x2,0x4)'), 0.550)
+        self.assertAlmostEqual(TimingModel.on_air('tx(0x13,0x1,0x2,0xc,0x2)'), 0.135)
+        self.assertEqual(TimingModel.on_air('nop'), 0.0)
+        self.assertIsNone(TimingModel.on_air(''))
+        self.assertIsNone(TimingModel.on_air('tx(0x11,0x7,0x2)'))
+
+    def test_deadline(self):
+        """
+        A deadline is the on-air time plus the overhead estimate, within the
+        floor and ceiling.
+        """
+
+        timing = TimingModel(floor=0.5, ceiling=5, overhead=0.2, deviation=0.05)
+
+        self.assertAlmostEqual(timing.deadline('tx(0x8,0x1,0x2,0x9)'), 1.1 + 0.4)
+        self.assertEqual(timing.deadline('nop'), 0.5)
+        self.assertEqual(timing.deadline(''), 5)
+
+    def test_deadline_ahead(self):
+        """
+        Commands ahead add their on-air time, but not their overhead.
+        """
+
+        timing = TimingModel(floor=0.5, ceiling=5, overhead=0.2, deviation=0.05)
+        ahead = ['tx(0x8,0x1,0x2,0x4)', 'nop', '', 'tx(0x8,0x1,0x3,0x4)']
+
+        self.assertAlmostEqual(
+                timing.deadline('tx(0x8,0x1,0x2,0x4)', ahead),
+                3 * 0.55 + 0.4
+        )
+
+    def test_observe(self):
+        """
+        Observed latencies beyond the on-air time move the overhead estimate,
+        capped at the ceiling.
+        """
+
+        timing = TimingModel(floor=0, ceiling=2, overhead=1.0, deviation=0.5)
+        for _ in range(100):
+            timing.observe('tx(0x8,0x1,0x2)', 0.110 + 0.05)
+
+        self.assertAlmostEqual(timing.deadline('nop'), 0.05, places=2)
+
+        for _ in range(100):
+            timing.observe('nop', 10)
+
+        self.assertEqual(timing.deadline('nop'), 2)
+
+    def test_pipelined_presses(self):
+        """
+        Long presses pipelined together each get their response, however long
+        the ones ahead take to transmit.
+        """
+
+        presses = 4
+
+        with Simulator(port=0, latency=0.01, on_air=True) as simulator:
+            irbox = IrBox('127.0.0.1', simulator.port)
+            irbox.timing = TimingModel()
+
+            # Learn the overhead, so the deadline is tight
+            for _ in range(20):
+                irbox.nop()
+
+            results = [None] * presses
+
+            def press(index):
+                results[index] = irbox.tx(['0x8', '0x1', hex(index), '0x5'])
+
+            threads = [
+                    threading.Thread(target=press, args=(index,))
+                    for index in range(presses)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            irbox.close()
+
+        self.assertEqual(results, [True] * presses)
+
+    def test_pipelined_overhead(self):
+        """
+        Time pipelined presses spend waiting behind the ones ahead is not
+        learned as overhead.
+        """
+
+        with Simulator(port=0, latency=0.01, on_air=True) as simulator:
+            irbox = IrBox('127.0.0.1', simulator.port)
+            irbox.timing = TimingModel(floor=0)
+
+            for _ in range(20):
+                irbox.nop()
+            learned = irbox.timing.deadline('nop')
+
+            threads = [
+                    threading.Thread(target=irbox.tx, args=(['0x8', '0x1', hex(index), '0x5'],))
+                    for index in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            irbox.close()
+
+        self.assertLess(irbox.timing.deadline('nop'), learned + 0.1)
+
+if __name__ == '__main__':
+    unittest.main()